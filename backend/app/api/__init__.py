@@ -1,4 +1,4 @@
 # This file makes the api directory a Python package
-from . import chat, tickets, knowledge
+from . import chat, tickets, knowledge, admin
 
-__all__ = ["chat", "tickets", "knowledge"]
\ No newline at end of file
+__all__ = ["chat", "tickets", "knowledge", "admin"]
\ No newline at end of file
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import FileResponse, PlainTextResponse
+from typing import List, Dict, Any
+from ..utils.profiling import profile_store
+from ..dependencies import require_admin
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/profiles")
+async def list_profiles() -> List[Dict[str, Any]]:
+    """List captured request profiles, newest first"""
+    return profile_store.list()
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("pstats", pattern="^(pstats|text)$"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls)$")
+):
+    """Download a profile as a pstats dump, or read it as a text report"""
+    if format == "text":
+        report = profile_store.render(profile_id, sort=sort)
+        if report is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return PlainTextResponse(report)
+    
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=profile_id)
@@ -1,18 +1,32 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Header, Query, Request
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, NamedTuple, Set
+import asyncio
+import time
+from ..config import settings
 from ..services.llm_service import LLMService
-from ..services.rag_service import RAGService
+from ..services.rag_service import ActiveIndex, RAGService
 from ..services.ticket_service import TicketService
 from ..services.knowledge_service import KnowledgeService
+from ..services.indexing_queue import IndexingQueue
+from ..services.rate_limiter import RateLimiter, LoadShedder
+from ..services.session_memory import SessionMemory
+from ..services.answer_store import AnswerStore
+from ..services.query_log import QueryLog
+from ..utils.metrics import stage
+from ..utils.deadline import Deadline
+from ..utils import profiling
+from ..utils.text import extract_snippet
+from ..utils.classification import classify_department, needs_ticket
+from ..dependencies import (
+    get_llm_service, get_rag_service, get_ticket_service, get_knowledge_service, get_indexing_queue,
+    get_rate_limiter, get_load_shedder, get_session_memory, get_answer_store, get_query_log
+)
 
 router = APIRouter()
 
-# Initialize services
-llm_service = LLMService()
-rag_service = RAGService()
-ticket_service = TicketService()
-knowledge_service = KnowledgeService()
+# Ticket creations that ran past their request's deadline
+_background_tasks: Set[asyncio.Future] = set()
 
 class ChatRequest(BaseModel):
     message: str
@@ -23,67 +37,253 @@ class ChatResponse(BaseModel):
     response: str
     department: str
     ticket_id: Optional[str] = None
+    ticket_reused: bool = False
+    ticket_deferred: bool = False
     sources: Optional[List[Dict[str, Any]]] = None
+    # Stages that were skipped, failed or ran out of time: retrieval, generation, ticket
+    degraded: List[str] = []
+    # Answered from the precomputed answer store rather than generated
+    precomputed: bool = False
+
+class Retrieval(NamedTuple):
+    active: ActiveIndex
+    embedding: List[float]
+    precomputed: Optional[Dict[str, Any]]  # Stored answer, if one matched
+    sources: List[Dict[str, Any]]
+
+def _client_identity(request: ChatRequest, http_request: Request) -> str:
+    """Rate limit key: the user ID, or the client address for anonymous callers"""
+    if request.user_id and request.user_id != "anonymous":
+        return request.user_id
+    host = http_request.client.host if http_request.client else "unknown"
+    return f"anonymous@{host}"
 
 @router.post("/", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Process chat message with ticket creation"""
+async def chat(
+    request: ChatRequest,
+    http_request: Request,
+    background_tasks: BackgroundTasks,
+    x_request_timeout: Optional[str] = Header(None),
+    include_content: bool = Query(False, description="Return the full text of each source"),
+    llm_service: LLMService = Depends(get_llm_service),
+    rag_service: RAGService = Depends(get_rag_service),
+    ticket_service: TicketService = Depends(get_ticket_service),
+    rate_limiter: RateLimiter = Depends(get_rate_limiter),
+    load_shedder: LoadShedder = Depends(get_load_shedder),
+    session_memory: SessionMemory = Depends(get_session_memory),
+    answer_store: AnswerStore = Depends(get_answer_store),
+    query_log: QueryLog = Depends(get_query_log)
+):
+    """Process chat message with ticket creation, within a deadline budget"""
+    # Generation costs more tokens than a retrieval-only answer, and is
+    # shed while Ollama is overloaded
+    generate = llm_service.ready and not load_shedder.should_shed()
+    decision = await rate_limiter.acquire(
+        _client_identity(request, http_request),
+        settings.RATE_LIMIT_GENERATION_COST if generate else settings.RATE_LIMIT_RETRIEVAL_COST
+    )
+    if not decision.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": decision.retry_after_header}
+        )
+    
+    deadline = Deadline.from_header(
+        x_request_timeout,
+        default=settings.CHAT_DEADLINE_SECONDS,
+        maximum=settings.CHAT_DEADLINE_MAX_SECONDS
+    )
+    degraded: List[str] = []
+    
     try:
-        # Search for relevant knowledge
-        context = await rag_service.get_context(request.message)
+        # Follow-ups depend on the conversation, so only questions without
+        # history may be answered from the answer store
+        history = ""
+        if request.session_id:
+            try:
+                history = await deadline.run(session_memory.history(request.session_id))
+            except Exception as e:
+                print(f"Error loading session {request.session_id}: {e!r}")
         
-        # Generate response (simple for now)
-        response = f"I understand you need help with: {request.message}. Based on our knowledge base, here's what I found: {context[:200]}..."
+        # Search for relevant knowledge; skipped while the embedding model loads.
+        # The same hits serve as prompt context and as the returned sources.
+        sources: List[Dict[str, Any]] = []
+        retrieval: Optional[Retrieval] = None
+        if rag_service.ready:
+            try:
+                with stage("chat_retrieval"):
+                    retrieval = await deadline.run(profiling.to_thread(
+                        _retrieve, rag_service, answer_store, request.message, not history
+                    ))
+                sources = retrieval.sources
+            except Exception as e:
+                print(f"Retrieval error: {e!r}")
+                degraded.append("retrieval")
+            context = rag_service.format_context(sources)
+        else:
+            context = "The knowledge base is still loading."
+            degraded.append("retrieval")
+        precomputed = retrieval.precomputed if retrieval else None
+        
+        # Generate response with whatever time is left, falling back to the retrieved context
+        response = None
+        if precomputed:
+            response = precomputed["answer"]
+            sources = precomputed["sources"]
+        elif generate and deadline.fits(settings.CHAT_MIN_GENERATION_SECONDS):
+            started = time.perf_counter()
+            try:
+                with stage("chat_generation"):
+                    response = await deadline.run(llm_service.generate_response(
+                        request.message, context, timeout=deadline.remaining(), history=history
+                    ))
+            except Exception as e:
+                print(f"Generation error: {e!r}")
+            # Timeouts count at their full duration, pushing the average up
+            load_shedder.observe(time.perf_counter() - started)
+        if response is None:
+            degraded.append("generation")
+            response = f"I understand you need help with: {request.message}. Based on our knowledge base, here's what I found: {context[:200]}..."
         
         # Classify department
-        message_lower = request.message.lower()
-        if any(word in message_lower for word in ["password", "login", "email", "vpn", "computer"]):
-            department = "IT"
-        elif any(word in message_lower for word in ["leave", "vacation", "hr", "employee"]):
-            department = "HR"
-        elif any(word in message_lower for word in ["expense", "payroll", "salary", "invoice"]):
-            department = "Finance"
-        else:
-            department = "General"
+        with stage("chat_classification"):
+            department = classify_department(request.message)
         
         # Create ticket if it's an issue/request
         ticket_id = None
-        if any(word in message_lower for word in ["help", "issue", "problem", "not working", "error", "can't", "cannot"]):
-            ticket_id = await ticket_service.create_ticket({
+        ticket_reused = False
+        ticket_deferred = False
+        if needs_ticket(request.message):
+            ticket_data = {
                 "title": f"Query: {request.message[:50]}...",
                 "description": request.message,
                 "department": department,
                 "user_id": request.user_id
-            })
+            }
+            if deadline.fits(settings.CHAT_MIN_TICKET_SECONDS):
+                # Shielded so running out of time leaves the ticket to finish in
+                # the background instead of cancelling a half-sent Zammad call
+                ticket_task = asyncio.ensure_future(ticket_service.create_or_attach_ticket(ticket_data))
+                try:
+                    with stage("chat_ticket"):
+                        ticket = await deadline.run(asyncio.shield(ticket_task))
+                    ticket_id = ticket["ticket_id"]
+                    ticket_reused = ticket["reused"]
+                except asyncio.TimeoutError:
+                    _keep_running(ticket_task)
+                    ticket_deferred = True
+            else:
+                background_tasks.add_task(ticket_service.create_or_attach_ticket, ticket_data)
+                ticket_deferred = True
+            
+            if ticket_reused:
+                response += f" This issue is already being handled, so your report was added to ticket {ticket_id}."
+            if ticket_deferred:
+                degraded.append("ticket")
+                response += " A support ticket is being created for you."
         
-        # Get sources
-        sources = await rag_service.search_documents(request.message, limit=3)
+        # Remember the turn once the response is on its way
+        if request.session_id:
+            background_tasks.add_task(session_memory.record_turn, request.session_id, request.message, response)
+        if retrieval:
+            background_tasks.add_task(
+                query_log.record, request.message, department,
+                retrieval.active.model, retrieval.embedding, precomputed is not None
+            )
         
         return ChatResponse(
             response=response,
             department=department,
             ticket_id=ticket_id,
-            sources=sources
+            ticket_reused=ticket_reused,
+            ticket_deferred=ticket_deferred,
+            sources=_compact_sources(sources, request.message, include_content),
+            degraded=degraded,
+            precomputed=precomputed is not None
         )
         
     except Exception as e:
         print(f"Chat error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _retrieve(
+    rag_service: RAGService,
+    answer_store: AnswerStore,
+    query: str,
+    use_answer_store: bool
+) -> Retrieval:
+    """Embed the query once, then take a stored answer on a confident match or search the KB"""
+    active, embedding = rag_service.query_embedding(query)
+    precomputed = answer_store.lookup(active, embedding) if use_answer_store else None
+    sources = [] if precomputed else rag_service.search_by_embedding(embedding, active, 3)
+    return Retrieval(active, embedding, precomputed, sources)
+
+def _compact_sources(sources: List[Dict[str, Any]], query: str, include_content: bool) -> List[Dict[str, Any]]:
+    """Replace full document text with the passage that best matches the query"""
+    compact = []
+    for source in sources:
+        item = {key: source[key] for key in ("id", "score", "title", "category", "department")}
+        item["snippet"] = extract_snippet(source["content"], query, settings.SNIPPET_MAX_CHARS)
+        if include_content:
+            item["content"] = source["content"]
+        compact.append(item)
+    return compact
+
+def _keep_running(task: asyncio.Future):
+    """Hold a reference to a task that outlives its request until it finishes"""
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
 @router.post("/feedback")
 async def submit_feedback(
     ticket_id: str,
     resolved: bool,
-    resolution: Optional[str] = None
+    resolution: Optional[str] = None,
+    rag_service: RAGService = Depends(get_rag_service),
+    knowledge_service: KnowledgeService = Depends(get_knowledge_service),
+    indexing_queue: IndexingQueue = Depends(get_indexing_queue)
 ):
     """Convert resolved ticket to knowledge base article"""
+    if resolved:
+        # Resolved tickets no longer absorb duplicate reports
+        try:
+            if rag_service.ready:
+                await rag_service.remove_open_ticket(ticket_id)
+        except Exception as e:
+            print(f"Error removing ticket {ticket_id} from duplicate index: {e}")
+    
     if resolved and resolution:
-        # Create KB article from resolution
-        await knowledge_service.create_article({
+        # Queue a KB article built from the resolution
+        article = {
             "title": f"Resolution for Ticket {ticket_id}",
             "content": resolution,
             "category": "Ticket Resolution",
             "department": "General"
-        })
-        return {"message": "Feedback received and KB updated"}
-    return {"message": "Feedback received"}
\ No newline at end of file
+        }
+        try:
+            job_id = await indexing_queue.enqueue(article)
+        except Exception as e:
+            # Without Redis, fall back to indexing on the request path
+            print(f"Error queueing KB article, indexing inline: {e}")
+            await knowledge_service.create_article(article)
+            return {"message": "Feedback received and KB updated"}
+        return {"message": "Feedback received, KB update queued", "job_id": job_id}
+    return {"message": "Feedback received"}
+
+@router.get("/feedback/jobs/{job_id}")
+async def get_feedback_job(
+    job_id: str,
+    indexing_queue: IndexingQueue = Depends(get_indexing_queue)
+):
+    """Get the status of a queued KB update"""
+    if indexing_queue.redis is None:
+        raise HTTPException(status_code=503, detail="Job status is unavailable")
+    try:
+        job = await indexing_queue.get_job(job_id)
+    except Exception as e:
+        print(f"Error reading indexing job {job_id}: {e}")
+        raise HTTPException(status_code=503, detail="Job status is unavailable")
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
\ No newline at end of file
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
+from ..services.knowledge_service import KnowledgeService
+from ..dependencies import get_knowledge_service
 
 router = APIRouter()
 
@@ -15,14 +17,22 @@ class ArticleResponse(BaseModel):
     title: str
     content: str
     score: Optional[float] = None
+    source: Optional[str] = None
 
-@router.get("/articles/search", response_model=List[ArticleResponse])
+class ArticleSearchResponse(BaseModel):
+    results: List[ArticleResponse]
+    partial: bool = False
+    timed_out: List[str] = []
+    unavailable: List[str] = []
+
+@router.get("/articles/search", response_model=ArticleSearchResponse)
 async def search_articles(
     q: str = Query(..., description="Search query"),
-    limit: int = Query(default=5, ge=1, le=20)
+    limit: int = Query(default=5, ge=1, le=20),
+    knowledge_service: KnowledgeService = Depends(get_knowledge_service)
 ):
-    """Search knowledge base"""
-    return []
+    """Search the vector store and BookStack, returning partial results if a backend times out or fails"""
+    return await knowledge_service.federated_search(q, limit=limit)
 
 @router.post("/articles", response_model=Dict[str, str])
 async def create_article(article: ArticleCreate):
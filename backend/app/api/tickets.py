@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
+from ..config import settings
+from ..services.ticket_service import TicketService
+from ..dependencies import get_ticket_service
 
 router = APIRouter()
 
@@ -10,6 +13,22 @@ class TicketCreate(BaseModel):
     department: str
     user_id: str
     priority: Optional[str] = "normal"
+    status: Optional[str] = None
+
+class BulkTicketCreate(BaseModel):
+    tickets: List[TicketCreate]
+    concurrency: Optional[int] = None
+
+class BulkTicketResult(BaseModel):
+    index: int
+    status: str
+    ticket_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkTicketResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkTicketResult]
 
 class TicketResponse(BaseModel):
     id: str
@@ -30,4 +49,29 @@ async def create_ticket(ticket: TicketCreate):
         title=ticket.title,
         status="open",
         created_at="2024-01-15T10:00:00Z"
+    )
+
+@router.post("/bulk", response_model=BulkTicketResponse)
+async def create_tickets_bulk(
+    request: BulkTicketCreate,
+    ticket_service: TicketService = Depends(get_ticket_service)
+):
+    """Create many tickets at once, reporting the outcome of each item"""
+    if len(request.tickets) > settings.TICKET_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.TICKET_BULK_MAX_ITEMS} tickets per request"
+        )
+    
+    concurrency = min(request.concurrency or settings.TICKET_IMPORT_CONCURRENCY, settings.TICKET_IMPORT_CONCURRENCY)
+    results = await ticket_service.create_tickets(
+        (ticket.model_dump() for ticket in request.tickets),
+        concurrency=max(concurrency, 1)
+    )
+    created = sum(1 for result in results if result["status"] == "created")
+    
+    return BulkTicketResponse(
+        created=created,
+        failed=len(results) - created,
+        results=results
     )
\ No newline at end of file
@@ -0,0 +1,62 @@
+from fastapi import Depends, Header, HTTPException, Request
+from typing import Optional
+from .config import settings
+from .services.container import ServiceContainer
+from .services.llm_service import LLMService
+from .services.rag_service import RAGService
+from .services.ticket_service import TicketService
+from .services.knowledge_service import KnowledgeService
+from .services.indexing_queue import IndexingQueue
+from .services.health_service import HealthService
+from .services.rate_limiter import RateLimiter, LoadShedder
+from .services.session_memory import SessionMemory
+from .services.answer_store import AnswerStore
+from .services.query_log import QueryLog
+from .utils.profiling import is_admin_token
+
+def get_services(request: Request) -> ServiceContainer:
+    """Dependency to get the process-wide service container"""
+    services = getattr(request.app.state, "services", None)
+    if services is None:
+        raise HTTPException(status_code=503, detail="Services are not initialized")
+    return services
+
+def get_llm_service(services: ServiceContainer = Depends(get_services)) -> LLMService:
+    return services.llm_service
+
+def get_rag_service(services: ServiceContainer = Depends(get_services)) -> RAGService:
+    return services.rag_service
+
+def get_ticket_service(services: ServiceContainer = Depends(get_services)) -> TicketService:
+    return services.ticket_service
+
+def get_knowledge_service(services: ServiceContainer = Depends(get_services)) -> KnowledgeService:
+    return services.knowledge_service
+
+def get_indexing_queue(services: ServiceContainer = Depends(get_services)) -> IndexingQueue:
+    return services.indexing_queue
+
+def get_health_service(services: ServiceContainer = Depends(get_services)) -> HealthService:
+    return services.health_service
+
+def get_rate_limiter(services: ServiceContainer = Depends(get_services)) -> RateLimiter:
+    return services.rate_limiter
+
+def get_load_shedder(services: ServiceContainer = Depends(get_services)) -> LoadShedder:
+    return services.load_shedder
+
+def get_session_memory(services: ServiceContainer = Depends(get_services)) -> SessionMemory:
+    return services.session_memory
+
+def get_answer_store(services: ServiceContainer = Depends(get_services)) -> AnswerStore:
+    return services.answer_store
+
+def get_query_log(services: ServiceContainer = Depends(get_services)) -> QueryLog:
+    return services.query_log
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency guarding admin endpoints with the X-Admin-Token header"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
@@ -1,33 +1,35 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import asyncio
 from .config import settings
-from .api import chat, tickets, knowledge
-from .services.llm_service import LLMService
-from .services.rag_service import RAGService
+from .api import chat, tickets, knowledge, admin
+from .services.container import ServiceContainer
 from .models import Base
-from .database import engine
-
-# Initialize services
-llm_service = LLMService()
-rag_service = RAGService()
+from .database import async_engine
+from .utils.metrics import MetricsMiddleware, render_metrics
+from .utils.profiling import ProfilingMiddleware
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    Base.metadata.create_all(bind=engine)
-    await llm_service.initialize()
-    await rag_service.initialize()
+    if settings.DB_INIT_ON_STARTUP:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    services = ServiceContainer()
+    await services.initialize()
+    app.state.services = services
     yield
     # Shutdown
-    await llm_service.cleanup()
-    await rag_service.cleanup()
+    await services.cleanup()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="AI Helpdesk API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -37,24 +39,57 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 # Include routers
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
 app.include_router(tickets.router, prefix="/api/tickets", tags=["tickets"])
 app.include_router(knowledge.router, prefix="/api/knowledge", tags=["knowledge"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 @app.get("/")
 async def root():
     return {"message": "AI Helpdesk API is running"}
 
+@app.get("/live")
+async def liveness_check():
+    """The process is up and serving; says nothing about dependencies"""
+    return {"status": "alive"}
+
+@app.get("/ready")
+async def readiness_check():
+    """Report capabilities and dependency health; 503 until the node can serve traffic"""
+    services = getattr(app.state, "services", None)
+    if services is None:
+        return JSONResponse(status_code=503, content={"ready": False, "capabilities": {}})
+    
+    capabilities = services.capabilities()
+    health = await services.health_service.check()
+    ready = (
+        all(capabilities.get(name, False) for name in ServiceContainer.REQUIRED_CAPABILITIES)
+        and health["status"] != "unhealthy"
+    )
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "capabilities": capabilities, "dependencies": health["dependencies"]}
+    )
+
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
-        "services": {
-            "database": "connected",
-            "redis": "connected",
-            "qdrant": "connected",
-            "ollama": "connected"
-        }
-    }
\ No newline at end of file
+    """Probe every dependency (cached briefly); 503 if a required one is down"""
+    services = getattr(app.state, "services", None)
+    if services is None:
+        return JSONResponse(status_code=503, content={"status": "starting", "dependencies": {}})
+    
+    health = await services.health_service.check()
+    return JSONResponse(
+        status_code=503 if health["status"] == "unhealthy" else 200,
+        content=health
+    )
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -8,5 +8,10 @@ except ImportError:
 
 try:
     from .knowledge import KnowledgeArticle
+except ImportError:
+    pass
+
+try:
+    from .sync_cursor import SyncCursor
 except ImportError:
     pass
\ No newline at end of file
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.sql import func
+from ..database import Base
+
+class SyncCursor(Base):
+    __tablename__ = "sync_cursors"
+    
+    name = Column(String, primary_key=True)
+    cursor = Column(String, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,167 @@
+import hashlib
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from ..config import settings
+from ..utils.metrics import record_cache, stage
+from .rag_service import ActiveIndex, RAGService, versioned_collection_name
+
+READY = "ready"
+STALE = "stale"
+
+def content_fingerprint(content: str) -> str:
+    """Short hash of a document's text, to notice when a cited document changes"""
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+def intent_point_id(query: str) -> str:
+    """Stable point ID for an intent, from its representative query"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"intent:{' '.join(query.lower().split())}"))
+
+class AnswerStore:
+    """Vetted answers to recurring intents, looked up by query embedding.
+
+    Answers are written by scripts/build_answer_store.py into one Qdrant
+    collection per embedding model, keyed by the centroid of the intent's
+    queries. Each answer records a fingerprint of every KB document it
+    cites; an answer whose documents have since changed or disappeared is
+    marked stale on lookup and not served until the script regenerates it.
+    """
+
+    def __init__(self, rag_service: RAGService):
+        self.rag_service = rag_service
+        self._exists: Dict[str, Tuple[bool, float]] = {}
+
+    def collection_name(self, active: ActiveIndex) -> str:
+        return versioned_collection_name(settings.ANSWER_STORE_COLLECTION, active.model, active.dimension)
+
+    def _collection_exists(self, name: str) -> bool:
+        """Cached existence check; a missing store is rechecked every QDRANT_ALIAS_REFRESH_SECONDS"""
+        cached = self._exists.get(name)
+        if cached and (cached[0] or time.monotonic() - cached[1] < settings.QDRANT_ALIAS_REFRESH_SECONDS):
+            return cached[0]
+        exists = self.rag_service.client.collection_exists(name)
+        self._exists[name] = (exists, time.monotonic())
+        return exists
+
+    def lookup(self, active: ActiveIndex, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """The stored answer for a query embedding, if one matches confidently and is current"""
+        if not settings.ANSWER_STORE_ENABLED:
+            return None
+        from qdrant_client.models import Filter, FieldCondition, MatchValue
+
+        collection = self.collection_name(active)
+        try:
+            if not self._collection_exists(collection):
+                return None
+            with stage("answer_store_lookup", dependency="qdrant"):
+                results = self.rag_service.client.search(
+                    collection_name=collection,
+                    query_vector=embedding,
+                    query_filter=Filter(must=[FieldCondition(key="status", match=MatchValue(value=READY))]),
+                    score_threshold=settings.ANSWER_STORE_MIN_SCORE,
+                    limit=1
+                )
+            hit = results[0] if results else None
+            sources = self.current_sources(active, hit.payload) if hit else None
+            if hit and sources is None:
+                self.mark_stale(active, [str(hit.id)])
+        except Exception as e:
+            print(f"Answer store lookup failed: {e}")
+            self._exists.pop(collection, None)
+            return None
+
+        record_cache("answer_store", sources is not None)
+        if sources is None:
+            return None
+        return {
+            "intent_id": str(hit.id),
+            "score": hit.score,
+            "answer": hit.payload["answer"],
+            "department": hit.payload.get("department", "General"),
+            "sources": sources
+        }
+
+    def current_sources(self, active: ActiveIndex, payload: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """The cited documents, or None if any of them changed since the answer was written"""
+        cited = payload.get("sources", [])
+        if not cited:
+            return []
+        documents = self.rag_service.get_documents([source["id"] for source in cited], active)
+        sources = []
+        for source in cited:
+            document = documents.get(source["id"])
+            if document is None or content_fingerprint(document["content"]) != source["fingerprint"]:
+                return None
+            sources.append({**document, "score": source.get("score")})
+        return sources
+
+    def mark_stale(self, active: ActiveIndex, intent_ids: List[str]):
+        """Stop serving answers until they are regenerated"""
+        self.rag_service.client.set_payload(
+            collection_name=self.collection_name(active),
+            payload={"status": STALE},
+            points=intent_ids
+        )
+
+    def ensure_collection(self, active: ActiveIndex) -> str:
+        """Create the store for the served model if needed"""
+        from qdrant_client.models import PayloadSchemaType
+
+        name = self.collection_name(active)
+        self.rag_service._ensure_collection(name, active.dimension)
+        self.rag_service.client.create_payload_index(name, field_name="status", field_schema=PayloadSchemaType.KEYWORD)
+        self._exists.pop(name, None)
+        return name
+
+    def upsert(self, active: ActiveIndex, entries: List[Dict[str, Any]]):
+        """Write answers; each entry needs query, vector, answer and sources (id, fingerprint, ...)"""
+        from qdrant_client.models import PointStruct
+
+        collection = self.ensure_collection(active)
+        self.rag_service.client.upsert(
+            collection_name=collection,
+            points=[
+                PointStruct(
+                    id=entry.get("intent_id") or intent_point_id(entry["query"]),
+                    vector=list(entry["vector"]),
+                    payload={
+                        **{key: value for key, value in entry.items() if key not in ("intent_id", "vector")},
+                        "source_ids": [source["id"] for source in entry["sources"]],
+                        "status": READY,
+                        "updated_at": time.time()
+                    }
+                )
+                for entry in entries
+            ]
+        )
+
+    def entries(self, active: ActiveIndex, with_vectors: bool = False) -> Iterator[Dict[str, Any]]:
+        """Every stored answer with its intent_id (and vector if asked for)"""
+        collection = self.collection_name(active)
+        if not self.rag_service.client.collection_exists(collection):
+            return
+        offset = None
+        while True:
+            points, offset = self.rag_service.client.scroll(
+                collection_name=collection,
+                limit=256,
+                offset=offset,
+                with_payload=True,
+                with_vectors=with_vectors
+            )
+            for point in points:
+                entry = {**point.payload, "intent_id": str(point.id)}
+                if with_vectors:
+                    entry["vector"] = point.vector
+                yield entry
+            if offset is None:
+                break
+
+    def delete(self, active: ActiveIndex, intent_ids: List[str]):
+        """Remove answers, e.g. for intents that no longer recur"""
+        from qdrant_client.models import PointIdsList
+
+        self.rag_service.client.delete(
+            collection_name=self.collection_name(active),
+            points_selector=PointIdsList(points=intent_ids)
+        )
@@ -0,0 +1,147 @@
+import asyncio
+import time
+import httpx
+from typing import Any, Dict, List, Optional
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.sync_cursor import SyncCursor
+from ..utils.text import html_to_text
+from .knowledge_service import KnowledgeService, bookstack_point_id
+from .rag_service import RAGService
+
+CURSOR_NAME = "bookstack_pages"
+SOURCE = "bookstack"
+
+def _normalize_timestamp(value: str) -> str:
+    """Reduce a BookStack timestamp to 'YYYY-MM-DD HH:MM:SS' for filters and comparisons"""
+    return value.replace("T", " ")[:19]
+
+async def _load_cursor() -> Optional[str]:
+    async with AsyncSessionLocal() as db:
+        row = await db.get(SyncCursor, CURSOR_NAME)
+        return row.cursor if row else None
+
+async def _save_cursor(value: str):
+    async with AsyncSessionLocal() as db:
+        await db.merge(SyncCursor(name=CURSOR_NAME, cursor=value))
+        await db.commit()
+
+class BookStackSyncService:
+    """Keep the vector store in step with pages edited in BookStack"""
+
+    def __init__(self, knowledge_service: KnowledgeService, rag_service: RAGService):
+        self.knowledge_service = knowledge_service
+        self.rag_service = rag_service
+        self._lock = asyncio.Lock()
+        self._reconciled_at: Optional[float] = None
+
+    async def sync(self, full: bool = False) -> Dict[str, int]:
+        """Index pages changed since the stored cursor.
+
+        Deleted pages leave no trace in the listing, so finding them means
+        comparing every page ID with the index. That runs on a full sync
+        and otherwise at most every BOOKSTACK_RECONCILE_INTERVAL_SECONDS.
+        """
+        async with self._lock:
+            return await self._sync(full)
+
+    async def _sync(self, full: bool) -> Dict[str, int]:
+        cursor = None if full else await _load_cursor()
+        newest = cursor
+        stats = {"indexed": 0, "deleted": 0}
+        semaphore = asyncio.Semaphore(settings.BOOKSTACK_SYNC_CONCURRENCY)
+
+        # Book names become departments; refresh them to pick up new books
+        await self.knowledge_service.warm_book_cache()
+
+        async with httpx.AsyncClient() as client:
+            # The filter is inclusive (gte) because BookStack timestamps have
+            # one-second resolution; pages sharing the cursor's second are
+            # re-embedded rather than missed
+            offset = 0
+            while True:
+                body = await self.knowledge_service.list_pages(client, updated_since=cursor, offset=offset)
+                listed = body.get("data", [])
+                if not listed:
+                    break
+
+                pages = await asyncio.gather(*(
+                    self._fetch_page(client, semaphore, page["id"]) for page in listed
+                ))
+                documents = [self._to_document(page) for page in pages if page]
+
+                # Pages that render to nothing are removed rather than indexed empty,
+                # from the same index even if the alias moves in between
+                active = self.rag_service.active
+                indexable = [doc for doc in documents if doc["content"]]
+                await self.rag_service.add_documents(indexable, active)
+                await self.rag_service.delete_documents([doc["id"] for doc in documents if not doc["content"]], active)
+                stats["indexed"] += len(indexable)
+
+                newest = max([newest or ""] + [_normalize_timestamp(page["updated_at"]) for page in listed])
+                offset += len(listed)
+                if offset >= body.get("total", 0):
+                    break
+
+            if full or self._reconcile_due():
+                stats["deleted"] += await self._remove_deleted_pages(client)
+                self._reconciled_at = time.monotonic()
+
+        if newest and newest != cursor:
+            await _save_cursor(newest)
+        return stats
+
+    def _reconcile_due(self) -> bool:
+        if self._reconciled_at is None:
+            return True
+        return time.monotonic() - self._reconciled_at >= settings.BOOKSTACK_RECONCILE_INTERVAL_SECONDS
+
+    async def _fetch_page(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, page_id: int):
+        async with semaphore:
+            return await self.knowledge_service.get_page(client, page_id)
+
+    def _to_document(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a BookStack page to a vector store document"""
+        return {
+            "id": bookstack_point_id(page["id"]),
+            "title": page.get("name", ""),
+            "content": html_to_text(page.get("html", "")),
+            "department": self.knowledge_service.book_name(page.get("book_id")) or "General",
+            "category": "BookStack",
+            "metadata": {
+                "source": SOURCE,
+                "page_id": page["id"],
+                "book_id": page.get("book_id"),
+                "updated_at": page.get("updated_at")
+            }
+        }
+
+    async def _remove_deleted_pages(self, client: httpx.AsyncClient) -> int:
+        """Delete indexed pages that no longer exist in BookStack"""
+        live_ids = await self.knowledge_service.list_page_ids(client)
+        # Scrolling the whole collection blocks, so do it in a worker thread
+        active = self.rag_service.active
+        indexed = await asyncio.to_thread(lambda: list(self.rag_service.iter_document_metadata(SOURCE, active)))
+        stale_ids: List[str] = [
+            doc_id
+            for doc_id, metadata in indexed
+            if metadata.get("page_id") not in live_ids
+        ]
+        await self.rag_service.delete_documents(stale_ids, active)
+        return len(stale_ids)
+
+    async def run_periodically(self, interval: float):
+        """Sync forever, sleeping `interval` seconds between runs"""
+        # With FAST_START retrieval comes up in the background
+        while not self.rag_service.ready:
+            await asyncio.sleep(1)
+        while True:
+            try:
+                stats = await self.sync()
+                if any(stats.values()):
+                    print(f"BookStack sync: {stats['indexed']} pages indexed, {stats['deleted']} removed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"BookStack sync failed: {e}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,146 @@
+import asyncio
+from typing import Dict, Optional
+from ..config import settings
+from .llm_service import LLMService
+from .rag_service import RAGService
+from .ticket_service import TicketService
+from .knowledge_service import KnowledgeService
+from .indexing_queue import IndexingQueue
+from .bookstack_sync import BookStackSyncService
+from .health_service import HealthService
+from .rate_limiter import RateLimiter, LoadShedder
+from .session_memory import SessionMemory
+from .answer_store import AnswerStore
+from .query_log import QueryLog
+
+class ServiceContainer:
+    """Holds the single instance of each service for this process.
+    
+    Created and torn down by the app lifespan and handed to routers through
+    the dependencies in app.dependencies, so every request shares one
+    embedding model and one Qdrant client.
+    """
+    
+    # Capabilities the API cannot usefully serve without
+    REQUIRED_CAPABILITIES = ("retrieval",)
+    
+    def __init__(self):
+        self.llm_service = LLMService()
+        self.rag_service = RAGService()
+        self.ticket_service = TicketService(self.rag_service)
+        self.knowledge_service = KnowledgeService(self.rag_service)
+        self.indexing_queue = IndexingQueue(self.knowledge_service)
+        self.bookstack_sync = BookStackSyncService(self.knowledge_service, self.rag_service)
+        self.health_service = HealthService(self.ticket_service, self.knowledge_service)
+        self.rate_limiter = RateLimiter()
+        self.load_shedder = LoadShedder()
+        self.session_memory = SessionMemory(self.llm_service)
+        self.answer_store = AnswerStore(self.rag_service)
+        self.query_log = QueryLog(self.rag_service)
+        self._sync_task: Optional[asyncio.Task] = None
+        self._warm_up_task: Optional[asyncio.Task] = None
+        
+    async def initialize(self):
+        """Initialize all services, failing fast if a required one is unusable.
+        
+        With FAST_START the model pull and embedding model load run in the
+        background instead, and the API serves degraded responses until the
+        capabilities reported by capabilities() come up.
+        """
+        if settings.FAST_START:
+            self._warm_up_task = asyncio.create_task(self._warm_up())
+        else:
+            await self.llm_service.initialize()
+            await self.rag_service.initialize()
+            self._check_required()
+            await self.knowledge_service.warm_book_cache()
+        
+        # Without Redis the rate limiter admits everything
+        try:
+            await self.rate_limiter.initialize()
+        except Exception as e:
+            print(f"Error connecting rate limiter to Redis: {e}")
+        
+        # Without Redis chat answers each turn on its own
+        try:
+            await self.session_memory.initialize()
+        except Exception as e:
+            print(f"Error connecting session memory to Redis: {e}")
+        
+        # Without Redis chat queries are not logged for the answer store
+        try:
+            await self.query_log.initialize()
+        except Exception as e:
+            print(f"Error connecting query log to Redis: {e}")
+        
+        # Index feedback articles in the background
+        try:
+            await self.indexing_queue.initialize()
+            self.indexing_queue.start()
+        except Exception as e:
+            print(f"Error starting KB indexing queue: {e}")
+        
+        # Keep the vector store in step with BookStack edits
+        if self.knowledge_service.is_configured() and settings.BOOKSTACK_SYNC_INTERVAL_SECONDS > 0:
+            self._sync_task = asyncio.create_task(
+                self.bookstack_sync.run_periodically(settings.BOOKSTACK_SYNC_INTERVAL_SECONDS)
+            )
+    
+    async def _warm_up(self):
+        """Bring up retrieval and generation concurrently, retrying until they succeed"""
+        async def retrieval():
+            delay = 1
+            while not self.rag_service.ready:
+                try:
+                    await self.rag_service.initialize()
+                except Exception as e:
+                    print(f"Error initializing retrieval, retrying in {delay}s: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60)
+            await self.knowledge_service.warm_book_cache()
+        
+        async def generation():
+            delay = 1
+            while not self.llm_service.ready:
+                try:
+                    await self.llm_service.initialize()
+                except Exception as e:
+                    print(f"Error initializing generation: {e}")
+                if not self.llm_service.ready:
+                    print(f"Generation not ready, retrying in {delay}s")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60)
+        
+        await asyncio.gather(retrieval(), generation())
+    
+    def capabilities(self) -> Dict[str, bool]:
+        """Which features are currently usable"""
+        return {
+            "retrieval": self.rag_service.ready,
+            "generation": self.llm_service.ready,
+            "kb_indexing": self.indexing_queue.running
+        }
+    
+    def _check_required(self):
+        missing = []
+        if not self.llm_service.ready:
+            missing.append("llm_service")
+        if self.rag_service.client is None or not self.rag_service.ready:
+            missing.append("rag_service")
+        if missing:
+            raise RuntimeError(f"Required services failed to initialize: {', '.join(missing)}")
+    
+    async def cleanup(self):
+        """Cleanup resources"""
+        # Let background tasks unwind before the clients they use are closed
+        tasks = [task for task in (self._warm_up_task, self._sync_task) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.indexing_queue.cleanup()
+        await self.health_service.cleanup()
+        await self.rate_limiter.cleanup()
+        await self.session_memory.cleanup()
+        await self.query_log.cleanup()
+        await self.llm_service.cleanup()
+        await self.rag_service.cleanup()
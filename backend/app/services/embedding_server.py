@@ -0,0 +1,215 @@
+"""
+Out-of-process embedding server shared by all API workers on a host.
+
+One process owns the SentenceTransformer model and answers encode requests
+over a Unix socket, batching requests that arrive close together. Run it
+next to a multi-worker uvicorn and point the workers at it:
+
+    python -m app.services.embedding_server --socket /tmp/helpdesk-embed.sock &
+    EMBEDDING_SERVER_SOCKET=/tmp/helpdesk-embed.sock uvicorn app.main:app --workers 4
+
+Wire format, both directions: a 4-byte big-endian length followed by a JSON
+header. Requests are {"model": str, "texts": [str]}; responses are
+{"ok": true, "shape": [n, dim]} followed by n*dim float32 values, or
+{"ok": false, "error": str}.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+
+_LENGTH = struct.Struct(">I")
+
+
+class EmbeddingServerError(Exception):
+    pass
+
+
+def _pack(header: Dict) -> bytes:
+    body = json.dumps(header).encode("utf-8")
+    return _LENGTH.pack(len(body)) + body
+
+
+class EmbeddingServer:
+    def __init__(
+        self,
+        socket_path: str,
+        max_batch: int = settings.EMBEDDING_SERVER_MAX_BATCH,
+        max_wait_ms: float = settings.EMBEDDING_SERVER_MAX_WAIT_MS
+    ):
+        self.socket_path = socket_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.models: Dict[str, object] = {}
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def _model(self, name: str):
+        if name not in self.models:
+            from sentence_transformers import SentenceTransformer
+            self.models[name] = SentenceTransformer(name)
+        return self.models[name]
+
+    async def serve(self, preload: Optional[str] = None):
+        """Listen on the Unix socket until cancelled"""
+        if preload:
+            await asyncio.to_thread(self._model, preload)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        batcher = asyncio.create_task(self._batch_loop())
+        print(f"Embedding server listening on {self.socket_path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve encode requests from one client connection"""
+        try:
+            while True:
+                try:
+                    (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+                    request = json.loads(await reader.readexactly(length))
+                except asyncio.IncompleteReadError:
+                    return
+
+                future = asyncio.get_running_loop().create_future()
+                await self.queue.put((request.get("model", settings.EMBEDDING_MODEL), request["texts"], future))
+                try:
+                    vectors = await future
+                    writer.write(_pack({"ok": True, "shape": list(vectors.shape)}))
+                    writer.write(vectors.astype(np.float32).tobytes())
+                except Exception as e:
+                    writer.write(_pack({"ok": False, "error": str(e)}))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def _batch_loop(self):
+        """Coalesce queued requests into batches of up to max_batch texts"""
+        while True:
+            batch = [await self.queue.get()]
+            size = len(batch[0][1])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[1])
+
+            # Requests for different models cannot share a forward pass
+            by_model: Dict[str, List[Tuple[List[str], asyncio.Future]]] = {}
+            for model, texts, future in batch:
+                by_model.setdefault(model, []).append((texts, future))
+
+            for model, items in by_model.items():
+                texts = [text for item_texts, _ in items for text in item_texts]
+                try:
+                    vectors = await asyncio.to_thread(self._encode, model, texts)
+                except Exception as e:
+                    for _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                offset = 0
+                for item_texts, future in items:
+                    if not future.done():
+                        future.set_result(vectors[offset:offset + len(item_texts)])
+                    offset += len(item_texts)
+
+    def _encode(self, model: str, texts: List[str]) -> np.ndarray:
+        return np.asarray(self._model(model).encode(texts, batch_size=self.max_batch))
+
+
+class EmbeddingClient:
+    """Blocking client for the embedding server; one connection per thread"""
+
+    def __init__(self, socket_path: str, model: str, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.model = model
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _recv_exactly(self, sock: socket.socket, size: int) -> bytes:
+        buf = bytearray()
+        while len(buf) < size:
+            chunk = sock.recv(size - len(buf))
+            if not chunk:
+                raise EmbeddingServerError("Embedding server closed the connection")
+            buf.extend(chunk)
+        return bytes(buf)
+
+    def encode(self, texts: List[str], model: Optional[str] = None) -> np.ndarray:
+        """Encode texts on the server; raises OSError or EmbeddingServerError on failure"""
+        sock = self._connection()
+        try:
+            sock.sendall(_pack({"model": model or self.model, "texts": texts}))
+            (length,) = _LENGTH.unpack(self._recv_exactly(sock, _LENGTH.size))
+            header = json.loads(self._recv_exactly(sock, length))
+            if not header["ok"]:
+                raise EmbeddingServerError(header["error"])
+            rows, dim = header["shape"]
+            data = self._recv_exactly(sock, rows * dim * 4)
+            return np.frombuffer(data, dtype=np.float32).reshape(rows, dim)
+        except (OSError, EmbeddingServerError):
+            # Drop the connection so the next call reconnects cleanly
+            self.close()
+            raise
+
+    def close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve embeddings to API workers over a Unix socket")
+    parser.add_argument("--socket", default=settings.EMBEDDING_SERVER_SOCKET or "/tmp/helpdesk-embed.sock")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL, help="Model to load at startup")
+    parser.add_argument("--max-batch", type=int, default=settings.EMBEDDING_SERVER_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=settings.EMBEDDING_SERVER_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    server = EmbeddingServer(args.socket, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    try:
+        asyncio.run(server.serve(preload=args.model))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
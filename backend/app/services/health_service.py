@@ -0,0 +1,128 @@
+import asyncio
+import time
+import httpx
+import redis.asyncio as redis
+from sqlalchemy import text
+from typing import Any, Awaitable, Callable, Dict, Optional
+from ..config import settings
+from ..database import async_engine
+from ..utils.metrics import record_cache
+from .ticket_service import TicketService
+from .knowledge_service import KnowledgeService
+
+class HealthService:
+    """Probe backing services concurrently and cache the report briefly.
+
+    Every probe has its own timeout so one hung dependency cannot stall the
+    whole check, and load balancers polling /health every second only cause
+    one round of probes per HEALTH_CACHE_TTL_SECONDS.
+    """
+
+    # A node is unhealthy if any of these is down; the rest only degrade it
+    REQUIRED_DEPENDENCIES = ("database", "redis", "qdrant", "ollama")
+
+    def __init__(self, ticket_service: TicketService, knowledge_service: KnowledgeService):
+        self.ticket_service = ticket_service
+        self.knowledge_service = knowledge_service
+        self.redis = None
+        self._report: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def check(self, force: bool = False) -> Dict[str, Any]:
+        """Return the cached report, probing again once it has expired"""
+        async with self._lock:
+            stale = force or self._report is None or time.monotonic() - self._checked_at >= settings.HEALTH_CACHE_TTL_SECONDS
+            record_cache("health_report", not stale)
+            if stale:
+                self._report = await self._probe_all()
+                self._checked_at = time.monotonic()
+            return self._report
+
+    async def _probe_all(self) -> Dict[str, Any]:
+        probes: Dict[str, Callable[[], Awaitable[None]]] = {
+            "database": self._probe_database,
+            "redis": self._probe_redis,
+            "qdrant": self._probe_qdrant,
+            "ollama": self._probe_ollama,
+            "zammad": self._probe_zammad
+        }
+        if self.knowledge_service.is_configured():
+            probes["bookstack"] = self._probe_bookstack
+
+        results = await asyncio.gather(*(self._run(probe) for probe in probes.values()))
+        dependencies = dict(zip(probes, results))
+
+        down = {name for name, result in dependencies.items() if result["status"] != "up"}
+        if down & set(self.REQUIRED_DEPENDENCIES):
+            status = "unhealthy"
+        elif down:
+            status = "degraded"
+        else:
+            status = "healthy"
+
+        return {"status": status, "checked_at": time.time(), "dependencies": dependencies}
+
+    async def _run(self, probe: Callable[[], Awaitable[None]]) -> Dict[str, Any]:
+        """Run one probe under the timeout; probes raise on failure"""
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), settings.HEALTH_PROBE_TIMEOUT_SECONDS)
+            result = {"status": "up"}
+        except asyncio.TimeoutError:
+            result = {"status": "down", "error": f"timed out after {settings.HEALTH_PROBE_TIMEOUT_SECONDS}s"}
+        except Exception as e:
+            result = {"status": "down", "error": str(e) or type(e).__name__}
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    async def _probe_database(self) -> None:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def _probe_redis(self) -> None:
+        if self.redis is None:
+            self.redis = redis.from_url(
+                settings.REDIS_URL,
+                socket_connect_timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS,
+                socket_timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS
+            )
+        await self.redis.ping()
+
+    async def _probe_qdrant(self) -> None:
+        # Go through the service's own client, which also covers an in-memory store
+        client = self.knowledge_service.rag_service.client
+        if client is None:
+            raise Exception("not connected")
+        await asyncio.to_thread(client.get_collections)
+
+    async def _probe_ollama(self) -> None:
+        async with httpx.AsyncClient(timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS) as client:
+            response = await client.get(f"{settings.OLLAMA_URL}/api/tags")
+            response.raise_for_status()
+
+        # Ollama answering without our model is as good as down for chat
+        models = [model.get("name", "") for model in response.json().get("models", [])]
+        if not any(name.split(":")[0] == settings.OLLAMA_MODEL.split(":")[0] for name in models):
+            raise Exception(f"model {settings.OLLAMA_MODEL} is not available")
+
+    async def _probe_zammad(self) -> None:
+        headers: Dict[str, str] = {}
+        auth = self.ticket_service._auth(headers)
+        async with httpx.AsyncClient(timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS) as client:
+            response = await client.get(f"{self.ticket_service.zammad_url}/users/me", headers=headers, auth=auth)
+            response.raise_for_status()
+
+    async def _probe_bookstack(self) -> None:
+        async with httpx.AsyncClient(timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS) as client:
+            response = await client.get(
+                f"{self.knowledge_service.bookstack_url}/books",
+                headers=self.knowledge_service._auth_headers(),
+                params={"count": 1}
+            )
+            response.raise_for_status()
+
+    async def cleanup(self):
+        """Cleanup resources"""
+        if self.redis:
+            await self.redis.close()
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+import redis.asyncio as redis
+from typing import Any, Dict, List, Optional
+from ..config import settings
+from .knowledge_service import KnowledgeService
+
+PENDING_KEY = "kb_index:pending"
+DELAYED_KEY = "kb_index:delayed"
+PROCESSING_PREFIX = "kb_index:processing:"
+HEARTBEAT_PREFIX = "kb_index:heartbeat:"
+JOB_PREFIX = "kb_index:job:"
+
+HEARTBEAT_TTL = 30
+HEARTBEAT_INTERVAL = HEARTBEAT_TTL / 3
+
+class IndexingQueue:
+    """Durable Redis queue that turns feedback resolutions into KB articles.
+
+    Jobs live in a hash per job plus a pending list. Each consumer moves the
+    job IDs it claims into its own processing list and keeps a heartbeat key
+    alive, so jobs held by a crashed consumer are put back on the queue by
+    the surviving ones. The heartbeat is refreshed by its own task, so it
+    stays alive while a slow batch is being processed. Failed jobs are
+    retried with exponential backoff.
+    """
+
+    def __init__(self, knowledge_service: KnowledgeService):
+        self.knowledge_service = knowledge_service
+        self.redis = None
+        self.consumer_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._workers: List[asyncio.Task] = []
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._last_recovery = 0.0
+
+    async def initialize(self):
+        """Connect to Redis"""
+        self.redis = redis.from_url(settings.REDIS_URL, decode_responses=True, socket_connect_timeout=5)
+        await self.redis.ping()
+
+    async def enqueue(self, article_data: Dict[str, Any]) -> str:
+        """Queue an article for indexing and return its job ID"""
+        job_id = str(uuid.uuid4())
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(JOB_PREFIX + job_id, mapping={
+                "status": "queued",
+                "article": json.dumps(article_data),
+                "attempts": 0,
+                "created_at": time.time()
+            })
+            pipe.lpush(PENDING_KEY, job_id)
+            await pipe.execute()
+        return job_id
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the status of a job, or None if it is unknown or expired"""
+        job = await self.redis.hgetall(JOB_PREFIX + job_id)
+        if not job:
+            return None
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "attempts": int(job.get("attempts", 0)),
+            "doc_id": job.get("doc_id"),
+            "page_id": int(job["page_id"]) if job.get("page_id") else None,
+            "error": job.get("error")
+        }
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self, workers: Optional[int] = None):
+        """Start the worker pool"""
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        for _ in range(workers or settings.INDEXING_WORKERS):
+            self._workers.append(asyncio.create_task(self._work()))
+
+    async def stop(self):
+        """Stop the worker pool; claimed jobs are recovered after the heartbeat expires"""
+        tasks = self._workers + ([self._heartbeat_task] if self._heartbeat_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat_task = None
+
+    async def cleanup(self):
+        """Cleanup resources"""
+        await self.stop()
+        if self.redis:
+            await self.redis.close()
+
+    async def _heartbeat(self):
+        """Keep this consumer's claims alive, independently of how long a batch takes"""
+        while True:
+            try:
+                await self.redis.set(HEARTBEAT_PREFIX + self.consumer_id, 1, ex=HEARTBEAT_TTL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Indexing heartbeat error: {e}")
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def _work(self):
+        # With FAST_START retrieval comes up in the background; jobs claimed
+        # before then would use up their retries failing to embed
+        while not self.knowledge_service.rag_service.ready:
+            await asyncio.sleep(1)
+        while True:
+            try:
+                await self._recover_orphans()
+                await self._promote_delayed()
+                job_ids = await self._claim_batch()
+                if job_ids:
+                    await self._process(job_ids)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Indexing worker error: {e}")
+                await asyncio.sleep(1)
+
+    async def _claim_batch(self) -> List[str]:
+        """Move up to INDEXING_BATCH_SIZE job IDs into our processing list"""
+        processing_key = PROCESSING_PREFIX + self.consumer_id
+        first = await self.redis.blmove(PENDING_KEY, processing_key, 1, "RIGHT", "LEFT")
+        if first is None:
+            return []
+
+        job_ids = [first]
+        while len(job_ids) < settings.INDEXING_BATCH_SIZE:
+            job_id = await self.redis.lmove(PENDING_KEY, processing_key, "RIGHT", "LEFT")
+            if job_id is None:
+                break
+            job_ids.append(job_id)
+        return job_ids
+
+    async def _process(self, job_ids: List[str]):
+        """Publish and embed a batch of jobs, recording progress per job"""
+        jobs = {}
+        for job_id in job_ids:
+            job = await self.redis.hgetall(JOB_PREFIX + job_id)
+            if job:
+                jobs[job_id] = job
+            else:
+                await self._release(job_id)
+
+        # BookStack pages are created one by one; the page ID is stored on the
+        # job right away so a retry never creates a second page
+        async def publish(job_id: str, job: Dict[str, str]):
+            if job.get("page_id") or not self.knowledge_service.is_configured():
+                return
+            page = await self.knowledge_service.publish_page(json.loads(job["article"]))
+            if page is None:
+                raise Exception("BookStack page creation failed")
+            job["page"] = json.dumps(page)
+            await self.redis.hset(JOB_PREFIX + job_id, mapping={"page_id": page["id"], "page": job["page"]})
+
+        outcomes = await asyncio.gather(
+            *(publish(job_id, job) for job_id, job in jobs.items()),
+            return_exceptions=True
+        )
+        ready = {}
+        for (job_id, job), outcome in zip(jobs.items(), outcomes):
+            if isinstance(outcome, Exception):
+                await self._fail(job_id, job, outcome)
+            else:
+                ready[job_id] = job
+
+        if not ready:
+            return
+
+        # Embed everything that is ready as one batch; the fallback IDs are
+        # derived from the job ID so retried upserts overwrite themselves
+        try:
+            doc_ids = await self.knowledge_service.index_articles(
+                [
+                    (json.loads(job["article"]), json.loads(job["page"]) if job.get("page") else None)
+                    for job in ready.values()
+                ],
+                doc_ids=[str(uuid.uuid5(uuid.NAMESPACE_URL, f"kb_index:{job_id}")) for job_id in ready]
+            )
+        except Exception as e:
+            for job_id, job in ready.items():
+                await self._fail(job_id, job, e)
+            return
+
+        for job_id, doc_id in zip(ready, doc_ids):
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(JOB_PREFIX + job_id, mapping={"status": "done", "doc_id": doc_id, "finished_at": time.time()})
+                pipe.hdel(JOB_PREFIX + job_id, "error")
+                pipe.expire(JOB_PREFIX + job_id, settings.INDEXING_JOB_TTL_SECONDS)
+                pipe.lrem(PROCESSING_PREFIX + self.consumer_id, 1, job_id)
+                await pipe.execute()
+
+    async def _fail(self, job_id: str, job: Dict[str, str], error: Exception):
+        """Schedule a retry with backoff, or give up after INDEXING_MAX_ATTEMPTS"""
+        attempts = int(job.get("attempts", 0)) + 1
+        print(f"Indexing job {job_id} failed (attempt {attempts}): {error}")
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(JOB_PREFIX + job_id, mapping={"attempts": attempts, "error": str(error)})
+            if attempts >= settings.INDEXING_MAX_ATTEMPTS:
+                pipe.hset(JOB_PREFIX + job_id, "status", "failed")
+                pipe.expire(JOB_PREFIX + job_id, settings.INDEXING_JOB_TTL_SECONDS)
+            else:
+                pipe.hset(JOB_PREFIX + job_id, "status", "retrying")
+                pipe.zadd(DELAYED_KEY, {job_id: time.time() + 2 ** attempts})
+            pipe.lrem(PROCESSING_PREFIX + self.consumer_id, 1, job_id)
+            await pipe.execute()
+
+    async def _release(self, job_id: str):
+        await self.redis.lrem(PROCESSING_PREFIX + self.consumer_id, 1, job_id)
+
+    async def _promote_delayed(self):
+        """Move retries whose backoff has elapsed back onto the pending list"""
+        for job_id in await self.redis.zrangebyscore(DELAYED_KEY, 0, time.time()):
+            # Only the consumer that wins the ZREM requeues the job
+            if await self.redis.zrem(DELAYED_KEY, job_id):
+                await self.redis.lpush(PENDING_KEY, job_id)
+
+    async def _recover_orphans(self):
+        """Requeue jobs claimed by consumers whose heartbeat has expired"""
+        if time.monotonic() - self._last_recovery < HEARTBEAT_TTL:
+            return
+        self._last_recovery = time.monotonic()
+        
+        async for key in self.redis.scan_iter(match=PROCESSING_PREFIX + "*"):
+            consumer_id = key[len(PROCESSING_PREFIX):]
+            if consumer_id == self.consumer_id or await self.redis.exists(HEARTBEAT_PREFIX + consumer_id):
+                continue
+            while await self.redis.lmove(key, PENDING_KEY, "RIGHT", "RIGHT") is not None:
+                pass
+            print(f"Requeued indexing jobs of stale consumer {consumer_id}")
@@ -1,35 +1,91 @@
 import httpx
-from typing import List, Dict, Any, Optional
+import asyncio
+import itertools
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
 from ..config import settings
 from .rag_service import RAGService
+from ..utils.text import html_to_text
+from ..utils.metrics import record_cache, record_dependency_error, stage
+import uuid
+
+def bookstack_point_id(page_id: int) -> str:
+    """Stable vector store ID for a BookStack page"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"bookstack:page:{page_id}"))
 
 class KnowledgeService:
-    def __init__(self):
-        self.bookstack_url = "http://bookstack:80/api"
+    def __init__(self, rag_service: RAGService):
+        self.bookstack_url = f"{settings.BOOKSTACK_URL}/api"
         self.bookstack_id = settings.BOOKSTACK_TOKEN_ID if hasattr(settings, 'BOOKSTACK_TOKEN_ID') else None
         self.bookstack_secret = settings.BOOKSTACK_TOKEN_SECRET if hasattr(settings, 'BOOKSTACK_TOKEN_SECRET') else None
-        self.rag_service = RAGService()
+        self.rag_service = rag_service
+        # Book name -> ID cache; the lock keeps concurrent creators from
+        # racing to create the same book
+        self._book_ids: Dict[str, int] = {}
+        self._book_lock = asyncio.Lock()
+        
+    async def warm_book_cache(self):
+        """Load all BookStack book IDs into the cache"""
+        if not (self.bookstack_id and self.bookstack_secret):
+            return
+        
+        async with self._book_lock:
+            async with httpx.AsyncClient() as client:
+                try:
+                    await self._refresh_books(client)
+                    print(f"Cached {len(self._book_ids)} BookStack books")
+                except Exception as e:
+                    print(f"Error warming BookStack book cache: {e}")
         
     async def create_article(self, article_data: Dict[str, Any]) -> str:
         """Create article in both BookStack and vector DB"""
-        # First add to vector database
-        doc_id = await self.rag_service.add_document({
-            "title": article_data["title"],
-            "content": article_data["content"],
-            "department": article_data.get("department", "General"),
-            "category": article_data.get("category", "General"),
-            "metadata": {
+        # First create in BookStack if configured
+        page = None
+        if self.bookstack_id and self.bookstack_secret:
+            page = await self._create_bookstack_page(article_data)
+        
+        # Then add to vector database
+        doc_ids = await self.index_articles([(article_data, page)])
+        return doc_ids[0]
+    
+    async def publish_page(self, article_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Create the BookStack page for an article, returning None on failure"""
+        if not self.is_configured():
+            return None
+        return await self._create_bookstack_page(article_data)
+    
+    async def index_articles(
+        self,
+        articles: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]],
+        doc_ids: Optional[List[Optional[str]]] = None
+    ) -> List[str]:
+        """Embed (article, BookStack page) pairs into the vector DB as one batch.
+        
+        Articles with a page are stored under the page's ID so the BookStack
+        sync updates them instead of adding a second copy; the others use the
+        given doc_ids, or fresh IDs.
+        """
+        doc_ids = doc_ids or [None] * len(articles)
+        documents = []
+        for (article_data, page), doc_id in zip(articles, doc_ids):
+            metadata = {
                 "created_at": datetime.utcnow().isoformat(),
                 "source": "user_query"
             }
-        })
-        
-        # Then create in BookStack if configured
-        if self.bookstack_id and self.bookstack_secret:
-            await self._create_bookstack_page(article_data)
+            if page:
+                doc_id = bookstack_point_id(page["id"])
+                metadata.update({"source": "bookstack", "page_id": page["id"], "book_id": page.get("book_id")})
             
-        return doc_id
+            documents.append({
+                "id": doc_id,
+                "title": article_data["title"],
+                "content": article_data["content"],
+                "department": article_data.get("department", "General"),
+                "category": article_data.get("category", "General"),
+                "metadata": metadata
+            })
+        
+        return await self.rag_service.add_documents(documents)
     
     async def _create_bookstack_page(self, article_data: Dict[str, Any]):
         """Create page in BookStack"""
@@ -39,7 +95,11 @@ class KnowledgeService:
         }
         
         # First, get or create a book
-        book_id = await self._get_or_create_book(article_data.get("department", "General"))
+        book_name = article_data.get("department", "General")
+        book_id = await self._get_or_create_book(book_name)
+        if book_id is None:
+            print(f"Skipping BookStack page, no book for '{book_name}'")
+            return None
         
         page_data = {
             "book_id": book_id,
@@ -57,49 +117,152 @@ class KnowledgeService:
                 )
                 if response.status_code == 200:
                     return response.json()
+                if response.status_code in (404, 422):
+                    # The cached book may have been deleted; look it up again next time
+                    self._book_ids.pop(book_name, None)
+                print(f"BookStack error: {response.status_code} - {response.text}")
             except Exception as e:
                 print(f"Error creating BookStack page: {e}")
                 
-    async def _get_or_create_book(self, name: str) -> int:
+    async def _get_or_create_book(self, name: str) -> Optional[int]:
         """Get or create a BookStack book"""
+        book_id = self._book_ids.get(name)
+        record_cache("bookstack_books", book_id is not None)
+        if book_id is not None:
+            return book_id
+        
         headers = {
             "Authorization": f"Token {self.bookstack_id}:{self.bookstack_secret}"
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                # Try to get existing books
-                response = await client.get(
-                    f"{self.bookstack_url}/books",
-                    headers=headers,
-                    timeout=30.0
-                )
-                if response.status_code == 200:
-                    books = response.json().get("data", [])
-                    for book in books:
-                        if book.get("name") == name:
-                            return book["id"]
-                
-                # Create new book if not found
-                book_data = {"name": name, "description": f"{name} Knowledge Base"}
-                response = await client.post(
-                    f"{self.bookstack_url}/books",
-                    headers=headers,
-                    json=book_data,
-                    timeout=30.0
-                )
-                if response.status_code == 200:
-                    return response.json()["id"]
+        async with self._book_lock:
+            # Another creator may have filled the cache while we waited
+            if name in self._book_ids:
+                return self._book_ids[name]
+            
+            async with httpx.AsyncClient() as client:
+                try:
+                    # Refresh on miss in case the book was created elsewhere
+                    await self._refresh_books(client)
+                    if name in self._book_ids:
+                        return self._book_ids[name]
                     
-            except Exception as e:
-                print(f"Error with BookStack book: {e}")
+                    # Create new book if not found
+                    book_data = {"name": name, "description": f"{name} Knowledge Base"}
+                    response = await client.post(
+                        f"{self.bookstack_url}/books",
+                        headers=headers,
+                        json=book_data,
+                        timeout=30.0
+                    )
+                    if response.status_code == 200:
+                        book_id = response.json()["id"]
+                        self._book_ids[name] = book_id
+                        return book_id
+                    print(f"BookStack error: {response.status_code} - {response.text}")
+                        
+                except Exception as e:
+                    print(f"Error with BookStack book: {e}")
                 
-        return 1  # Default book ID
+        return None
     
-    async def search_bookstack(self, query: str) -> List[Dict[str, Any]]:
-        """Search BookStack for articles"""
-        if not self.bookstack_id:
-            return []
+    async def _refresh_books(self, client: httpx.AsyncClient):
+        """Page through all BookStack books and rebuild the name cache"""
+        headers = {
+            "Authorization": f"Token {self.bookstack_id}:{self.bookstack_secret}"
+        }
+        
+        book_ids: Dict[str, int] = {}
+        offset = 0
+        while True:
+            response = await client.get(
+                f"{self.bookstack_url}/books",
+                params={"count": settings.BOOKSTACK_PAGE_SIZE, "offset": offset, "sort": "+id"},
+                headers=headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            body = response.json()
+            books = body.get("data", [])
+            for book in books:
+                # Keep the oldest book when names collide
+                book_ids.setdefault(book["name"], book["id"])
+            
+            offset += len(books)
+            if not books or offset >= body.get("total", 0):
+                break
+        
+        self._book_ids = book_ids
+    
+    def is_configured(self) -> bool:
+        """Whether BookStack API credentials are set"""
+        return bool(self.bookstack_id and self.bookstack_secret)
+    
+    def _auth_headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Token {self.bookstack_id}:{self.bookstack_secret}"
+        }
+    
+    def book_name(self, book_id: int) -> Optional[str]:
+        """Look up a cached book name by ID"""
+        for name, cached_id in self._book_ids.items():
+            if cached_id == book_id:
+                return name
+        return None
+    
+    async def list_pages(
+        self,
+        client: httpx.AsyncClient,
+        updated_since: Optional[str] = None,
+        offset: int = 0,
+        sort: str = "+updated_at"
+    ) -> Dict[str, Any]:
+        """List one page of BookStack pages, oldest change first by default"""
+        params = {
+            "count": settings.BOOKSTACK_PAGE_SIZE,
+            "offset": offset,
+            "sort": sort
+        }
+        if updated_since:
+            params["filter[updated_at:gte]"] = updated_since
+        
+        response = await client.get(
+            f"{self.bookstack_url}/pages",
+            params=params,
+            headers=self._auth_headers(),
+            timeout=30.0
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    async def get_page(self, client: httpx.AsyncClient, page_id: int) -> Optional[Dict[str, Any]]:
+        """Fetch a BookStack page including its HTML, or None if it is gone"""
+        response = await client.get(
+            f"{self.bookstack_url}/pages/{page_id}",
+            headers=self._auth_headers(),
+            timeout=30.0
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+    
+    async def list_page_ids(self, client: httpx.AsyncClient) -> Set[int]:
+        """Collect the IDs of every page currently in BookStack"""
+        page_ids: Set[int] = set()
+        offset = 0
+        while True:
+            body = await self.list_pages(client, offset=offset, sort="+id")
+            pages = body.get("data", [])
+            page_ids.update(page["id"] for page in pages)
+            offset += len(pages)
+            if not pages or offset >= body.get("total", 0):
+                return page_ids
+    
+    async def search_bookstack(self, query: str, timeout: float = 30.0) -> List[Dict[str, Any]]:
+        """Search BookStack for articles, raising if it is unconfigured, unreachable or errors"""
+        if not self.is_configured():
+            raise Exception("BookStack is not configured")
             
         headers = {
             "Authorization": f"Token {self.bookstack_id}:{self.bookstack_secret}"
@@ -107,15 +270,93 @@ class KnowledgeService:
         
         async with httpx.AsyncClient() as client:
             try:
-                response = await client.get(
-                    f"{self.bookstack_url}/search",
-                    params={"query": query, "type": "page"},
-                    headers=headers,
-                    timeout=30.0
-                )
-                if response.status_code == 200:
-                    return response.json().get("data", [])
-            except Exception as e:
-                print(f"Error searching BookStack: {e}")
-                
-        return []
\ No newline at end of file
+                with stage("bookstack_search"):
+                    response = await client.get(
+                        f"{self.bookstack_url}/search",
+                        params={"query": query, "type": "page"},
+                        headers=headers,
+                        timeout=timeout
+                    )
+                response.raise_for_status()
+            except Exception:
+                record_dependency_error("bookstack")
+                raise
+        return response.json().get("data", [])
+    
+    async def federated_search(
+        self,
+        query: str,
+        limit: int = 5,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Search the vector store and BookStack concurrently under one deadline.
+        
+        Results are merged and deduplicated by source ID. Backends that miss
+        the deadline are listed in "timed_out"; backends that failed, are
+        still starting up or are not configured in "unavailable". Either
+        flags the result as partial.
+        """
+        timeout = settings.KNOWLEDGE_SEARCH_TIMEOUT_SECONDS if timeout is None else timeout
+        tasks = {}
+        if self.is_configured():
+            tasks["bookstack"] = asyncio.create_task(self.search_bookstack(query, timeout=timeout))
+        if self.rag_service.ready:
+            # The vector search embeds and queries synchronously, so run it off the event loop
+            tasks["vector"] = asyncio.create_task(
+                asyncio.to_thread(self.rag_service.search_documents_sync, query, limit)
+            )
+        done, pending = await asyncio.wait(tasks.values(), timeout=timeout) if tasks else (set(), set())
+        for task in pending:
+            task.cancel()
+        
+        def outcome(name: str) -> List[Dict[str, Any]]:
+            task = tasks.get(name)
+            if task is None:
+                return []
+            if task not in done or task.exception():
+                if task in done:
+                    print(f"Error searching {name}: {task.exception()}")
+                return []
+            return task.result()
+        
+        vector_hits = [
+            {
+                "id": hit["id"],
+                "title": hit["title"],
+                "content": hit["content"],
+                "score": hit["score"],
+                "source": "vector"
+            }
+            for hit in outcome("vector")
+        ]
+        bookstack_hits = [
+            {
+                # Synced pages share this ID with their vector store copy
+                "id": bookstack_point_id(hit["id"]),
+                "title": hit.get("name", ""),
+                "content": html_to_text((hit.get("preview_html") or {}).get("content", "")),
+                "score": None,
+                "source": "bookstack"
+            }
+            for hit in outcome("bookstack")
+            if hit.get("type", "page") == "page"
+        ]
+        
+        # Interleave both rankings so neither backend crowds out the other
+        results: Dict[str, Dict[str, Any]] = {}
+        for pair in itertools.zip_longest(vector_hits, bookstack_hits):
+            for hit in pair:
+                if hit and hit["id"] not in results:
+                    results[hit["id"]] = hit
+        
+        timed_out = [name for name, task in tasks.items() if task in pending]
+        unavailable = [
+            name for name in ("vector", "bookstack")
+            if name not in tasks or (tasks[name] in done and tasks[name].exception())
+        ]
+        return {
+            "results": list(results.values())[:limit],
+            "partial": bool(timed_out or unavailable),
+            "timed_out": timed_out,
+            "unavailable": unavailable
+        }
\ No newline at end of file
@@ -1,85 +1,94 @@
 import httpx
-from langchain.llms.base import LLM
-from langchain.callbacks.manager import CallbackManagerForLLMRun
-from typing import Optional, List, Any
-import json
 from ..config import settings
-
-class OllamaLLM(LLM):
-    """Custom Ollama LLM wrapper for Langchain"""
-    
-    model: str = "llama3.1:8b-instruct-q4_0"
-    base_url: str = "http://ollama:11434"
-    
-    @property
-    def _llm_type(self) -> str:
-        return "ollama"
-    
-    def _call(
-        self,
-        prompt: str,
-        stop: Optional[List[str]] = None,
-        run_manager: Optional[CallbackManagerForLLMRun] = None,
-        **kwargs: Any,
-    ) -> str:
-        headers = {"Content-Type": "application/json"}
-        data = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": False
-        }
-        if stop:
-            data["stop"] = stop
-            
-        with httpx.Client() as client:
-            response = client.post(
-                f"{self.base_url}/api/generate",
-                headers=headers,
-                json=data,
-                timeout=60.0
-            )
-            response.raise_for_status()
-            return response.json()["response"]
+from ..utils.metrics import stage
 
 class LLMService:
     def __init__(self):
-        self.llm = None
         self.model_name = settings.OLLAMA_MODEL
+        # Set once the model is pulled and loaded by Ollama
+        self.ready = False
         
     async def initialize(self):
         """Initialize the LLM service and download model if needed"""
-        self.llm = OllamaLLM(
-            model=self.model_name,
-            base_url=settings.OLLAMA_URL
-        )
-        
-        # Pull model if not exists
+        await self.warm_up()
+    
+    async def warm_up(self) -> bool:
+        """Pull the model if needed and load it into Ollama's memory"""
         async with httpx.AsyncClient() as client:
             try:
+                # Pull model if not exists
                 response = await client.post(
                     f"{settings.OLLAMA_URL}/api/pull",
-                    json={"name": self.model_name},
+                    json={"name": self.model_name, "stream": False},
+                    timeout=300.0
+                )
+                response.raise_for_status()
+                
+                # An empty prompt makes Ollama load the model without generating
+                response = await client.post(
+                    f"{settings.OLLAMA_URL}/api/generate",
+                    json={"model": self.model_name, "prompt": ""},
                     timeout=300.0
                 )
+                response.raise_for_status()
+                self.ready = True
                 print(f"Model {self.model_name} ready")
             except Exception as e:
                 print(f"Error pulling model: {e}")
+        return self.ready
+    
+    async def _generate(self, prompt: str, timeout: float = 60.0) -> str:
+        """Run a non-streaming Ollama completion without blocking the event loop"""
+        with stage("ollama_generate", dependency="ollama"):
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    f"{settings.OLLAMA_URL}/api/generate",
+                    json={"model": self.model_name, "prompt": prompt, "stream": False},
+                    timeout=timeout
+                )
+                response.raise_for_status()
+                return response.json()["response"]
     
-    async def generate_response(self, prompt: str, context: str = "") -> str:
+    async def generate_response(
+        self,
+        prompt: str,
+        context: str = "",
+        timeout: float = 60.0,
+        history: str = ""
+    ) -> str:
         """Generate response using the LLM"""
-        if not self.llm:
+        if not self.ready:
             raise Exception("LLM not initialized")
-            
-        full_prompt = f"""You are an AI helpdesk assistant for an organization. 
-        You help with IT, HR, and Finance queries. Be helpful, concise, and professional.
         
-        Context: {context}
+        lines = [
+            "You are an AI helpdesk assistant for an organization.",
+            "You help with IT, HR, and Finance queries. Be helpful, concise, and professional.",
+            "",
+            f"Context: {context}",
+            ""
+        ]
+        if history:
+            lines += ["Conversation so far:", history, ""]
+        lines += [f"User Query: {prompt}", "", "Response:"]
         
-        User Query: {prompt}
-        
-        Response:"""
+        return await self._generate("\n".join(lines), timeout=timeout)
+    
+    async def summarize(self, summary: str, transcript: str, timeout: float = 60.0) -> str:
+        """Fold new conversation turns into a running summary"""
+        prompt = "\n".join([
+            "Update the summary of a helpdesk conversation with the new messages.",
+            "Keep the user's problem, what was tried and any ticket numbers. "
+            "Reply with the summary only, in at most five sentences.",
+            "",
+            f"Current summary: {summary or '(none)'}",
+            "",
+            "New messages:",
+            transcript,
+            "",
+            "Updated summary:"
+        ])
         
-        return self.llm(full_prompt)
+        return await self._generate(prompt, timeout=timeout)
     
     async def classify_department(self, query: str) -> str:
         """Classify query to appropriate department"""
@@ -90,7 +99,7 @@ class LLMService:
         
         Department:"""
         
-        response = self.llm(prompt).strip()
+        response = (await self._generate(prompt)).strip()
         
         # Validate response
         valid_departments = ["IT", "HR", "Finance", "Operations", "Security"]
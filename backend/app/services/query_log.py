@@ -0,0 +1,89 @@
+import asyncio
+import random
+import numpy as np
+import redis.asyncio as redis
+from typing import Any, AsyncIterator, Dict, List, Optional
+from ..config import settings
+from ..utils.pii import scrub_pii
+from .rag_service import RAGService
+
+STREAM_KEY = "query_log"
+
+class QueryLog:
+    """Capped Redis stream of chat queries, for finding recurring intents offline.
+
+    Entries hold the PII-scrubbed query, its department, the embedding
+    model and the embedding of the scrubbed query as float16 (768 bytes
+    for a 384-dim model). No user or session IDs are kept. The stream is
+    trimmed to about QUERY_LOG_MAX_ENTRIES.
+    """
+
+    def __init__(self, rag_service: RAGService):
+        self.rag_service = rag_service
+        self.redis = None
+
+    async def initialize(self):
+        """Connect to Redis"""
+        client = redis.from_url(settings.REDIS_URL, socket_connect_timeout=5)
+        await client.ping()
+        self.redis = client
+
+    async def record(
+        self,
+        query: str,
+        department: str,
+        model: str,
+        embedding: List[float],
+        precomputed: bool = False
+    ):
+        """Append a query; meant to run as a background task after the response is sent.
+
+        `embedding` is the request's own embedding of the raw query. When
+        scrubbing or truncation changed the text, the stored text is
+        encoded again so the log holds nothing derived from what was removed.
+        """
+        if self.redis is None or not settings.QUERY_LOG_ENABLED:
+            return
+        if settings.QUERY_LOG_SAMPLE_RATE < 1 and random.random() >= settings.QUERY_LOG_SAMPLE_RATE:
+            return
+        text = scrub_pii(query[:settings.QUERY_LOG_MAX_CHARS])
+        try:
+            if text != query:
+                embedding = await asyncio.to_thread(self.rag_service.create_embedding, text, model)
+            await self.redis.xadd(
+                STREAM_KEY,
+                {
+                    "q": text,
+                    "d": department,
+                    "m": model,
+                    "e": np.asarray(embedding, dtype=np.float16).tobytes(),
+                    "p": int(precomputed)
+                },
+                maxlen=settings.QUERY_LOG_MAX_ENTRIES,
+                approximate=True
+            )
+        except Exception as e:
+            print(f"Error recording query: {e}")
+
+    async def entries(self, since_ms: int = 0, batch: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """Yield logged queries from a Unix time in milliseconds onwards, oldest first"""
+        start: Optional[str] = f"{since_ms}-0"
+        while start:
+            rows = await self.redis.xrange(STREAM_KEY, min=start, count=batch)
+            for entry_id, fields in rows:
+                yield {
+                    "id": entry_id.decode(),
+                    "timestamp_ms": int(entry_id.split(b"-")[0]),
+                    "query": fields[b"q"].decode(),
+                    "department": fields[b"d"].decode(),
+                    "model": fields[b"m"].decode(),
+                    "embedding": np.frombuffer(fields[b"e"], dtype=np.float16).astype(np.float32),
+                    "precomputed": fields.get(b"p") == b"1"
+                }
+            # Exclusive range start continues after the last entry read
+            start = f"({rows[-1][0].decode()}" if len(rows) == batch else None
+
+    async def cleanup(self):
+        """Cleanup resources"""
+        if self.redis:
+            await self.redis.close()
@@ -1,44 +1,333 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
-from sentence_transformers import SentenceTransformer
-import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator, NamedTuple, Tuple, TYPE_CHECKING
+import asyncio
+import threading
+import time
 import uuid
 from ..config import settings
+from ..utils.metrics import record_dependency_error, stage
+
+# qdrant_client and sentence_transformers (which pulls in torch) are slow to
+# import, so they are imported where first used rather than at module load
+if TYPE_CHECKING:
+    from qdrant_client.models import PointStruct
+
+COLLECTION_SEPARATOR = "--"
+
+def versioned_collection_name(base: str, model: str, dimension: int) -> str:
+    """Collection for one embedding model, e.g. helpdesk_docs--sentence-transformers__all-MiniLM-L6-v2--384"""
+    return COLLECTION_SEPARATOR.join([base, model.replace("/", "__"), str(dimension)])
+
+def parse_collection_name(name: str) -> Optional[Tuple[str, str, int]]:
+    """Split a versioned collection name into (base, model, dimension)"""
+    try:
+        base, rest = name.split(COLLECTION_SEPARATOR, 1)
+        model, dimension = rest.rsplit(COLLECTION_SEPARATOR, 1)
+        return base, model.replace("__", "/"), int(dimension)
+    except ValueError:
+        return None
+
+class ActiveIndex(NamedTuple):
+    """Collections being served and the model their vectors come from"""
+    collection: str
+    ticket_collection: str
+    model: str
+    dimension: int
 
 class RAGService:
+    """Retrieval over the knowledge base in Qdrant.
+    
+    QDRANT_COLLECTION is an alias for a versioned collection named after
+    the embedding model and its dimension. The service serves whatever the
+    alias points to, with that collection's model: when scripts/reindex.py
+    moves the alias, the new model is loaded in the background and the
+    service swaps over once it is ready.
+    """
+    
     def __init__(self):
         self.client = None
-        self.embedder = None
-        self.collection_name = settings.QDRANT_COLLECTION
-        
+        self.embedders: Dict[str, Any] = {}
+        self.embedding_client = None
+        self.ready = False
+        self.alias = settings.QDRANT_COLLECTION
+        self.active: Optional[ActiveIndex] = None
+        self._embedder_lock = threading.Lock()
+        self._server_retry_at = 0.0
+        self._alias_lock = threading.Lock()
+        self._alias_checked_at = time.monotonic()
+        # Models swapped out by an alias move -> when, kept until their requests finish
+        self._retired: Dict[str, float] = {}
+    
+    @property
+    def collection_name(self) -> str:
+        return self.active.collection
+    
+    @property
+    def ticket_collection_name(self) -> str:
+        return self.active.ticket_collection
+    
+    @property
+    def model_name(self) -> str:
+        return self.active.model if self.active else settings.EMBEDDING_MODEL
+    
     async def initialize(self):
         """Initialize RAG service with Qdrant and embeddings"""
-        self.client = QdrantClient(url=settings.QDRANT_URL)
-        self.embedder = SentenceTransformer(settings.EMBEDDING_MODEL)
+        # Loading the model and talking to Qdrant block, so keep them off the event loop
+        await asyncio.to_thread(self._initialize_sync)
+        self.ready = True
+    
+    def _initialize_sync(self):
+        # With a shared embedding server the model is only loaded in-process
+        # if the server turns out to be unreachable
+        if settings.EMBEDDING_SERVER_SOCKET:
+            from .embedding_server import EmbeddingClient
+            self.embedding_client = EmbeddingClient(
+                settings.EMBEDDING_SERVER_SOCKET,
+                settings.EMBEDDING_MODEL,
+                timeout=settings.EMBEDDING_SERVER_TIMEOUT_SECONDS
+            )
+        self.connect()
+        self._encode(["warm-up"])
+    
+    def connect(self):
+        """Connect to Qdrant and resolve the collections to serve.
+        
+        The embedding model is only loaded here if the collection for it
+        has to be created and its dimension is needed.
+        """
+        from qdrant_client import QdrantClient
+        
+        # QDRANT_URL=":memory:" runs an in-process store, as the load tests do
+        self.client = QdrantClient(location=settings.QDRANT_URL)
+        self.active = self._resolve_active()
+        
+        # Create collections if not exists
+        self._ensure_collection(self.active.collection, self.active.dimension)
+        self._ensure_collection(self.active.ticket_collection, self.active.dimension)
+    
+    def _active_index(self, collection: str, model: str, dimension: int) -> ActiveIndex:
+        # Open tickets are short-lived, so each model simply gets its own index
+        ticket_collection = versioned_collection_name(settings.QDRANT_TICKET_COLLECTION, model, dimension)
+        return ActiveIndex(collection, ticket_collection, model, dimension)
+    
+    def alias_target(self, alias: str) -> Optional[str]:
+        """Collection an alias points to, if the alias exists"""
+        for entry in self.client.get_aliases().aliases:
+            if entry.alias_name == alias:
+                return entry.collection_name
+        return None
+    
+    def _resolve_active(self) -> ActiveIndex:
+        """Follow the alias, creating the first versioned collection if there is none"""
+        from qdrant_client.models import CreateAlias, CreateAliasOperation
         
-        # Create collection if not exists
+        target = self.alias_target(self.alias)
+        if target is None and self.client.collection_exists(self.alias):
+            # A plain collection from before versioning; scripts/reindex.py switch migrates it
+            print(f"Collection {self.alias} is not versioned yet; serving it directly until it is reindexed")
+            dimension = self.client.get_collection(self.alias).config.params.vectors.size
+            return self._active_index(self.alias, settings.EMBEDDING_MODEL, dimension)
+        
+        if target is None:
+            dimension = self.embedding_dimension(settings.EMBEDDING_MODEL)
+            target = versioned_collection_name(self.alias, settings.EMBEDDING_MODEL, dimension)
+            self._ensure_collection(target, dimension)
+            try:
+                self.client.update_collection_aliases(change_aliases_operations=[
+                    CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=self.alias))
+                ])
+            except Exception as e:
+                # Another worker starting at the same time may have won
+                print(f"Could not create alias {self.alias}: {e}")
+            target = self.alias_target(self.alias) or target
+        
+        parsed = parse_collection_name(target)
+        if parsed is None:
+            raise ValueError(f"Alias {self.alias} points to {target}, which is not a versioned collection")
+        _, model, dimension = parsed
+        if model != settings.EMBEDDING_MODEL:
+            print(f"Alias {self.alias} points to {target}; using its model {model} instead of EMBEDDING_MODEL")
+        return self._active_index(target, model, dimension)
+    
+    def _maybe_follow_alias(self):
+        """Check the alias every QDRANT_ALIAS_REFRESH_SECONDS without blocking the caller"""
+        if time.monotonic() < self._alias_checked_at + settings.QDRANT_ALIAS_REFRESH_SECONDS:
+            return
+        if not self._alias_lock.acquire(blocking=False):
+            return
+        self._alias_checked_at = time.monotonic()
+        threading.Thread(target=self._follow_alias, daemon=True).start()
+    
+    def _follow_alias(self):
+        """Swap to the collection the alias points to once its model is loaded"""
+        try:
+            self._release_retired()
+            target = self.alias_target(self.alias)
+            parsed = parse_collection_name(target) if target else None
+            if parsed is None or target == self.active.collection:
+                return
+            _, model, dimension = parsed
+            active = self._active_index(target, model, dimension)
+            
+            # Requests keep using the old collection and model until both are ready
+            self._encode(["warm-up"], model)
+            self._ensure_collection(active.ticket_collection, dimension)
+            self.active = active
+            print(f"Now serving collection {target}")
+            
+            # Requests that captured the old index may still embed with its model
+            self._release_retired()
+        except Exception as e:
+            record_dependency_error("qdrant")
+            print(f"Error following alias {self.alias}: {e}")
+        finally:
+            self._alias_lock.release()
+    
+    def _release_retired(self):
+        """Retire embedders of models no longer served, dropping them one alias check later"""
+        now = time.monotonic()
+        self._retired.pop(self.active.model, None)
+        for name in list(self.embedders):
+            if name != self.active.model:
+                self._retired.setdefault(name, now)
+        for name, retired_at in list(self._retired.items()):
+            if retired_at <= now - settings.QDRANT_ALIAS_REFRESH_SECONDS:
+                self.embedders.pop(name, None)
+                del self._retired[name]
+    
+    def _ensure_collection(self, name: str, dimension: int):
+        """Create a collection if it does not exist yet, or apply changed index settings"""
+        from qdrant_client.models import Distance, VectorParams
+        
+        hnsw_config, optimizers_config = self._index_config()
         try:
-            self.client.get_collection(self.collection_name)
+            config = self.client.get_collection(name).config
         except:
             self.client.create_collection(
-                collection_name=self.collection_name,
+                collection_name=name,
                 vectors_config=VectorParams(
-                    size=384,  # all-MiniLM-L6-v2 dimension
+                    size=dimension,
                     distance=Distance.COSINE
-                )
+                ),
+                hnsw_config=hnsw_config,
+                optimizers_config=optimizers_config
+            )
+            return
+        
+        current = (
+            config.hnsw_config.m, config.hnsw_config.ef_construct, config.hnsw_config.full_scan_threshold,
+            config.optimizer_config.indexing_threshold, config.optimizer_config.default_segment_number
+        )
+        wanted = (
+            hnsw_config.m, hnsw_config.ef_construct, hnsw_config.full_scan_threshold,
+            optimizers_config.indexing_threshold, optimizers_config.default_segment_number
+        )
+        if current != wanted:
+            # Qdrant rebuilds the index in the background; search keeps working meanwhile
+            print(f"Updating index settings of collection {name}: {current} -> {wanted}")
+            self.client.update_collection(
+                collection_name=name,
+                hnsw_config=hnsw_config,
+                optimizers_config=optimizers_config
             )
     
-    def create_embedding(self, text: str) -> List[float]:
+    def _index_config(self):
+        """HNSW and optimizer settings for new and existing collections"""
+        from qdrant_client.models import HnswConfigDiff, OptimizersConfigDiff
+        
+        return (
+            HnswConfigDiff(
+                m=settings.QDRANT_HNSW_M,
+                ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT,
+                full_scan_threshold=settings.QDRANT_HNSW_FULL_SCAN_THRESHOLD
+            ),
+            OptimizersConfigDiff(
+                indexing_threshold=settings.QDRANT_INDEXING_THRESHOLD,
+                default_segment_number=settings.QDRANT_DEFAULT_SEGMENT_NUMBER
+            )
+        )
+    
+    def _search_params(self):
+        """Search-time HNSW settings"""
+        from qdrant_client.models import SearchParams
+        
+        return SearchParams(hnsw_ef=settings.QDRANT_SEARCH_EF, exact=settings.QDRANT_SEARCH_EXACT)
+    
+    def _load_embedder(self, model: str):
+        """Load an embedding model in this process, once"""
+        with self._embedder_lock:
+            if model not in self.embedders:
+                from sentence_transformers import SentenceTransformer
+                self.embedders[model] = SentenceTransformer(model)
+        return self.embedders[model]
+    
+    def _encode(self, texts: List[str], model: Optional[str] = None):
+        """Encode on the embedding server if configured, else in-process"""
+        model = model or self.model_name
+        if self.embedding_client and time.monotonic() >= self._server_retry_at:
+            from .embedding_server import EmbeddingServerError
+            try:
+                return self.embedding_client.encode(texts, model)
+            except (OSError, EmbeddingServerError) as e:
+                record_dependency_error("embedding_server")
+                # Encode locally for a while instead of failing every request
+                print(f"Embedding server unavailable, encoding in-process: {e}")
+                self._server_retry_at = time.monotonic() + settings.EMBEDDING_SERVER_RETRY_SECONDS
+        
+        embedder = self.embedders.get(model) or self._load_embedder(model)
+        return embedder.encode(texts, batch_size=settings.EMBEDDING_BATCH_SIZE)
+    
+    def embedding_dimension(self, model: str) -> int:
+        """Vector size produced by a model"""
+        return len(self._encode(["dimension"], model)[0])
+    
+    def create_embedding(self, text: str, model: Optional[str] = None) -> List[float]:
         """Create embedding for text"""
-        return self.embedder.encode(text).tolist()
+        with stage("embedding", dependency="embedding"):
+            return self._encode([text], model)[0].tolist()
+    
+    def create_embeddings(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """Create embeddings for several texts in one batch"""
+        with stage("embedding_batch", dependency="embedding"):
+            return self._encode(texts, model).tolist()
     
     async def add_document(self, document: Dict[str, Any]) -> str:
         """Add document to vector store"""
-        doc_id = str(uuid.uuid4())
-        embedding = self.create_embedding(document["content"])
+        doc_ids = await self.add_documents([{**document, "id": None}])
+        return doc_ids[0]
+    
+    async def add_documents(self, documents: List[Dict[str, Any]], active: Optional[ActiveIndex] = None) -> List[str]:
+        """Add documents to vector store, embedding them as one batch.
         
-        point = PointStruct(
+        Documents carrying an "id" are upserted under that ID, which makes
+        re-adding the same source document idempotent.
+        """
+        if not documents:
+            return []
+        # Batch encoding and the upsert block, so keep them off the event loop
+        return await asyncio.to_thread(self.add_documents_sync, documents, active)
+    
+    def add_documents_sync(self, documents: List[Dict[str, Any]], active: Optional[ActiveIndex] = None) -> List[str]:
+        """Blocking variant of add_documents, for running in a worker thread"""
+        self._maybe_follow_alias()
+        active = active or self.active
+        doc_ids = [str(document.get("id") or uuid.uuid4()) for document in documents]
+        embeddings = self.create_embeddings([document["content"] for document in documents], active.model)
+        
+        self.client.upsert(
+            collection_name=active.collection,
+            points=[
+                self._document_point(doc_id, embedding, document)
+                for doc_id, embedding, document in zip(doc_ids, embeddings, documents)
+            ]
+        )
+        
+        return doc_ids
+    
+    def _document_point(self, doc_id: str, embedding: List[float], document: Dict[str, Any]) -> "PointStruct":
+        """Build the Qdrant point for a knowledge base document"""
+        from qdrant_client.models import PointStruct
+        
+        return PointStruct(
             id=doc_id,
             vector=embedding,
             payload={
@@ -49,40 +338,96 @@ class RAGService:
                 "metadata": document.get("metadata", {})
             }
         )
+    
+    async def delete_documents(self, doc_ids: List[str], active: Optional[ActiveIndex] = None):
+        """Remove documents from vector store"""
+        from qdrant_client.models import PointIdsList
         
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=[point]
+        if not doc_ids:
+            return
+        active = active or self.active
+        await asyncio.to_thread(
+            self.client.delete,
+            collection_name=active.collection,
+            points_selector=PointIdsList(points=doc_ids)
         )
+    
+    def iter_document_metadata(self, source: str, active: Optional[ActiveIndex] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (id, metadata) for every document imported from a source"""
+        from qdrant_client.models import Filter, FieldCondition, MatchValue
         
-        return doc_id
+        collection = (active or self.active).collection
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection,
+                scroll_filter=Filter(must=[
+                    FieldCondition(key="metadata.source", match=MatchValue(value=source))
+                ]),
+                limit=256,
+                offset=offset,
+                with_payload=["metadata"],
+                with_vectors=False
+            )
+            for point in points:
+                yield str(point.id), (point.payload or {}).get("metadata", {})
+            if offset is None:
+                break
     
     async def search_documents(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Search for relevant documents"""
-        query_embedding = self.create_embedding(query)
-        
-        results = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=query_embedding,
-            limit=limit
-        )
+        return self.search_documents_sync(query, limit)
+    
+    def search_documents_sync(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Blocking variant of search_documents, for running in a worker thread"""
+        active, query_embedding = self.query_embedding(query)
+        return self.search_by_embedding(query_embedding, active, limit)
+    
+    def query_embedding(self, query: str) -> Tuple[ActiveIndex, List[float]]:
+        """Embed a query with the model of the index being served, returning both"""
+        self._maybe_follow_alias()
+        active = self.active
+        return active, self.create_embedding(query, active.model)
+    
+    def search_by_embedding(self, embedding: List[float], active: ActiveIndex, limit: int = 5) -> List[Dict[str, Any]]:
+        """Search with an embedding from query_embedding"""
+        with stage("qdrant_search", dependency="qdrant"):
+            results = self.client.search(
+                collection_name=active.collection,
+                query_vector=embedding,
+                search_params=self._search_params(),
+                limit=limit
+            )
         
-        return [
-            {
-                "id": str(result.id),
-                "score": result.score,
-                "content": result.payload["content"],
-                "title": result.payload.get("title", ""),
-                "category": result.payload.get("category", ""),
-                "department": result.payload.get("department", "")
-            }
-            for result in results
-        ]
+        return [self._document_result(str(result.id), result.payload, result.score) for result in results]
+    
+    def get_documents(self, doc_ids: List[str], active: ActiveIndex) -> Dict[str, Dict[str, Any]]:
+        """Fetch documents by ID; missing IDs are left out"""
+        with stage("qdrant_retrieve", dependency="qdrant"):
+            points = self.client.retrieve(
+                collection_name=active.collection,
+                ids=doc_ids,
+                with_payload=True,
+                with_vectors=False
+            )
+        return {str(point.id): self._document_result(str(point.id), point.payload) for point in points}
+    
+    def _document_result(self, doc_id: str, payload: Dict[str, Any], score: Optional[float] = None) -> Dict[str, Any]:
+        return {
+            "id": doc_id,
+            "score": score,
+            "content": payload["content"],
+            "title": payload.get("title", ""),
+            "category": payload.get("category", ""),
+            "department": payload.get("department", "")
+        }
     
     async def get_context(self, query: str) -> str:
         """Get relevant context for query"""
-        results = await self.search_documents(query, limit=3)
-        
+        return self.format_context(await self.search_documents(query, limit=3))
+    
+    def format_context(self, results: List[Dict[str, Any]]) -> str:
+        """Render search results as prompt context"""
         if not results:
             return "No relevant information found in the knowledge base."
         
@@ -92,7 +437,98 @@ class RAGService:
         
         return context
     
+    def _ticket_point_id(self, ticket_id: str) -> str:
+        """Map a ticket ID onto a stable Qdrant point ID"""
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"ticket:{ticket_id}"))
+    
+    async def index_open_ticket(self, ticket_id: str, embedding: List[float], active: ActiveIndex, department: str):
+        """Add an open ticket to the similarity index of the model that embedded it"""
+        from qdrant_client.models import PointStruct
+        
+        now = time.time()
+        point = PointStruct(
+            id=self._ticket_point_id(ticket_id),
+            vector=embedding,
+            payload={
+                "ticket_id": ticket_id,
+                "department": department,
+                "created_at": now,
+                "last_seen_at": now
+            }
+        )
+        await asyncio.to_thread(
+            self.client.upsert,
+            collection_name=active.ticket_collection,
+            points=[point]
+        )
+    
+    async def find_similar_open_ticket(
+        self,
+        embedding: List[float],
+        active: ActiveIndex,
+        department: str,
+        window_seconds: float,
+        threshold: float
+    ) -> Optional[Dict[str, Any]]:
+        """Find an open ticket in the same department seen within the window"""
+        from qdrant_client.models import Filter, FieldCondition, MatchValue, Range
+        
+        with stage("qdrant_ticket_search", dependency="qdrant"):
+            results = await asyncio.to_thread(
+                self.client.search,
+                collection_name=active.ticket_collection,
+                query_vector=embedding,
+                query_filter=Filter(must=[
+                    FieldCondition(key="department", match=MatchValue(value=department)),
+                    FieldCondition(key="last_seen_at", range=Range(gte=time.time() - window_seconds))
+                ]),
+                score_threshold=threshold,
+                search_params=self._search_params(),
+                limit=1
+            )
+        
+        if not results:
+            return None
+        return {
+            "ticket_id": results[0].payload["ticket_id"],
+            "score": results[0].score
+        }
+    
+    async def touch_open_ticket(self, ticket_id: str, active: ActiveIndex):
+        """Extend the duplicate window of an open ticket that received a new report"""
+        await asyncio.to_thread(
+            self.client.set_payload,
+            collection_name=active.ticket_collection,
+            payload={"last_seen_at": time.time()},
+            points=[self._ticket_point_id(ticket_id)]
+        )
+    
+    async def remove_open_ticket(self, ticket_id: str, active: Optional[ActiveIndex] = None):
+        """Drop a resolved ticket from the similarity index"""
+        from qdrant_client.models import PointIdsList
+        
+        active = active or self.active
+        await asyncio.to_thread(
+            self.client.delete,
+            collection_name=active.ticket_collection,
+            points_selector=PointIdsList(points=[self._ticket_point_id(ticket_id)])
+        )
+    
+    async def prune_open_tickets(self, active: ActiveIndex, older_than_seconds: float):
+        """Drop tickets that have not been seen within the given age"""
+        from qdrant_client.models import Filter, FieldCondition, Range, FilterSelector
+        
+        await asyncio.to_thread(
+            self.client.delete,
+            collection_name=active.ticket_collection,
+            points_selector=FilterSelector(filter=Filter(must=[
+                FieldCondition(key="last_seen_at", range=Range(lt=time.time() - older_than_seconds))
+            ]))
+        )
+    
     async def cleanup(self):
         """Cleanup resources"""
+        if self.embedding_client:
+            self.embedding_client.close()
         if self.client:
             self.client.close()
\ No newline at end of file
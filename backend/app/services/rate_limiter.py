@@ -0,0 +1,137 @@
+import math
+import random
+import redis.asyncio as redis
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from ..config import settings
+from ..utils.metrics import record_dependency_error
+
+BUCKET_PREFIX = "rate_limit:"
+
+# Checks every bucket and takes `cost` tokens from all of them, or from
+# none if any is short. Redis TIME keeps buckets consistent across nodes.
+# KEYS: bucket keys; ARGV: rate, capacity, cost per key.
+# Returns {allowed, seconds to wait} with the wait as a string (Lua
+# numbers would be truncated to integers in the reply).
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tokens = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 3 - 2])
+    local capacity = tonumber(ARGV[i * 3 - 1])
+    local cost = tonumber(ARGV[i * 3])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    available = math.min(capacity, available + math.max(0, now - ts) * rate)
+    tokens[i] = available
+    if available < cost then
+        wait = math.max(wait, (cost - available) / rate)
+    end
+end
+if wait > 0 then
+    return {0, tostring(wait)}
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 3 - 2])
+    local capacity = tonumber(ARGV[i * 3 - 1])
+    local cost = tonumber(ARGV[i * 3])
+    redis.call('HSET', key, 'tokens', tostring(tokens[i] - cost), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+end
+return {1, '0'}
+"""
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    retry_after: float = 0.0
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value in whole seconds, at least 1"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+class RateLimiter:
+    """Distributed per-user and global token buckets kept in Redis.
+
+    A request is admitted only if both its user's bucket and the global
+    bucket hold enough tokens for its cost. If Redis is unreachable the
+    limiter fails open rather than taking the chat API down with it.
+    """
+
+    def __init__(self):
+        self.redis = None
+        self._script = None
+
+    async def initialize(self):
+        """Connect to Redis and register the bucket script"""
+        self.redis = redis.from_url(settings.REDIS_URL, socket_connect_timeout=5, socket_timeout=1)
+        self._script = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+        await self.redis.ping()
+
+    def _buckets(self, identity: str, cost: float) -> List[Tuple[str, float, float, float]]:
+        buckets = []
+        for key, rate, capacity in (
+            (f"user:{identity}", settings.RATE_LIMIT_USER_RATE, settings.RATE_LIMIT_USER_BURST),
+            ("global", settings.RATE_LIMIT_GLOBAL_RATE, settings.RATE_LIMIT_GLOBAL_BURST)
+        ):
+            # A cost above the burst size could never be admitted
+            buckets.append((BUCKET_PREFIX + key, rate, capacity, min(cost, capacity)))
+        return buckets
+
+    async def acquire(self, identity: str, cost: float) -> RateLimitDecision:
+        """Take `cost` tokens for `identity`, or report how long to wait"""
+        if not settings.RATE_LIMIT_ENABLED or self._script is None:
+            return RateLimitDecision(allowed=True)
+
+        buckets = self._buckets(identity, cost)
+        args: List[float] = []
+        for _, rate, capacity, bucket_cost in buckets:
+            args.extend([rate, capacity, bucket_cost])
+        try:
+            allowed, wait = await self._script(keys=[bucket[0] for bucket in buckets], args=args)
+        except Exception as e:
+            record_dependency_error("redis")
+            print(f"Rate limiter unavailable, admitting request: {e}")
+            return RateLimitDecision(allowed=True)
+        return RateLimitDecision(allowed=bool(int(allowed)), retry_after=float(wait))
+
+    async def cleanup(self):
+        """Cleanup resources"""
+        if self.redis:
+            await self.redis.close()
+
+class LoadShedder:
+    """Shed generation work while Ollama is responding slowly.
+
+    Keeps an exponentially weighted moving average of generation latency.
+    Above LOAD_SHED_LATENCY_SECONDS a growing share of requests is served
+    retrieval-only: the share rises linearly and reaches all requests at
+    twice the threshold. State is per process, as each worker sees the
+    same backend.
+    """
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+
+    def observe(self, seconds: float):
+        """Record the latency of one generation call"""
+        alpha = settings.LOAD_SHED_EWMA_ALPHA
+        self.latency = seconds if self.latency is None else alpha * seconds + (1 - alpha) * self.latency
+
+    def shed_probability(self) -> float:
+        threshold = settings.LOAD_SHED_LATENCY_SECONDS
+        if self.latency is None or threshold <= 0 or self.latency <= threshold:
+            return 0.0
+        return min(1.0, (self.latency - threshold) / threshold)
+
+    def should_shed(self) -> bool:
+        """Whether this request should skip generation"""
+        probability = self.shed_probability()
+        if probability >= 1.0:
+            # Let a trickle through so recovery is noticed
+            return random.random() >= 0.05
+        return random.random() < probability
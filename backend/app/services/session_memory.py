@@ -0,0 +1,149 @@
+import json
+import redis.asyncio as redis
+from typing import Dict, List, Tuple
+from ..config import settings
+from .llm_service import LLMService
+
+SESSION_PREFIX = "session:"
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)"""
+    return (len(text) + 3) // 4
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens, keeping the start"""
+    limit = max_tokens * 4
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "..."
+
+class SessionMemory:
+    """Per-session conversation memory in Redis.
+
+    Recent turns are kept verbatim in a list; once it grows past
+    SESSION_WINDOW_TURNS the oldest turns are folded into a rolling summary.
+    Folding happens after the response has been sent, so the request path
+    only ever reads. All keys of a session expire after SESSION_TTL_SECONDS
+    of inactivity.
+    """
+
+    def __init__(self, llm_service: LLMService):
+        self.llm_service = llm_service
+        self.redis = None
+
+    async def initialize(self):
+        """Connect to Redis"""
+        self.redis = redis.from_url(settings.REDIS_URL, decode_responses=True, socket_connect_timeout=5)
+        await self.redis.ping()
+
+    def _keys(self, session_id: str) -> Tuple[str, str, str]:
+        base = SESSION_PREFIX + session_id
+        return base + ":turns", base + ":summary", base + ":summarizing"
+
+    async def load(self, session_id: str) -> Tuple[str, List[Dict[str, str]]]:
+        """Return the rolling summary and the recent turns, oldest first"""
+        if self.redis is None:
+            return "", []
+        turns_key, summary_key, _ = self._keys(session_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(summary_key)
+            pipe.lrange(turns_key, 0, -1)
+            summary, turns = await pipe.execute()
+        return summary or "", [json.loads(turn) for turn in turns]
+
+    async def history(self, session_id: str) -> str:
+        """Conversation history for the prompt, within SESSION_HISTORY_TOKEN_BUDGET"""
+        summary, turns = await self.load(session_id)
+        budget = settings.SESSION_HISTORY_TOKEN_BUDGET
+        parts: List[str] = []
+
+        if summary:
+            summary = truncate_tokens(summary, min(settings.SESSION_SUMMARY_MAX_TOKENS, budget))
+            parts.append(f"Summary of earlier conversation: {summary}")
+            budget -= estimate_tokens(parts[0])
+
+        # Newest turns matter most; drop older ones once the budget is spent
+        recent: List[str] = []
+        for turn in reversed(turns):
+            text = f"User: {turn['user']}\nAssistant: {turn['assistant']}"
+            cost = estimate_tokens(text)
+            if cost > budget:
+                break
+            recent.append(text)
+            budget -= cost
+
+        return "\n\n".join(parts + recent[::-1])
+
+    async def record_turn(self, session_id: str, user_message: str, assistant_message: str):
+        """Append a turn and fold overflowing turns into the summary.
+
+        Meant to run as a background task after the response is sent.
+        """
+        if self.redis is None:
+            return
+        turns_key, summary_key, _ = self._keys(session_id)
+        turn = json.dumps({
+            "user": user_message[:settings.SESSION_MAX_MESSAGE_CHARS],
+            "assistant": assistant_message[:settings.SESSION_MAX_MESSAGE_CHARS]
+        })
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.rpush(turns_key, turn)
+                pipe.expire(turns_key, settings.SESSION_TTL_SECONDS)
+                pipe.expire(summary_key, settings.SESSION_TTL_SECONDS)
+                length, _, _ = await pipe.execute()
+            if length > settings.SESSION_WINDOW_TURNS:
+                await self._summarize(session_id)
+        except Exception as e:
+            print(f"Error recording turn for session {session_id}: {e}")
+
+    async def _summarize(self, session_id: str):
+        """Fold the turns beyond the window into the rolling summary"""
+        turns_key, summary_key, lock_key = self._keys(session_id)
+
+        # One summarizer per session across all workers
+        if not await self.redis.set(lock_key, 1, nx=True, ex=120):
+            return
+        try:
+            overflow = await self.redis.llen(turns_key) - settings.SESSION_WINDOW_TURNS
+            if overflow <= 0:
+                return
+            summary = await self.redis.get(summary_key) or ""
+            turns = [json.loads(turn) for turn in await self.redis.lrange(turns_key, 0, overflow - 1)]
+
+            summary = await self._fold(summary, turns)
+
+            # New turns are appended on the right, so the first `overflow`
+            # entries are still the ones that were summarized
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.set(summary_key, summary, ex=settings.SESSION_TTL_SECONDS)
+                pipe.ltrim(turns_key, overflow, -1)
+                await pipe.execute()
+        finally:
+            await self.redis.delete(lock_key)
+
+    async def _fold(self, summary: str, turns: List[Dict[str, str]]) -> str:
+        """Merge turns into the summary with the LLM, or by excerpting without it"""
+        if self.llm_service.ready:
+            transcript = "\n".join(f"User: {turn['user']}\nAssistant: {turn['assistant']}" for turn in turns)
+            try:
+                updated = await self.llm_service.summarize(summary, transcript)
+                if updated.strip():
+                    return truncate_tokens(updated.strip(), settings.SESSION_SUMMARY_MAX_TOKENS)
+            except Exception as e:
+                print(f"Error summarizing session: {e}")
+
+        # Keep what the user asked about; answers can be regenerated
+        excerpts = " ".join(f"User asked: {truncate_tokens(turn['user'], 40)}" for turn in turns)
+        combined = f"{summary} {excerpts}".strip()
+        # Keep the most recent part when over the limit
+        limit = settings.SESSION_SUMMARY_MAX_TOKENS * 4
+        return combined if len(combined) <= limit else "..." + combined[-limit:]
+
+    async def clear(self, session_id: str):
+        """Forget a session"""
+        if self.redis is not None:
+            await self.redis.delete(*self._keys(session_id))
+
+    async def cleanup(self):
+        """Cleanup resources"""
+        if self.redis:
+            await self.redis.close()
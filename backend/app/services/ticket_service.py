@@ -1,30 +1,236 @@
 import httpx
 import uuid
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, Iterable
 from ..config import settings
+from .rag_service import ActiveIndex, RAGService
+from ..utils.metrics import record_dependency_error, stage
 import json
 
+# Zammad default priority and state IDs
+PRIORITY_IDS = {
+    "low": 1,
+    "normal": 2,
+    "high": 3,
+    "urgent": 3
+}
+
+# Open-ticket index entries for tickets still being created carry this prefix
+PENDING_PREFIX = "pending-"
+
+STATE_IDS = {
+    "new": 1,
+    "open": 2,
+    "in_progress": 2,
+    "pending": 3,
+    "resolved": 4,
+    "closed": 4
+}
+
 class TicketService:
-    def __init__(self):
-        self.zammad_url = "http://zammad:80/api/v1"
+    def __init__(self, rag_service: Optional[RAGService] = None):
+        self.zammad_url = f"{settings.ZAMMAD_URL}/api/v1"
         self.zammad_token = settings.ZAMMAD_TOKEN if hasattr(settings, 'ZAMMAD_TOKEN') else None
         # For initial setup, use basic auth
         self.zammad_user = "admin@example.com"
         self.zammad_password = "admin123"
+        # Open-ticket similarity index used for duplicate detection
+        self.rag_service = rag_service
+        self._dedup_locks: Dict[str, asyncio.Lock] = {}
+        # Placeholder ID -> Zammad ID of the ticket being created for it
+        self._pending: Dict[str, asyncio.Future] = {}
+        
+    def _auth(self, headers: Dict[str, str]):
+        """Add token auth to headers, or return basic auth credentials"""
+        if self.zammad_token:
+            headers["Authorization"] = f"Token token={self.zammad_token}"
+            return None
+        return (self.zammad_user, self.zammad_password)
+        
+    async def create_or_attach_ticket(self, ticket_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a ticket, or attach the report to a near-duplicate open ticket"""
+        if not self.rag_service or not self.rag_service.ready:
+            return {"ticket_id": await self.create_ticket(ticket_data), "reused": False}
+        
+        department = ticket_data.get("department", "General")
+        window = settings.DUPLICATE_TICKET_WINDOW_MINUTES * 60
+        try:
+            # The index is captured with the embedding so an alias switch cannot mix models
+            active, embedding = await asyncio.to_thread(self.rag_service.query_embedding, ticket_data["description"])
+        except Exception as e:
+            print(f"Error embedding ticket for duplicate check: {e}")
+            return {"ticket_id": await self.create_ticket(ticket_data), "reused": False}
+        
+        # Check and claim per department under a lock, so a burst of identical
+        # reports during an incident collapses onto a single ticket. The lock
+        # only covers the Qdrant calls; Zammad is called after it is released,
+        # and reports matching a ticket still being created wait for its ID.
+        claim = None
+        lock = self._dedup_locks.setdefault(department, asyncio.Lock())
+        async with lock:
+            try:
+                match = await self.rag_service.find_similar_open_ticket(
+                    embedding,
+                    active,
+                    department,
+                    window_seconds=window,
+                    threshold=settings.DUPLICATE_TICKET_THRESHOLD
+                )
+            except Exception as e:
+                print(f"Error checking for duplicate tickets: {e}")
+                match = None
+            if match is None:
+                claim = await self._claim(embedding, active, department)
+        
+        if match is not None:
+            ticket_id = await self._resolve(match["ticket_id"])
+            if ticket_id and await self.add_article(ticket_id, ticket_data):
+                try:
+                    await self.rag_service.touch_open_ticket(ticket_id, active)
+                except Exception as e:
+                    print(f"Error refreshing open ticket {ticket_id}: {e}")
+                return {"ticket_id": ticket_id, "reused": True}
+        
+        try:
+            ticket_id = await self.create_ticket(ticket_data)
+            if claim:
+                self._pending[claim].set_result(ticket_id)
+            await self._index_created(ticket_id, claim, embedding, active, department, window)
+        finally:
+            if claim:
+                future = self._pending.pop(claim)
+                if not future.done():
+                    future.set_result(None)
+        
+        return {"ticket_id": ticket_id, "reused": False}
+    
+    async def _claim(self, embedding: List[float], active: ActiveIndex, department: str) -> str:
+        """Index a placeholder for a ticket about to be created, for concurrent reports to match"""
+        claim = f"{PENDING_PREFIX}{uuid.uuid4()}"
+        self._pending[claim] = asyncio.get_running_loop().create_future()
+        try:
+            await self.rag_service.index_open_ticket(claim, embedding, active, department)
+        except Exception as e:
+            print(f"Error indexing pending ticket: {e}")
+        return claim
+    
+    async def _resolve(self, ticket_id: str) -> Optional[str]:
+        """The Zammad ID of a matched open ticket, waiting while it is being created"""
+        if ticket_id in self._pending:
+            ticket_id = await asyncio.shield(self._pending[ticket_id])
+        # Placeholders of other workers and tickets Zammad never got cannot be attached to
+        if not ticket_id or ticket_id.startswith((PENDING_PREFIX, "local-")):
+            return None
+        return ticket_id
+    
+    async def _index_created(
+        self,
+        ticket_id: str,
+        claim: Optional[str],
+        embedding: List[float],
+        active: ActiveIndex,
+        department: str,
+        window: float
+    ):
+        """Replace the placeholder with the created ticket, or drop it if creation failed"""
+        try:
+            if not ticket_id.startswith("local-"):
+                await self.rag_service.prune_open_tickets(active, older_than_seconds=window)
+                await self.rag_service.index_open_ticket(ticket_id, embedding, active, department)
+            if claim:
+                await self.rag_service.remove_open_ticket(claim, active)
+        except Exception as e:
+            print(f"Error indexing open ticket {ticket_id}: {e}")
+    
+    async def add_article(self, ticket_id: str, ticket_data: Dict[str, Any]) -> bool:
+        """Attach a report to an existing Zammad ticket"""
+        headers = {
+            "Content-Type": "application/json"
+        }
+        auth = self._auth(headers)
+        
+        article = {
+            "ticket_id": int(ticket_id),
+            "subject": ticket_data["title"],
+            "body": ticket_data["description"],
+            "type": "note",
+            "internal": False
+        }
+        
+        async with httpx.AsyncClient() as client:
+            try:
+                with stage("zammad_add_article"):
+                    response = await client.post(
+                        f"{self.zammad_url}/ticket_articles",
+                        headers=headers,
+                        json=article,
+                        auth=auth,
+                        timeout=30.0
+                    )
+                if response.status_code == 201:
+                    return True
+                print(f"Zammad error: {response.status_code} - {response.text}")
+            except Exception as e:
+                print(f"Error attaching to Zammad ticket {ticket_id}: {e}")
+        record_dependency_error("zammad")
+        return False
         
     async def create_ticket(self, ticket_data: Dict[str, Any]) -> str:
         """Create ticket in Zammad"""
+        async with httpx.AsyncClient() as client:
+            try:
+                return await self._submit_ticket(client, ticket_data)
+            except Exception as e:
+                print(f"Error creating Zammad ticket: {e}")
+                # Return local ID as fallback
+                return f"local-{uuid.uuid4()}"
+    
+    async def create_tickets(
+        self,
+        tickets: Iterable[Dict[str, Any]],
+        concurrency: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Create many tickets in Zammad with bounded concurrency.
+        
+        Tickets are pulled lazily from the iterable, so a streamed dump is never
+        held in memory. Returns one result per input item, in input order.
+        Failed items are reported rather than given a local fallback ID.
+        """
+        concurrency = concurrency or settings.TICKET_IMPORT_CONCURRENCY
+        items = enumerate(tickets)
+        results: List[Dict[str, Any]] = []
+        
+        async def worker(client: httpx.AsyncClient):
+            # Workers share one iterator, so at most `concurrency` tickets are in flight
+            for index, ticket_data in items:
+                try:
+                    ticket_id = await self._submit_ticket(client, ticket_data)
+                    results.append({"index": index, "status": "created", "ticket_id": ticket_id})
+                except Exception as e:
+                    results.append({"index": index, "status": "failed", "error": str(e) or repr(e)})
+        
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(limits=limits) as client:
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        
+        results.sort(key=lambda result: result["index"])
+        return results
+    
+    async def _submit_ticket(self, client: httpx.AsyncClient, ticket_data: Dict[str, Any]) -> str:
+        """Post a single ticket to Zammad, raising on failure"""
         headers = {
             "Content-Type": "application/json"
         }
         
         # Use basic auth if no token
-        auth = None
-        if self.zammad_token:
-            headers["Authorization"] = f"Token token={self.zammad_token}"
-        else:
-            auth = (self.zammad_user, self.zammad_password)
+        auth = self._auth(headers)
+        
+        priority = (ticket_data.get("priority") or "normal").lower()
+        status = (ticket_data.get("status") or "new").lower()
+        if priority not in PRIORITY_IDS:
+            raise ValueError(f"Unknown priority: {priority}")
+        if status not in STATE_IDS:
+            raise ValueError(f"Unknown status: {status}")
         
         zammad_ticket = {
             "title": ticket_data["title"],
@@ -36,40 +242,26 @@ class TicketService:
                 "type": "note",
                 "internal": False
             },
-            "state_id": 1,  # new
-            "priority_id": 2  # normal
+            "state_id": STATE_IDS[status],
+            "priority_id": PRIORITY_IDS[priority]
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    f"{self.zammad_url}/tickets",
-                    headers=headers,
-                    json=zammad_ticket,
-                    auth=auth,
-                    timeout=30.0
-                )
-                if response.status_code == 201:
-                    ticket = response.json()
-                    return str(ticket.get("id", "error"))
-                else:
-                    print(f"Zammad error: {response.status_code} - {response.text}")
-                    # Fallback to local ID
-                    return f"local-{uuid.uuid4()}"
-            except Exception as e:
-                print(f"Error creating Zammad ticket: {e}")
-                # Return local ID as fallback
-                return f"local-{uuid.uuid4()}"
+        with stage("zammad_create_ticket", dependency="zammad"):
+            response = await client.post(
+                f"{self.zammad_url}/tickets",
+                headers=headers,
+                json=zammad_ticket,
+                auth=auth,
+                timeout=30.0
+            )
+            if response.status_code != 201:
+                raise Exception(f"Zammad error: {response.status_code} - {response.text}")
+            return str(response.json()["id"])
     
     async def search_tickets(self, query: str) -> List[Dict[str, Any]]:
         """Search existing tickets"""
         headers = {}
-        auth = None
-        
-        if self.zammad_token:
-            headers["Authorization"] = f"Token token={self.zammad_token}"
-        else:
-            auth = (self.zammad_user, self.zammad_password)
+        auth = self._auth(headers)
             
         async with httpx.AsyncClient() as client:
             try:
@@ -0,0 +1,26 @@
+"""Keyword rules chat uses to route messages and decide when to open a ticket"""
+
+# Checked in order; the first department with a keyword in the message wins
+DEPARTMENT_KEYWORDS = (
+    ("IT", ("password", "login", "email", "vpn", "computer")),
+    ("HR", ("leave", "vacation", "hr", "employee")),
+    ("Finance", ("expense", "payroll", "salary", "invoice")),
+)
+DEFAULT_DEPARTMENT = "General"
+
+TICKET_KEYWORDS = ("help", "issue", "problem", "not working", "error", "can't", "cannot")
+
+
+def classify_department(message: str) -> str:
+    """Department for a message, by substring match on its keywords"""
+    message_lower = message.lower()
+    for department, keywords in DEPARTMENT_KEYWORDS:
+        if any(word in message_lower for word in keywords):
+            return department
+    return DEFAULT_DEPARTMENT
+
+
+def needs_ticket(message: str) -> bool:
+    """Whether a message reports an issue or request that should become a ticket"""
+    message_lower = message.lower()
+    return any(word in message_lower for word in TICKET_KEYWORDS)
@@ -0,0 +1,43 @@
+import asyncio
+import time
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Deadline:
+    """A point in time by which a request must be answered.
+
+    Stages ask for the remaining time instead of using their own fixed
+    timeouts, so a slow early stage shrinks the budget of later ones.
+    """
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def from_header(cls, value: Optional[str], default: float, maximum: float) -> "Deadline":
+        """Build a deadline from a client supplied timeout in seconds, clamped to maximum"""
+        try:
+            seconds = float(value) if value else default
+        except ValueError:
+            seconds = default
+        if seconds <= 0:
+            seconds = default
+        return cls(min(seconds, maximum))
+
+    def remaining(self) -> float:
+        """Seconds left, never negative"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def fits(self, seconds: float) -> bool:
+        """Whether at least `seconds` remain"""
+        return self.remaining() >= seconds
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """Await within the remaining time; raises asyncio.TimeoutError when it runs out"""
+        return await asyncio.wait_for(awaitable, self.remaining())
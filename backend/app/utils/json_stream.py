@@ -0,0 +1,86 @@
+import json
+import re
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_records(
+    path: str,
+    key: Optional[str] = None,
+    chunk_size: int = 1 << 16
+) -> Iterator[Dict[str, Any]]:
+    """Stream records from a JSONL file, a JSON array, or an object wrapping an array.
+
+    For wrapped dumps such as ``{"tickets": [...]}`` pass ``key="tickets"``;
+    without a key the first array in the document is used. Only one record is
+    held in memory at a time, so arbitrarily large exports can be read.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+            return
+
+        yield from _iter_array(f, key, chunk_size)
+
+
+def _iter_array(f: TextIO, key: Optional[str], chunk_size: int) -> Iterator[Dict[str, Any]]:
+    """Decode the elements of a JSON array one at a time"""
+    buf = f.read(chunk_size)
+    eof = not buf
+
+    # Locate the opening bracket of the array we are streaming
+    start = buf.lstrip(_WHITESPACE)[:1]
+    pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key) if key else r"\[")
+    if start == "[":
+        pos = buf.index("[") + 1
+    else:
+        while True:
+            match = pattern.search(buf)
+            if match:
+                pos = match.end()
+                break
+            if eof:
+                raise ValueError(f"No array{f' under key {key!r}' if key else ''} found in JSON document")
+            # Keep a tail in case the pattern straddles two chunks
+            keep = len(key or "") + 64
+            buf = buf[-keep:]
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+
+    while True:
+        # Skip separators between elements
+        while pos < len(buf) and buf[pos] in _WHITESPACE + ",":
+            pos += 1
+
+        if pos < len(buf) and buf[pos] == "]":
+            return
+
+        try:
+            if pos >= len(buf):
+                raise ValueError("need more data")
+            record, end = _decoder.raw_decode(buf, pos)
+            # A value ending exactly at the buffer edge may be truncated
+            if end == len(buf) and not eof:
+                raise ValueError("need more data")
+        except ValueError:
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            buf = buf[pos:]
+            pos = 0
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf += chunk
+            continue
+
+        yield record
+        pos = end
+        # Drop consumed input so the buffer stays bounded
+        if pos > chunk_size:
+            buf = buf[pos:]
+            pos = 0
@@ -0,0 +1,133 @@
+"""
+Prometheus metrics for the API and the stages of the chat pipeline.
+
+Wrap a unit of work in `stage()` to record its latency, and pass the
+dependency it talks to so failures are counted per dependency:
+
+    with stage("qdrant_search", dependency="qdrant"):
+        results = client.search(...)
+
+Under several uvicorn workers set PROMETHEUS_MULTIPROC_DIR to a shared,
+empty directory so /metrics aggregates all of them.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+
+# Stages range from sub-millisecond lookups to multi-second generations
+_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_DURATION = Histogram(
+    "helpdesk_stage_duration_seconds",
+    "Time spent in each stage of request handling",
+    ["stage"],
+    buckets=_BUCKETS
+)
+REQUEST_DURATION = Histogram(
+    "helpdesk_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "helpdesk_http_requests_in_flight",
+    "HTTP requests currently being handled",
+    multiprocess_mode="livesum"
+)
+DEPENDENCY_ERRORS = Counter(
+    "helpdesk_dependency_errors_total",
+    "Failed calls to backing services",
+    ["dependency"]
+)
+CACHE_LOOKUPS = Counter(
+    "helpdesk_cache_lookups_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"]
+)
+
+
+# labels() takes a lock and hashes the label values; stage names are a small
+# fixed set, so keep the resolved children around
+_stage_histograms: Dict[str, Histogram] = {}
+
+
+@contextmanager
+def stage(name: str, dependency: Optional[str] = None) -> Iterator[None]:
+    """Time a block as a pipeline stage; exceptions count against the dependency"""
+    histogram = _stage_histograms.get(name)
+    if histogram is None:
+        histogram = _stage_histograms[name] = STAGE_DURATION.labels(name)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if dependency:
+            DEPENDENCY_ERRORS.labels(dependency).inc()
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - started)
+
+
+def record_dependency_error(dependency: str):
+    """Count a failure that was handled without raising"""
+    DEPENDENCY_ERRORS.labels(dependency).inc()
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Return the exposition body and its content type"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording in-flight requests and latency per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # Label by route template, not raw path, to keep cardinality bounded
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status["code"])
+            ).observe(time.perf_counter() - started)
@@ -0,0 +1,27 @@
+import re
+from typing import List, Tuple
+
+# Applied in order; earlier patterns consume text later ones would also match
+_PATTERNS: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r"\b(password|passwd|pwd|passcode|pin|token|secret|api key)(\s*(?:is|was|:|=)\s*)\S+", re.IGNORECASE),
+     r"\1\2<secret>"),
+    (re.compile(r"\bhttps?://\S+", re.IGNORECASE), "<url>"),
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "<email>"),
+    (re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b"), "<ip>"),
+    (re.compile(r"\b[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){2,7}(?: ?[A-Z0-9]{1,4})?\b"), "<iban>"),
+    (re.compile(r"(?<![\w<])\+?\d[\d ().-]{6,}\d\b"), "<number>"),
+    (re.compile(r"\b\d{5,}\b"), "<number>"),
+    (re.compile(r"\b((?i:my name is|this is|regards|thanks|cheers),?)\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?"), r"\1 <name>"),
+]
+
+
+def scrub_pii(text: str) -> str:
+    """Replace emails, phone and ID numbers, addresses, secrets and signed names with placeholders.
+
+    Pattern based, so it catches the common shapes rather than every
+    possible identifier; names are only caught after an introduction or
+    sign-off.
+    """
+    for pattern, replacement in _PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
@@ -0,0 +1,185 @@
+"""
+Opt-in cProfile capture of individual requests.
+
+A request is profiled when it carries `X-Profile: 1` together with a valid
+`X-Admin-Token`, or when it is picked by PROFILING_SAMPLE_RATE. Profiles
+are pstats dumps kept in PROFILING_DIR, oldest removed beyond
+PROFILING_MAX_FILES, and served by the admin router.
+
+cProfile follows the event loop thread, so the profile includes
+everything the request runs inline (response serialization) and may
+include other requests interleaved on the loop while this one was
+awaiting. Work the request hands to worker threads (the chat embedding
+encode and vector search) is only included when it goes through
+to_thread() below, which profiles the call in its thread and merges it
+into the request's profile. Only one request is profiled at a time.
+"""
+
+import asyncio
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import secrets
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from ..config import settings
+
+ADMIN_TOKEN_HEADER = "x-admin-token"
+PROFILE_HEADER = "x-profile"
+
+# <epoch ms>_<method>_<path slug>_<duration ms>ms.prof
+_PROFILE_ID = re.compile(r"^(\d+)_([A-Z]+)_([A-Za-z0-9_.-]*)_(\d+)ms\.prof$")
+
+# Profiles of worker thread calls made by the request being profiled, if any
+_thread_profiles: contextvars.ContextVar[Optional[List[cProfile.Profile]]] = contextvars.ContextVar(
+    "thread_profiles", default=None
+)
+
+T = TypeVar("T")
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Whether token matches the configured admin token (none configured never matches)"""
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return secrets.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode())
+
+
+async def to_thread(func: Callable[..., T], /, *args, **kwargs) -> T:
+    """asyncio.to_thread, adding the call to the current request's profile if it is being profiled"""
+    if _thread_profiles.get() is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return await asyncio.to_thread(_run_profiled, func, *args, **kwargs)
+
+
+def _run_profiled(func: Callable[..., T], *args, **kwargs) -> T:
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler already owns this thread
+        return func(*args, **kwargs)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.disable()
+        # to_thread copies the request's context, so this is the request's list
+        _thread_profiles.get().append(profile)
+
+
+class ProfileStore:
+    """Bounded on-disk ring buffer of request profiles"""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+
+    def save(
+        self,
+        profile: cProfile.Profile,
+        method: str,
+        path: str,
+        duration: float,
+        thread_profiles: Optional[List[cProfile.Profile]] = None
+    ) -> str:
+        """Write a profile merged with its worker thread profiles, evict the oldest beyond max_files, and return its ID"""
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9.-]+", "-", path).strip("-")[:80] or "root"
+        profile_id = f"{int(time.time() * 1000)}_{method}_{slug}_{int(duration * 1000)}ms.prof"
+        stats = pstats.Stats(profile)
+        for thread_profile in thread_profiles or []:
+            stats.add(thread_profile)
+        stats.dump_stats(os.path.join(self.directory, profile_id))
+
+        for stale in self.list()[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, stale["id"]))
+            except FileNotFoundError:
+                pass
+        return profile_id
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Stored profiles, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            match = _PROFILE_ID.match(name)
+            if not match:
+                continue
+            profiles.append({
+                "id": name,
+                "created_at": int(match.group(1)) / 1000,
+                "method": match.group(2),
+                "path": match.group(3),
+                "duration_ms": int(match.group(4)),
+                "size_bytes": os.path.getsize(os.path.join(self.directory, name))
+            })
+        return sorted(profiles, key=lambda profile: profile["id"], reverse=True)
+
+    def path(self, profile_id: str) -> Optional[str]:
+        """Filesystem path of a stored profile, or None for unknown or malformed IDs"""
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, profile_id)
+        return path if os.path.isfile(path) else None
+
+    def render(self, profile_id: str, sort: str = "cumulative", limit: int = 50) -> Optional[str]:
+        """Human readable pstats report of a stored profile"""
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+profile_store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_FILES)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles admin-requested or sampled requests"""
+
+    def __init__(self, app, store: ProfileStore = profile_store):
+        self.app = app
+        self.store = store
+        self._active = False
+
+    def _wanted(self, scope) -> bool:
+        headers = dict(scope.get("headers") or [])
+        if headers.get(PROFILE_HEADER.encode()) == b"1":
+            token = headers.get(ADMIN_TOKEN_HEADER.encode(), b"").decode("latin-1")
+            if is_admin_token(token):
+                return True
+        return settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        profile = cProfile.Profile()
+        thread_profiles: List[cProfile.Profile] = []
+        token = _thread_profiles.set(thread_profiles)
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile.disable()
+            _thread_profiles.reset(token)
+            self._active = False
+            duration = time.perf_counter() - started
+            try:
+                profile_id = await asyncio.to_thread(
+                    self.store.save, profile, scope["method"], scope["path"], duration, thread_profiles
+                )
+                print(f"Profiled {scope['method']} {scope['path']} in {duration * 1000:.0f} ms: {profile_id}")
+            except Exception as e:
+                print(f"Error saving request profile: {e}")
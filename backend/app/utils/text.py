@@ -0,0 +1,137 @@
+import re
+from bisect import bisect_left
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Set
+
+# Tags that start a new line of text when rendered
+_BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "tr", "table", "pre", "blockquote",
+    "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "hr"
+}
+_SKIP_TAGS = {"script", "style", "head", "title"}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """Convert an HTML fragment (e.g. a BookStack page) to plain text"""
+    parser = _TextExtractor()
+    parser.feed(html or "")
+    parser.close()
+
+    text = "".join(parser.parts)
+    lines = (re.sub(r"[ \t\r\f\v]+", " ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+# Words too common to be worth highlighting in a snippet
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "does", "for", "from",
+    "have", "how", "i", "in", "is", "it", "its", "me", "my", "of", "on", "or", "so", "that",
+    "the", "this", "to", "was", "we", "what", "when", "where", "which", "why", "with", "you"
+}
+_WORD = re.compile(r"\w+")
+# A snippet starts after one of these so it does not open mid-sentence
+_SENTENCE_BREAKS = (". ", "! ", "? ", "\n")
+
+
+def query_terms(query: str) -> Set[str]:
+    """Lowercased query words worth matching"""
+    return {
+        word for word in (match.group().lower() for match in _WORD.finditer(query))
+        if len(word) > 1 and word not in _STOPWORDS
+    }
+
+
+def _sentence_start(text: str, position: int, floor: int) -> int:
+    """Start of the sentence containing position, but not before floor"""
+    start = floor
+    for separator in _SENTENCE_BREAKS:
+        found = text.rfind(separator, floor, position)
+        if found != -1:
+            start = max(start, found + len(separator))
+    return start
+
+
+def extract_snippet(content: str, query: str, max_chars: int = 240) -> Dict[str, Any]:
+    """Pick the passage of content that best matches query.
+
+    Returns the snippet text, its offset in content, and highlight
+    [start, end) offsets of matched query words relative to the snippet.
+    Candidate windows start at the sentence of each match and are scored
+    by distinct terms, then total matches; with no match the snippet is
+    the opening text. Apart from one regex scan of the document, the cost
+    grows with the number of matches.
+    """
+    terms = query_terms(query)
+
+    # One regex scan for all terms keeps the per-word work out of Python
+    hit_positions: List[int] = []
+    hit_words: List[str] = []
+    if terms:
+        # Matching against lowercased text is about twice as fast as IGNORECASE,
+        # but only usable when lowercasing kept every offset (e.g. not with "İ")
+        lowered = content.lower()
+        scanned, flags = (lowered, 0) if len(lowered) == len(content) else (content, re.IGNORECASE)
+        pattern = re.compile(r"\b(?:%s)\b" % "|".join(map(re.escape, sorted(terms))), flags)
+        for match in pattern.finditer(scanned):
+            hit_positions.append(match.start())
+            hit_words.append(match.group().lower())
+
+    best = None  # ((distinct terms, hits), start)
+    previous_start = -1
+    for position in hit_positions:
+        # Long sentences are entered part way so the match stays in the window
+        start = _sentence_start(content, position, max(0, position - max_chars // 2))
+        if start == previous_start:
+            continue
+        previous_start = start
+        matched = hit_words[bisect_left(hit_positions, start):bisect_left(hit_positions, start + max_chars)]
+        score = (len(set(matched)), len(matched))
+        if best is None or score > best[0]:
+            best = (score, start)
+
+    start = best[1] if best else 0
+    end = min(len(content), start + max_chars)
+
+    # Cut on a word boundary when the window hit the length limit mid-word
+    if end < len(content) and content[end:end + 1].isalnum():
+        cut = content.rfind(" ", start, end)
+        if cut > start:
+            end = cut
+
+    text = content[start:end].strip()
+    start += len(content[start:end]) - len(content[start:end].lstrip())
+    first, last = bisect_left(hit_positions, start), bisect_left(hit_positions, start + len(text))
+    highlights = [
+        [position - start, position - start + len(word)]
+        for position, word in zip(hit_positions[first:last], hit_words[first:last])
+        if position + len(word) <= start + len(text)
+    ]
+    return {
+        "text": text,
+        "offset": start,
+        "highlights": highlights,
+        "truncated": start > 0 or start + len(text) < len(content)
+    }
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Compare in-process embedding against the shared embedding server.
+
+    python benchmarks/bench_embedding_server.py                      # 1, 2 and 4 workers, both modes
+    python benchmarks/bench_embedding_server.py --workers 4 --modes server --json out.json
+
+Each worker process mimics one uvicorn worker: it builds a RAGService and
+calls create_embedding() for single queries from several threads. Reported
+per run: total embeddings/second, p50/p99 latency, and resident memory of
+all workers plus the server (Linux only, read from /proc).
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+WORDS = (
+    "password reset vpn laptop printer payroll invoice leave policy email outlook "
+    "access badge onboarding expense refund network wifi license software install"
+).split()
+
+
+def rss_mb(pid: int) -> float:
+    """Resident set size of a process in MB, or 0 where /proc is unavailable"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def _worker(socket_path, threads, duration, barrier, results):
+    if socket_path:
+        os.environ["EMBEDDING_SERVER_SOCKET"] = socket_path
+    from app.config import settings
+    from app.services.rag_service import RAGService
+
+    rag = RAGService()
+    if socket_path:
+        from app.services.embedding_server import EmbeddingClient
+        rag.embedding_client = EmbeddingClient(socket_path, settings.EMBEDDING_MODEL)
+    rag.create_embedding("warm-up")
+    barrier.wait()
+
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def run():
+        rng = random.Random()
+        local = []
+        while time.perf_counter() < stop_at:
+            query = " ".join(rng.choices(WORDS, k=8))
+            started = time.perf_counter()
+            rag.create_embedding(query)
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    results.put({"latencies": latencies, "rss_mb": rss_mb(os.getpid()), "fallback": bool(rag.embedders)})
+
+
+def _start_server(socket_path: str) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.services.embedding_server", "--socket", socket_path],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL
+    )
+    deadline = time.time() + 300
+    while not os.path.exists(socket_path):
+        if proc.poll() is not None or time.time() > deadline:
+            raise RuntimeError("Embedding server did not start")
+        time.sleep(0.1)
+    return proc
+
+
+def run(mode: str, workers: int, threads: int, duration: float) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    server = None
+    socket_path = None
+    if mode == "server":
+        socket_path = os.path.join(tempfile.mkdtemp(), "embed.sock")
+        server = _start_server(socket_path)
+
+    try:
+        barrier = ctx.Barrier(workers)
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(target=_worker, args=(socket_path, threads, duration, barrier, results))
+            for _ in range(workers)
+        ]
+        for proc in procs:
+            proc.start()
+        outcomes = [results.get() for _ in procs]
+        server_rss = rss_mb(server.pid) if server else 0.0
+        for proc in procs:
+            proc.join()
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+
+    latencies = sorted(l for outcome in outcomes for l in outcome["latencies"])
+    worker_rss = sum(outcome["rss_mb"] for outcome in outcomes)
+    return {
+        "mode": mode,
+        "workers": workers,
+        "threads_per_worker": threads,
+        "embeddings_per_s": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else None,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else None,
+        "worker_rss_mb": worker_rss,
+        "server_rss_mb": server_rss,
+        "total_rss_mb": worker_rss + server_rss,
+        "fell_back_in_process": any(outcome["fallback"] for outcome in outcomes) if mode == "server" else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--modes", nargs="+", choices=["inproc", "server"], default=["inproc", "server"])
+    parser.add_argument("--threads", type=int, default=4, help="Concurrent requests per worker")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'mode':8} {'workers':>7} {'emb/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>8}")
+    for workers in args.workers:
+        for mode in args.modes:
+            result = run(mode, workers, args.threads, args.duration)
+            results.append(result)
+            print(
+                f"{mode:8} {workers:>7} {result['embeddings_per_s']:>9.1f} "
+                f"{result['p50_ms'] or 0:>8.1f} {result['p99_ms'] or 0:>8.1f} {result['total_rss_mb']:>8.0f}"
+            )
+            if result["fell_back_in_process"]:
+                print("  warning: some workers fell back to in-process encoding")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
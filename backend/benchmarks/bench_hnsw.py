@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Sweep Qdrant HNSW parameters and report recall against exact search.
+
+    QDRANT_URL=http://localhost:6333 python benchmarks/bench_hnsw.py
+    python benchmarks/bench_hnsw.py --docs 50000 --m 8,16,32 --ef-construct 64,128 --ef 16,32,64,128
+
+Documents come from data/knowledge_base.json and queries from the tickets
+in data/demo_tickets.json (title and description). Both files are small,
+so the corpus is padded to --docs vectors with noisy copies of the article
+embeddings, and the query set to --queries with noisy copies of the ticket
+embeddings. Copies keep the department of their source, which gives the
+label_hit column: the share of queries whose top k holds a document of the
+ticket's department.
+
+For every (m, ef_construct) a collection is built and indexed, then each
+search ef is measured for recall@k against exact search on the same
+collection, and for p50/p99 latency. Needs a running Qdrant server: the
+in-memory client has no HNSW index. Benchmark collections are deleted
+afterwards unless --keep is given.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+
+from app.config import settings
+from app.services.rag_service import RAGService
+
+DATA_DIRS = [os.path.join(os.path.dirname(BACKEND_DIR), "data"), "/app/data"]
+COLLECTION_PREFIX = "bench_hnsw"
+
+
+def data_file(name: str) -> str:
+    for directory in DATA_DIRS:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    raise SystemExit(f"{name} not found in {DATA_DIRS}")
+
+
+def int_list(value: str) -> list:
+    return [int(item) for item in value.split(",") if item]
+
+
+def noisy_copies(vectors: np.ndarray, count: int, noise: float, rng: np.random.Generator):
+    """Unit vectors scattered around the given ones; returns (vectors, source index)"""
+    sources = rng.integers(0, len(vectors), count)
+    copies = vectors[sources] + rng.normal(0, noise, (count, vectors.shape[1])).astype(np.float32)
+    copies /= np.linalg.norm(copies, axis=1, keepdims=True)
+    return copies, sources
+
+
+def build_corpus(args, rag_service: RAGService):
+    with open(args.knowledge_base) as f:
+        articles = json.load(f)["articles"]
+    with open(args.tickets) as f:
+        tickets = json.load(f)["tickets"]
+
+    rng = np.random.default_rng(args.seed)
+    article_vectors = np.asarray(rag_service.create_embeddings([a["content"] for a in articles]), dtype=np.float32)
+    ticket_vectors = np.asarray(
+        rag_service.create_embeddings([f"{t['title']}\n{t['description']}" for t in tickets]), dtype=np.float32
+    )
+
+    padding, sources = noisy_copies(article_vectors, max(0, args.docs - len(articles)), args.noise, rng)
+    doc_vectors = np.vstack([article_vectors, padding])
+    doc_departments = [a.get("department", "General") for a in articles] + [articles[i].get("department", "General") for i in sources]
+
+    extra, sources = noisy_copies(ticket_vectors, max(0, args.queries - len(tickets)), args.noise, rng)
+    query_vectors = np.vstack([ticket_vectors, extra])
+    query_departments = [t.get("department") for t in tickets] + [tickets[i].get("department") for i in sources]
+    return doc_vectors, doc_departments, query_vectors, query_departments
+
+
+def build_collection(client, name: str, vectors: np.ndarray, departments: list, m: int, ef_construct: int) -> float:
+    """Create and fill a collection, then wait for indexing; returns seconds taken"""
+    from qdrant_client.models import (
+        CollectionStatus, Distance, HnswConfigDiff, OptimizersConfigDiff, PointStruct, VectorParams
+    )
+
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=VectorParams(size=vectors.shape[1], distance=Distance.COSINE),
+        # Index everything, however small, so the sweep measures HNSW
+        hnsw_config=HnswConfigDiff(m=m, ef_construct=ef_construct, full_scan_threshold=1),
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=1)
+    )
+
+    started = time.perf_counter()
+    for offset in range(0, len(vectors), 512):
+        client.upsert(
+            collection_name=name,
+            points=[
+                PointStruct(id=i, vector=vectors[i].tolist(), payload={"department": departments[i]})
+                for i in range(offset, min(offset + 512, len(vectors)))
+            ],
+            wait=True
+        )
+    while client.get_collection(name).status != CollectionStatus.GREEN:
+        time.sleep(0.2)
+    return time.perf_counter() - started
+
+
+def search_ids(client, name: str, vector: np.ndarray, k: int, params) -> list:
+    hits = client.search(collection_name=name, query_vector=vector.tolist(), limit=k, search_params=params, with_payload=False)
+    return [hit.id for hit in hits]
+
+
+def measure(client, name: str, queries: np.ndarray, query_departments: list, doc_departments: list,
+            exact: list, k: int, ef: int) -> dict:
+    from qdrant_client.models import SearchParams
+
+    params = SearchParams(hnsw_ef=ef)
+    for vector in queries[:10]:
+        search_ids(client, name, vector, k, params)
+
+    latencies, recalls, label_hits = [], [], 0
+    for vector, truth, department in zip(queries, exact, query_departments):
+        started = time.perf_counter()
+        found = search_ids(client, name, vector, k, params)
+        latencies.append(time.perf_counter() - started)
+        recalls.append(len(set(found) & set(truth)) / len(truth) if truth else 1.0)
+        label_hits += any(doc_departments[i] == department for i in found)
+
+    latencies.sort()
+    return {
+        "ef": ef,
+        "recall_at_k": statistics.mean(recalls),
+        "label_hit": label_hits / len(queries),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--knowledge-base", default=None, help="Articles JSON (default: data/knowledge_base.json)")
+    parser.add_argument("--tickets", default=None, help="Labelled queries JSON (default: data/demo_tickets.json)")
+    parser.add_argument("--docs", type=int, default=20000, help="Corpus size after padding")
+    parser.add_argument("--queries", type=int, default=500, help="Query count after padding")
+    parser.add_argument("--noise", type=float, default=0.05, help="Std dev of the noise added to padded copies")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--m", type=int_list, default=[8, 16, 32])
+    parser.add_argument("--ef-construct", type=int_list, default=[64, 100, 200])
+    parser.add_argument("--ef", type=int_list, default=[16, 32, 64, 128, 256], help="Search-time ef values")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+    args.knowledge_base = args.knowledge_base or data_file("knowledge_base.json")
+    args.tickets = args.tickets or data_file("demo_tickets.json")
+
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import SearchParams
+
+    rag_service = RAGService()
+    doc_vectors, doc_departments, queries, query_departments = build_corpus(args, rag_service)
+    client = QdrantClient(url=settings.QDRANT_URL, timeout=60)
+    print(f"qdrant: {settings.QDRANT_URL}  docs: {len(doc_vectors)}  queries: {len(queries)}  k: {args.k}")
+
+    results = []
+    print(f"{'m':>4} {'ef_con':>6} {'build s':>8} {'ef':>5} {'recall@k':>9} {'label':>6} {'p50 ms':>7} {'p99 ms':>7}")
+    for m in args.m:
+        for ef_construct in args.ef_construct:
+            name = f"{COLLECTION_PREFIX}_{uuid.uuid4().hex[:8]}"
+            build_seconds = build_collection(client, name, doc_vectors, doc_departments, m, ef_construct)
+            try:
+                exact = [search_ids(client, name, vector, args.k, SearchParams(exact=True)) for vector in queries]
+                for ef in args.ef:
+                    result = measure(client, name, queries, query_departments, doc_departments, exact, args.k, ef)
+                    result.update({"m": m, "ef_construct": ef_construct, "build_seconds": build_seconds})
+                    results.append(result)
+                    print(
+                        f"{m:>4} {ef_construct:>6} {build_seconds:>8.1f} {ef:>5} {result['recall_at_k']:>9.4f} "
+                        f"{result['label_hit']:>6.2f} {result['p50_ms']:>7.2f} {result['p99_ms']:>7.2f}"
+                    )
+            finally:
+                if not args.keep:
+                    client.delete_collection(name)
+
+    current = (settings.QDRANT_HNSW_M, settings.QDRANT_HNSW_EF_CONSTRUCT, settings.QDRANT_SEARCH_EF)
+    print(f"configured: m={current[0]} ef_construct={current[1]} search ef={current[2] or current[1]}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"docs": len(doc_vectors), "queries": len(queries), "k": args.k, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Time the functions on the per-request path and compare runs against a baseline.
+
+    python benchmarks/bench_hot_paths.py                                   # sizes 1000 and 10000
+    python benchmarks/bench_hot_paths.py --sizes 1000,10000,50000 --save baseline.json
+    python benchmarks/bench_hot_paths.py --compare baseline.json --threshold 0.15
+    python benchmarks/bench_hot_paths.py --encoder hashing                 # everything but the model
+
+Covered: chat's department classification, RAGService.create_embedding
+(one query) and create_embeddings (--batch-size queries), format_context,
+and for each corpus size search_documents, the Qdrant search alone,
+get_context, add_document and add_documents. The corpus is synthetic,
+built from department vocabularies so searches have realistic hits; it
+is embedded once at the largest size and every smaller collection is a
+prefix of it.
+
+Each benchmark is timed --repeat times, each round running long enough
+to cover --min-time seconds; the median round is reported per operation.
+--compare flags benchmarks whose median got slower by more than
+--threshold and exits with status 1 if any did, so it can gate CI. Only
+compare runs from the same machine, encoder and store; the baseline's
+settings are printed when they differ.
+
+The store defaults to the in-process Qdrant (":memory:"), which searches
+by brute force; pass --qdrant-url for a server with an HNSW index. Server
+collections are deleted afterwards.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.config import settings
+from app.services.rag_service import RAGService
+from app.utils.classification import classify_department
+
+COLLECTION_PREFIX = "bench_hot_paths"
+VOCABULARY = {
+    "IT": "password login email vpn computer laptop printer network wifi software install outlook license reset",
+    "HR": "leave vacation employee onboarding policy benefits training sick holiday contract manager review",
+    "Finance": "expense payroll salary invoice reimbursement budget tax receipt refund approval payment",
+    "Security": "badge access compliance audit phishing incident permission door camera visitor",
+    "Operations": "facilities desk office parking cafeteria room booking delivery cleaning furniture"
+}
+FILLER = "the to and of a in for is on with please after before when your our can not".split()
+
+
+def int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def make_text(rng: random.Random, department: str, words: int) -> str:
+    vocabulary = VOCABULARY[department].split()
+    return " ".join(rng.choice(vocabulary) if rng.random() < 0.4 else rng.choice(FILLER) for _ in range(words))
+
+
+def make_corpus(size: int, words: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    departments = list(VOCABULARY)
+    corpus = []
+    for i in range(size):
+        department = departments[i % len(departments)]
+        corpus.append({
+            "title": f"{department} article {i}",
+            "content": make_text(rng, department, words),
+            "department": department,
+            "category": "Synthetic"
+        })
+    return corpus
+
+
+def make_queries(count: int, seed: int) -> List[str]:
+    rng = random.Random(seed + 1)
+    departments = list(VOCABULARY)
+    return [
+        f"I have a problem: {make_text(rng, departments[i % len(departments)], rng.randint(6, 20))}"
+        for i in range(count)
+    ]
+
+
+def measure(fn: Callable[[], Any], min_time: float, repeat: int) -> Dict[str, float]:
+    """Median and best seconds per call over `repeat` rounds of at least min_time / repeat each"""
+    fn()
+    round_time = min_time / repeat
+    calls = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= round_time or calls >= 1_000_000:
+            break
+        calls = max(calls * 2, int(calls * round_time / max(elapsed, 1e-9)))
+
+    rounds = [elapsed / calls]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        rounds.append((time.perf_counter() - started) / calls)
+    return {"median_s": statistics.median(rounds), "best_s": min(rounds), "calls": calls * repeat}
+
+
+def cycle(items: List[Any]) -> Callable[[], Any]:
+    """Next item of a list on every call, wrapping around"""
+    state = {"i": -1}
+
+    def next_item():
+        state["i"] = (state["i"] + 1) % len(items)
+        return items[state["i"]]
+    return next_item
+
+
+class Suite:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.results: List[Dict[str, Any]] = []
+        self.loop = asyncio.new_event_loop()
+        self.embedders: Dict[str, Any] = {}
+        if args.encoder == "hashing":
+            from mocks.embedding import HashingEncoder
+            self.embedders[settings.EMBEDDING_MODEL] = HashingEncoder(args.dimension, latency_ms=0)
+
+    def service(self, collection: str) -> RAGService:
+        """A RAGService serving its own collection, sharing the loaded encoder"""
+        settings.QDRANT_COLLECTION = collection
+        settings.QDRANT_TICKET_COLLECTION = f"{collection}_tickets"
+        rag_service = RAGService()
+        rag_service.embedders = self.embedders
+        rag_service.connect()
+        return rag_service
+
+    def drop(self, rag_service: RAGService):
+        """Delete a service's collections from a server; their aliases go with them"""
+        if self.args.qdrant_url == ":memory:":
+            return
+        for name in (rag_service.collection_name, rag_service.ticket_collection_name):
+            if rag_service.client.collection_exists(name):
+                rag_service.client.delete_collection(name)
+
+    def run(self, name: str, fn: Callable[[], Any], size: Optional[int] = None, items: int = 1):
+        timing = measure(fn, self.args.min_time, self.args.repeat)
+        result = {
+            "name": name,
+            "size": size,
+            "items": items,
+            "per_op_us": round(timing["median_s"] * 1e6, 2),
+            "best_us": round(timing["best_s"] * 1e6, 2),
+            "per_item_us": round(timing["median_s"] * 1e6 / items, 2),
+            "ops_per_s": round(1 / timing["median_s"], 1),
+            "calls": timing["calls"]
+        }
+        self.results.append(result)
+        print(
+            f"{name:<20} {size if size is not None else '-':>7} {result['per_op_us']:>12.1f} "
+            f"{result['per_item_us']:>12.1f} {result['ops_per_s']:>10.1f}",
+            flush=True
+        )
+
+    def run_all(self) -> List[Dict[str, Any]]:
+        args = self.args
+        queries = make_queries(args.queries, args.seed)
+        batch = queries[:args.batch_size]
+        print(f"{'benchmark':<20} {'size':>7} {'per op us':>12} {'per item us':>12} {'ops/s':>10}")
+
+        next_query = cycle(queries)
+        self.run("classify_department", lambda: classify_department(next_query()))
+
+        base = self.service(f"{COLLECTION_PREFIX}_base")
+        self.run("create_embedding", lambda: base.create_embedding(next_query()))
+        self.run("create_embeddings", lambda: base.create_embeddings(batch), items=len(batch))
+
+        corpus = make_corpus(max(args.sizes), args.doc_words, args.seed)
+        started = time.perf_counter()
+        vectors = []
+        for start in range(0, len(corpus), 256):
+            vectors += base.create_embeddings([doc["content"] for doc in corpus[start:start + 256]])
+        print(f"# embedded {len(corpus)} corpus documents in {time.perf_counter() - started:.1f}s", flush=True)
+
+        hits = [{"title": doc["title"], "content": doc["content"], "score": 0.5} for doc in corpus[:3]]
+        self.run("format_context", lambda: base.format_context(hits))
+        self.drop(base)
+
+        for size in args.sizes:
+            rag_service = self.service(f"{COLLECTION_PREFIX}_{size}")
+            collection = rag_service.collection_name
+            for start in range(0, size, 1000):
+                end = min(start + 1000, size)
+                rag_service.client.upsert(
+                    collection_name=collection,
+                    points=[
+                        rag_service._document_point(str(uuid.UUID(int=i)), vectors[i], corpus[i])
+                        for i in range(start, end)
+                    ]
+                )
+            query_vectors = rag_service.create_embeddings(queries)
+            next_vector = cycle(query_vectors)
+            search_params = rag_service._search_params()
+
+            self.run("search_documents", lambda: rag_service.search_documents_sync(next_query(), 3), size)
+            self.run("qdrant_search", lambda: rag_service.client.search(
+                collection_name=collection, query_vector=next_vector(), search_params=search_params, limit=3
+            ), size)
+            self.run("get_context", lambda: self.loop.run_until_complete(rag_service.get_context(next_query())), size)
+
+            new_docs = make_corpus(args.batch_size * 4, args.doc_words, args.seed + size)
+            next_doc = cycle(new_docs)
+            self.run("add_document", lambda: self.loop.run_until_complete(rag_service.add_document(next_doc())), size)
+            self.run(
+                "add_documents",
+                lambda: self.loop.run_until_complete(rag_service.add_documents(new_docs[:args.batch_size])),
+                size, items=args.batch_size
+            )
+            self.drop(rag_service)
+        return self.results
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    return result["name"] if result["size"] is None else f"{result['name']}[{result['size']}]"
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], config: Dict[str, Any], threshold: float) -> int:
+    """Print the change per benchmark against a baseline; returns the number of regressions"""
+    differing = {
+        key: (baseline["config"].get(key), value) for key, value in config.items()
+        if key in ("encoder", "model", "qdrant_url", "dimension", "doc_words", "batch_size", "machine")
+        and baseline["config"].get(key) != value
+    }
+    if differing:
+        print("# baseline was recorded with different settings, changes may not be comparable:")
+        for key, (old, new) in differing.items():
+            print(f"#   {key}: {old} -> {new}")
+
+    before = {result_key(result): result for result in baseline["results"]}
+    regressions = 0
+    print(f"\n{'benchmark':<26} {'base us':>12} {'now us':>12} {'change':>8}")
+    for result in results:
+        key = result_key(result)
+        if key not in before:
+            print(f"{key:<26} {'-':>12} {result['per_op_us']:>12.1f} {'new':>8}")
+            continue
+        old = before[key]["per_op_us"]
+        change = (result["per_op_us"] - old) / old if old else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{key:<26} {old:>12.1f} {result['per_op_us']:>12.1f} {change:>+8.1%}{flag}")
+    missing = set(before) - {result_key(result) for result in results}
+    if missing:
+        print(f"# not run this time: {', '.join(sorted(missing))}")
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int_list, default=[1000, 10000], help="Corpus sizes for the store benchmarks")
+    parser.add_argument("--doc-words", type=int, default=120, help="Words per synthetic document")
+    parser.add_argument("--queries", type=int, default=200, help="Distinct queries cycled through")
+    parser.add_argument("--batch-size", type=int, default=32, help="Texts per create_embeddings/add_documents call")
+    parser.add_argument("--encoder", choices=["model", "hashing"], default="model",
+                        help="The configured sentence-transformers model, or mocks.embedding's hashing encoder")
+    parser.add_argument("--dimension", type=int, default=384, help="Vector size of the hashing encoder")
+    parser.add_argument("--qdrant-url", default=":memory:")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds spent timing each benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing rounds per benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="Write results as a baseline to this file")
+    parser.add_argument("--compare", help="Baseline file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    settings.QDRANT_URL = args.qdrant_url
+    settings.EMBEDDING_SERVER_SOCKET = None
+    config = {
+        "sizes": args.sizes,
+        "doc_words": args.doc_words,
+        "queries": args.queries,
+        "batch_size": args.batch_size,
+        "encoder": args.encoder,
+        "model": settings.EMBEDDING_MODEL if args.encoder == "model" else f"hashing-{args.dimension}",
+        "dimension": args.dimension if args.encoder == "hashing" else None,
+        "qdrant_url": args.qdrant_url,
+        "min_time": args.min_time,
+        "repeat": args.repeat,
+        "machine": f"{platform.machine()} {platform.processor() or ''} x{os.cpu_count()}".strip(),
+        "python": platform.python_version()
+    }
+    print(f"encoder: {config['model']}  store: {args.qdrant_url}  sizes: {args.sizes}")
+
+    results = Suite(args).run_all()
+    report = {"recorded_at": datetime.now(timezone.utc).isoformat(), "config": config, "results": results}
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"# baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, config, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
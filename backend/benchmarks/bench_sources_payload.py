@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Measure chat response size and serialization time for the sources payload.
+
+    python benchmarks/bench_sources_payload.py
+    python benchmarks/bench_sources_payload.py --doc-chars 20000 --sources 5 --json out.json
+
+Compares the old payload (full document content, stdlib JSON) with
+snippets plus ORJSONResponse, and with include_content=true plus
+ORJSONResponse. Timings cover building the sources list (including
+snippet extraction), FastAPI's jsonable_encoder pass and rendering.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.api.chat import ChatResponse, _compact_sources
+
+WORDS = (
+    "password reset vpn laptop printer payroll invoice leave policy email outlook access badge "
+    "onboarding expense refund network wifi license software install the to and of a in for is"
+).split()
+
+
+def make_sources(count: int, doc_chars: int, rng: random.Random) -> list:
+    sources = []
+    for i in range(count):
+        sentences = []
+        length = 0
+        while length < doc_chars:
+            sentence = " ".join(rng.choices(WORDS, k=rng.randint(8, 20))).capitalize() + "."
+            sentences.append(sentence)
+            length += len(sentence) + 1
+        sources.append({
+            "id": f"doc-{i}",
+            "score": 0.9 - i * 0.05,
+            "title": f"Article {i}",
+            "category": "General",
+            "department": "IT",
+            "content": " ".join(sentences)
+        })
+    return sources
+
+
+def measure(variant: str, sources: list, query: str, rounds: int) -> dict:
+    timings = []
+    body = b""
+    for _ in range(rounds):
+        started = time.perf_counter()
+        if variant == "full+json":
+            payload_sources, response_class = sources, JSONResponse
+        else:
+            payload_sources = _compact_sources(sources, query, include_content=(variant == "content+orjson"))
+            response_class = ORJSONResponse
+        response = ChatResponse(response="Here is what I found.", department="IT", sources=payload_sources)
+        body = response_class(jsonable_encoder(response)).body
+        timings.append(time.perf_counter() - started)
+    return {
+        "variant": variant,
+        "bytes": len(body),
+        "median_us": statistics.median(timings) * 1e6,
+        "p99_us": sorted(timings)[max(int(len(timings) * 0.99) - 1, 0)] * 1e6
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", type=int, default=3, help="Sources per response (chat returns 3)")
+    parser.add_argument("--doc-chars", type=int, default=4000, help="Length of each source document")
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--query", default="vpn not working after password reset")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    sources = make_sources(args.sources, args.doc_chars, random.Random(42))
+    results = [measure(variant, sources, args.query, args.rounds) for variant in ("full+json", "snippet+orjson", "content+orjson")]
+
+    print(f"{'variant':16} {'bytes':>9} {'median us':>10} {'p99 us':>9}")
+    for result in results:
+        print(f"{result['variant']:16} {result['bytes']:>9} {result['median_us']:>10.1f} {result['p99_us']:>9.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark import time of app.main and API cold start time.
+
+    python benchmarks/bench_startup.py                     # import time only
+    python benchmarks/bench_startup.py --startup           # also time uvicorn start
+    python benchmarks/bench_startup.py --max-import-ms 800 # fail on regression
+
+Import time is measured in fresh interpreters so module caches do not hide
+regressions. Startup time is the time until "/" answers (serving) and until
+"/ready" returns 200 (ready).
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported just by loading app.main
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "qdrant_client"]
+
+IMPORT_SNIPPET = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_import(runs: int) -> dict:
+    """Time `import app.main` in fresh interpreters and list the slowest modules"""
+    timings = []
+    heavy = set()
+    slowest = []
+    for i in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", IMPORT_SNIPPET],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        )
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        heavy.update(result["heavy"])
+
+        if i == 0:
+            # Lines look like: "import time:   self [us] | cumulative | module"
+            for line in proc.stderr.splitlines():
+                parts = line.split("|")
+                if len(parts) == 3 and parts[1].strip().isdigit():
+                    slowest.append((int(parts[1]), parts[2].strip()))
+            slowest = sorted(slowest, reverse=True)[:15]
+
+    return {
+        "runs": runs,
+        "median_ms": statistics.median(timings) * 1000,
+        "min_ms": min(timings) * 1000,
+        "max_ms": max(timings) * 1000,
+        "heavy_modules_imported": sorted(heavy),
+        "slowest_cumulative_ms": [{"module": name, "ms": us / 1000} for us, name in slowest]
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_startup(fast_start: bool, ready_timeout: float) -> dict:
+    """Start uvicorn and time how long until it serves and until it is ready"""
+    port = _free_port()
+    env = dict(os.environ, FAST_START="true" if fast_start else "false")
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    serving = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while time.perf_counter() - started < ready_timeout:
+                if proc.poll() is not None:
+                    break
+                try:
+                    if serving is None and client.get("/").status_code == 200:
+                        serving = time.perf_counter() - started
+                    if serving is not None and client.get("/ready").status_code == 200:
+                        ready = time.perf_counter() - started
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.05)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+    return {
+        "fast_start": fast_start,
+        "serving_s": serving,
+        "ready_s": ready,
+        "exited_early": proc.returncode not in (None, 0, -15)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time the import in")
+    parser.add_argument("--startup", action="store_true", help="Also time a full uvicorn start")
+    parser.add_argument("--slow-start", action="store_true", help="Time startup with FAST_START disabled")
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--max-import-ms", type=float, help="Exit non-zero if the median import exceeds this")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = {"import": measure_import(args.runs)}
+    if args.startup:
+        results["startup"] = measure_startup(not args.slow_start, args.ready_timeout)
+
+    imp = results["import"]
+    print(f"import app.main: median {imp['median_ms']:.0f} ms (min {imp['min_ms']:.0f}, max {imp['max_ms']:.0f})")
+    print(f"heavy modules imported: {', '.join(imp['heavy_modules_imported']) or 'none'}")
+    for entry in imp["slowest_cumulative_ms"][:10]:
+        print(f"  {entry['ms']:8.1f} ms  {entry['module']}")
+    if "startup" in results:
+        start = results["startup"]
+        print(f"startup: serving after {start['serving_s']}s, ready after {start['ready_s']}s")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = imp["heavy_modules_imported"] or (args.max_import_ms and imp["median_ms"] > args.max_import_ms)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
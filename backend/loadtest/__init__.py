@@ -0,0 +1 @@
+# End-to-end load tests of the API against the stand-ins in mocks/
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test of the API with local stand-ins for every dependency.
+
+Starts the mock Ollama, Zammad and BookStack servers from mocks/, seeds
+BookStack with the knowledge base, then runs the real app under uvicorn
+with an in-process Qdrant store and drives it with closed-loop clients:
+
+    python -m loadtest.run --concurrency 20 --duration 60 --output results/base.json
+    python -m loadtest.run --concurrency 20 --ollama-tokens-per-second 20 \\
+        --compare results/base.json --output results/slow-llm.json
+    python -m loadtest.run --target http://localhost:8000 --mix knowledge=1
+
+Each client sends a request, waits for the answer and sends the next,
+drawing endpoints from --mix. Per endpoint the JSON output has request
+and error counts, status codes, throughput and p50/p95/p99 latency;
+--compare prints the change against an earlier run. Without Redis
+(--redis-url) session memory and the indexing queue are off, as they
+would be in the app, and /health answers 503. --mock-embeddings swaps
+the sentence-transformers model for mocks.embedding, which measures
+everything but the model.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIRS = [os.path.join(os.path.dirname(BACKEND_DIR), "data"), "/app/data"]
+ENDPOINTS = ("chat", "knowledge", "health")
+PERCENTILES = (50, 95, 99)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def data_file(name: str) -> str:
+    for directory in DATA_DIRS:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    raise SystemExit(f"{name} not found in {DATA_DIRS}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """'chat=8,knowledge=1' -> endpoint weights"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}, expected one of {', '.join(ENDPOINTS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Stack:
+    """The mock dependencies and the app, each in its own process"""
+
+    def __init__(self, args: argparse.Namespace, workdir: str):
+        self.args = args
+        self.workdir = workdir
+        self.processes: List[Tuple[str, subprocess.Popen]] = []
+        self.urls: Dict[str, str] = {}
+
+    def _spawn(self, name: str, command: List[str], env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+        log = open(os.path.join(self.workdir, f"{name}.log"), "w")
+        process = subprocess.Popen(
+            command, cwd=BACKEND_DIR, env=env or os.environ.copy(),
+            stdout=log, stderr=subprocess.STDOUT, start_new_session=True
+        )
+        self.processes.append((name, process))
+        return process
+
+    def _mock(self, name: str, *options: str) -> str:
+        port = free_port()
+        faults = [
+            f"--latency-ms={getattr(self.args, f'{name}_latency_ms')}",
+            f"--jitter-ms={getattr(self.args, f'{name}_jitter_ms')}",
+            f"--error-rate={getattr(self.args, f'{name}_error_rate')}"
+        ]
+        self._spawn(name, [sys.executable, "-m", f"mocks.{name}", f"--port={port}", *faults, *options])
+        self.urls[name] = f"http://127.0.0.1:{port}"
+        return self.urls[name]
+
+    def _wait_http(self, name: str, url: str, timeout: float):
+        process = dict(self.processes)[name]
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{name} exited with {process.returncode}, see {self.workdir}/{name}.log")
+            try:
+                httpx.get(url, timeout=1.0)
+                return
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        raise RuntimeError(f"{name} did not come up within {timeout:.0f}s, see {self.workdir}/{name}.log")
+
+    def start(self) -> str:
+        args = self.args
+        ollama = self._mock(
+            "ollama",
+            f"--model={args.ollama_model}",
+            f"--tokens-per-second={args.ollama_tokens_per_second}",
+            f"--first-token-ms={args.ollama_first_token_ms}",
+            f"--response-tokens={args.ollama_response_tokens}",
+            f"--parallel={args.ollama_parallel}"
+        )
+        zammad = self._mock("zammad")
+        bookstack = self._mock("bookstack", "--pages=0")
+        for name in ("ollama", "zammad", "bookstack"):
+            self._wait_http(name, self.urls[name] + "/docs", args.startup_timeout)
+        pages = seed_bookstack(bookstack, args.pages)
+        logger.info(f"Mocks up; BookStack seeded with {pages} pages")
+
+        env = os.environ.copy()
+        env.update({
+            "OLLAMA_URL": ollama,
+            "OLLAMA_MODEL": args.ollama_model,
+            "ZAMMAD_URL": zammad,
+            "ZAMMAD_TOKEN": "loadtest",
+            "BOOKSTACK_URL": bookstack,
+            "BOOKSTACK_TOKEN_ID": "loadtest",
+            "BOOKSTACK_TOKEN_SECRET": "loadtest",
+            "BOOKSTACK_SYNC_INTERVAL_SECONDS": str(args.sync_interval),
+            "QDRANT_URL": args.qdrant_url,
+            "DATABASE_URL": f"sqlite:///{self.workdir}/helpdesk.db",
+            "DB_INIT_ON_STARTUP": "true",
+            "FAST_START": "true",
+            "RATE_LIMIT_ENABLED": "true" if args.rate_limit else "false",
+            "REDIS_URL": args.redis_url
+        })
+        if args.mock_embeddings:
+            socket_path = os.path.join(self.workdir, "embeddings.sock")
+            self._spawn("embedding", [
+                sys.executable, "-m", "mocks.embedding", f"--socket={socket_path}",
+                f"--latency-ms={args.embedding_latency_ms}"
+            ])
+            env["EMBEDDING_SERVER_SOCKET"] = socket_path
+
+        port = free_port()
+        self._spawn("app", [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--host=127.0.0.1", f"--port={port}",
+            f"--workers={args.app_workers}", "--log-level=warning", "--no-access-log"
+        ], env)
+        self.urls["app"] = f"http://127.0.0.1:{port}"
+        self._wait_http("app", self.urls["app"] + "/live", args.startup_timeout)
+        return self.urls["app"]
+
+    def stop(self):
+        for name, process in reversed(self.processes):
+            if process.poll() is None:
+                os.killpg(process.pid, signal.SIGTERM)
+        for name, process in reversed(self.processes):
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+
+
+def seed_bookstack(url: str, extra_pages: int) -> int:
+    """Create a book per department with the knowledge base articles, plus filler pages"""
+    with open(data_file("knowledge_base.json")) as f:
+        articles = json.load(f)["articles"]
+    with httpx.Client(base_url=url, timeout=10.0) as client:
+        books: Dict[str, int] = {}
+
+        def book_id(name: str) -> int:
+            if name not in books:
+                books[name] = client.post("/api/books", json={"name": name}).raise_for_status().json()["id"]
+            return books[name]
+
+        for article in articles:
+            client.post("/api/pages", json={
+                "book_id": book_id(article.get("department", "General")),
+                "name": article["title"],
+                "html": f"<p>{article['content']}</p>"
+            }).raise_for_status()
+        rng = random.Random(0)
+        for i in range(extra_pages):
+            article = rng.choice(articles)
+            words = article["content"].split()
+            rng.shuffle(words)
+            client.post("/api/pages", json={
+                "book_id": book_id(article.get("department", "General")),
+                "name": f"{article['title']} ({i})",
+                "html": f"<p>{' '.join(words)}</p>"
+            }).raise_for_status()
+    return len(articles) + extra_pages
+
+
+def chat_messages() -> List[str]:
+    with open(data_file("demo_tickets.json")) as f:
+        tickets = json.load(f)["tickets"]
+    with open(data_file("knowledge_base.json")) as f:
+        articles = json.load(f)["articles"]
+    messages = [f"{ticket['title']}. {ticket['description']}" for ticket in tickets]
+    messages += [f"How do I handle this: {article['title'].lower()}?" for article in articles]
+    return messages
+
+
+async def wait_until_serving(base_url: str, probe_query: str, timeout: float, need_vector_hits: bool):
+    """Wait for retrieval and generation, and for the knowledge base to be indexed"""
+    deadline = time.monotonic() + timeout
+    status: Dict[str, Any] = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=10.0) as client:
+        while time.monotonic() < deadline:
+            try:
+                status = (await client.get("/ready")).json()
+                capabilities = status.get("capabilities", {})
+                if capabilities.get("retrieval") and capabilities.get("generation"):
+                    if not need_vector_hits:
+                        return
+                    results = (await client.get(
+                        "/api/knowledge/articles/search", params={"q": probe_query}
+                    )).json().get("results", [])
+                    if any(result.get("source") == "vector" for result in results):
+                        return
+            except (httpx.HTTPError, ValueError):
+                pass
+            await asyncio.sleep(1.0)
+    raise RuntimeError(f"App not serving within {timeout:.0f}s, last /ready: {status}")
+
+
+class LoadGenerator:
+    """Closed-loop clients, each waiting for its answer before sending again"""
+
+    def __init__(self, base_url: str, args: argparse.Namespace, messages: List[str]):
+        self.base_url = base_url
+        self.args = args
+        self.messages = messages
+        self.endpoints = list(args.mix)
+        self.weights = [args.mix[name] for name in self.endpoints]
+        self.records: List[Tuple[str, float, int, bool, List[str]]] = []
+        self.recording = False
+
+    async def _request(self, client: httpx.AsyncClient, endpoint: str, rng: random.Random, worker: int):
+        message = rng.choice(self.messages)
+        if endpoint == "chat":
+            body = {"message": message, "user_id": f"loadtest-{worker % self.args.users}"}
+            if self.args.sessions:
+                body["session_id"] = f"loadtest-session-{worker}"
+            return await client.post("/api/chat/", json=body)
+        if endpoint == "knowledge":
+            return await client.get("/api/knowledge/articles/search", params={"q": message[:80]})
+        return await client.get("/health")
+
+    async def _worker(self, client: httpx.AsyncClient, worker: int, stop_at: float):
+        rng = random.Random(self.args.seed + worker)
+        while time.monotonic() < stop_at:
+            endpoint = rng.choices(self.endpoints, self.weights)[0]
+            started = time.perf_counter()
+            degraded: List[str] = []
+            try:
+                response = await self._request(client, endpoint, rng, worker)
+                status = response.status_code
+                if endpoint == "chat" and status == 200:
+                    degraded = response.json().get("degraded", [])
+            except httpx.HTTPError:
+                status = 0  # Connection error or client timeout
+            if self.recording:
+                self.records.append((endpoint, time.perf_counter() - started, status, 200 <= status < 300, degraded))
+
+    async def run(self) -> float:
+        """Warm up, then record for --duration seconds; returns the measured wall time"""
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.args.request_timeout, limits=limits) as client:
+            stop_at = time.monotonic() + self.args.warmup + self.args.duration
+            workers = [
+                asyncio.create_task(self._worker(client, worker, stop_at))
+                for worker in range(self.args.concurrency)
+            ]
+            await asyncio.sleep(self.args.warmup)
+            self.recording = True
+            started = time.monotonic()
+            await asyncio.gather(*workers)
+            return time.monotonic() - started
+
+
+def summarize(records: List[Tuple[str, float, int, bool, List[str]]], elapsed: float) -> Dict[str, Any]:
+    by_endpoint: Dict[str, List[Tuple[float, int, bool, List[str]]]] = {}
+    for endpoint, latency, status, ok, degraded in records:
+        by_endpoint.setdefault(endpoint, []).append((latency, status, ok, degraded))
+
+    def stats(rows: List[Tuple[float, int, bool, List[str]]]) -> Dict[str, Any]:
+        latencies = sorted(row[0] * 1000 for row in rows)
+        ok = sum(1 for row in rows if row[2])
+        summary = {
+            "requests": len(rows),
+            "ok": ok,
+            "errors": len(rows) - ok,
+            "error_rate": round((len(rows) - ok) / len(rows), 4) if rows else 0.0,
+            "status_codes": dict(sorted(Counter(str(row[1]) for row in rows).items())),
+            "throughput_rps": round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                **{f"p{pct}": round(percentile(latencies, pct), 1) for pct in PERCENTILES},
+                "mean": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+                "max": round(latencies[-1], 1) if latencies else 0.0
+            }
+        }
+        degraded = Counter(reason for row in rows for reason in row[3])
+        if degraded:
+            summary["degraded"] = dict(sorted(degraded.items()))
+        return summary
+
+    endpoints = {name: stats(rows) for name, rows in sorted(by_endpoint.items())}
+    all_rows = [row for rows in by_endpoint.values() for row in rows]
+    return {"endpoints": endpoints, "total": stats(all_rows)}
+
+
+def print_table(summary: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    columns = ["requests", "error_rate", "throughput_rps", "p50", "p95", "p99"]
+    print(f"{'endpoint':<10} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(summary["endpoints"].items()) + [("total", summary["total"])]
+    for name, stats in rows:
+        values = [stats["requests"], stats["error_rate"], stats["throughput_rps"]]
+        values += [stats["latency_ms"][f"p{pct}"] for pct in PERCENTILES]
+        print(f"{name:<10} {values[0]:>9} {values[1]:>7.2%} {values[2]:>8.2f} {values[3]:>9.1f} {values[4]:>9.1f} {values[5]:>9.1f}")
+        if not baseline:
+            continue
+        before = baseline["endpoints"].get(name) if name != "total" else baseline["total"]
+        if not before:
+            continue
+        old = [before["requests"], before["error_rate"], before["throughput_rps"]]
+        old += [before["latency_ms"][f"p{pct}"] for pct in PERCENTILES]
+        deltas = []
+        for column, new_value, old_value in zip(columns, values, old):
+            if column == "error_rate":
+                deltas.append(f"{(new_value - old_value) * 100:>+6.2f}pp")
+            else:
+                deltas.append(f"{(new_value - old_value) / old_value:>+8.1%}" if old_value else f"{'n/a':>8}")
+        print(f"{'  vs base':<10} {deltas[0]:>9} {deltas[1]:>7} {deltas[2]:>8} {deltas[3]:>9} {deltas[4]:>9} {deltas[5]:>9}")
+    for name, stats in summary["endpoints"].items():
+        if stats.get("degraded"):
+            print(f"{name} degraded: {', '.join(f'{k}={v}' for k, v in stats['degraded'].items())}")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    messages = chat_messages()
+    with ExitStack() as cleanup:
+        base_url = args.target
+        if not base_url:
+            workdir = tempfile.mkdtemp(prefix="helpdesk-loadtest-")
+            if not args.keep_logs:
+                cleanup.callback(shutil.rmtree, workdir, ignore_errors=True)
+            stack = Stack(args, workdir)
+            cleanup.callback(stack.stop)
+            base_url = stack.start()
+            logger.info(f"App starting at {base_url}, logs in {workdir}")
+
+        # Each worker has its own in-memory store, so only a single worker can be checked
+        need_vector_hits = not args.target and args.app_workers == 1
+        await wait_until_serving(base_url, messages[-1], args.startup_timeout, need_vector_hits)
+        logger.info(
+            f"Running {args.concurrency} clients for {args.duration:.0f}s "
+            f"after {args.warmup:.0f}s warm-up, mix {args.mix}"
+        )
+
+        generator = LoadGenerator(base_url, args, messages)
+        elapsed = await generator.run()
+        async with httpx.AsyncClient(base_url=base_url, timeout=10.0) as client:
+            try:
+                health = (await client.get("/health")).json()
+            except (httpx.HTTPError, ValueError) as e:
+                health = {"error": str(e)}
+
+    config = {
+        key: value for key, value in vars(args).items()
+        if key not in ("output", "compare", "keep_logs")
+    }
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "duration_s": round(elapsed, 2),
+        "config": config,
+        **summarize(generator.records, elapsed),
+        "health": health
+    }
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser, name: str, latency_ms: float):
+    group = parser.add_argument_group(f"mock {name}")
+    group.add_argument(f"--{name}-latency-ms", type=float, default=latency_ms, help="Added delay per request")
+    group.add_argument(f"--{name}-jitter-ms", type=float, default=0.0)
+    group.add_argument(f"--{name}-error-rate", type=float, default=0.0)
+    return group
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before recording")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("chat=8,knowledge=1,health=1"))
+    parser.add_argument("--users", type=int, default=50, help="Distinct user IDs the clients rotate through")
+    parser.add_argument("--sessions", action="store_true", help="Give each client a chat session_id")
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+
+    app = parser.add_argument_group("app")
+    app.add_argument("--target", help="Load an already running app instead of starting one with mocks")
+    app.add_argument("--app-workers", type=int, default=1)
+    app.add_argument("--qdrant-url", default=":memory:", help="Real Qdrant URL; needed for more than one app worker")
+    app.add_argument("--redis-url", default="redis://localhost:6379")
+    app.add_argument("--rate-limit", action="store_true", help="Keep rate limiting on (needs Redis)")
+    app.add_argument("--pages", type=int, default=200, help="Filler pages seeded into BookStack")
+    app.add_argument("--sync-interval", type=int, default=10, help="BookStack sync interval of the app")
+    app.add_argument("--mock-embeddings", action="store_true", help="Use mocks.embedding instead of the real model")
+    app.add_argument("--embedding-latency-ms", type=float, default=0.0, help="Per forward pass, with --mock-embeddings")
+    app.add_argument("--startup-timeout", type=float, default=300.0)
+    app.add_argument("--keep-logs", action="store_true", help="Keep the process logs and database")
+
+    ollama = add_mock_arguments(parser, "ollama", 0.0)
+    ollama.add_argument("--ollama-model", default="tinyllama")
+    ollama.add_argument("--ollama-tokens-per-second", type=float, default=50.0)
+    ollama.add_argument("--ollama-first-token-ms", type=float, default=200.0)
+    ollama.add_argument("--ollama-response-tokens", type=int, default=80)
+    ollama.add_argument("--ollama-parallel", type=int, default=4)
+    add_mock_arguments(parser, "zammad", 50.0)
+    add_mock_arguments(parser, "bookstack", 30.0)
+    args = parser.parse_args()
+
+    if not args.target and args.app_workers > 1 and args.qdrant_url == ":memory:":
+        parser.error("--app-workers > 1 needs --qdrant-url; each worker would index its own in-memory store")
+
+    results = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
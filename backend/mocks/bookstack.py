@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+In-memory BookStack API stand-in for local testing.
+
+Implements the subset of the BookStack REST API the backend uses: book and
+page listing with count/offset/sort/filter, page read/create/update/delete,
+and search. Run with:
+
+    python -m mocks.bookstack --port 6876 --pages 100 --latency-ms 50 --error-rate 0.01
+
+then point BOOKSTACK_URL at http://localhost:6876.
+"""
+
+import argparse
+import itertools
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+
+from .faults import FaultInjection, add_fault_arguments, fault_options
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000000Z")
+
+
+def _matches(item: Dict[str, Any], field: str, op: str, value: str) -> bool:
+    current = str(item.get(field, ""))
+    if field.endswith("_at"):
+        # Compare timestamps in BookStack's 'YYYY-MM-DD HH:MM:SS' filter form
+        current = current.replace("T", " ")[:19]
+        value = value.replace("T", " ")[:19]
+    return {
+        "eq": current == value,
+        "ne": current != value,
+        "gt": current > value,
+        "gte": current >= value,
+        "lt": current < value,
+        "lte": current <= value,
+        "like": value.strip("%") in current,
+    }[op]
+
+
+def _listing(items: List[Dict[str, Any]], request: Request) -> Dict[str, Any]:
+    """Apply BookStack's listing parameters to a collection"""
+    params = request.query_params
+    for key, value in params.items():
+        if key.startswith("filter[") and key.endswith("]"):
+            field, _, op = key[7:-1].partition(":")
+            items = [item for item in items if _matches(item, field, op or "eq", value)]
+
+    sort = params.get("sort", "+id")
+    items = sorted(items, key=lambda item: item.get(sort[1:]) or "", reverse=sort.startswith("-"))
+
+    count = min(int(params.get("count", 100)), 500)
+    offset = int(params.get("offset", 0))
+    summary = [{k: v for k, v in item.items() if k != "html"} for item in items[offset:offset + count]]
+    return {"data": summary, "total": len(items)}
+
+
+def create_app(pages: int = 0, books: int = 3, faults: Optional[Dict[str, Any]] = None) -> FastAPI:
+    app = FastAPI(title="Mock BookStack")
+    if faults:
+        app.add_middleware(FaultInjection, **faults)
+    ids = itertools.count(1)
+    app.state.books = {}
+    app.state.pages = {}
+
+    def add_book(name: str) -> Dict[str, Any]:
+        book = {"id": next(ids), "name": name, "slug": name.lower(), "created_at": _now(), "updated_at": _now()}
+        app.state.books[book["id"]] = book
+        return book
+
+    def add_page(book_id: int, name: str, html: str) -> Dict[str, Any]:
+        page = {
+            "id": next(ids), "book_id": book_id, "name": name, "slug": name.lower().replace(" ", "-"),
+            "html": html, "created_at": _now(), "updated_at": _now()
+        }
+        app.state.pages[page["id"]] = page
+        return page
+
+    seeded_books = [add_book(name) for name in ["IT", "HR", "Finance", "Operations", "Security"][:books]]
+    for i in range(pages):
+        book = seeded_books[i % len(seeded_books)]
+        add_page(book["id"], f"{book['name']} article {i}", f"<h1>{book['name']} article {i}</h1><p>Steps for issue {i}.</p>")
+
+    @app.get("/api/books")
+    async def list_books(request: Request):
+        return _listing(list(app.state.books.values()), request)
+
+    @app.post("/api/books")
+    async def create_book(request: Request):
+        body = await request.json()
+        return add_book(body["name"])
+
+    @app.get("/api/pages")
+    async def list_pages(request: Request):
+        return _listing(list(app.state.pages.values()), request)
+
+    @app.post("/api/pages")
+    async def create_page(request: Request):
+        body = await request.json()
+        if body.get("book_id") not in app.state.books:
+            raise HTTPException(status_code=422, detail="book_id does not exist")
+        return add_page(body["book_id"], body["name"], body.get("html", ""))
+
+    @app.get("/api/pages/{page_id}")
+    async def get_page(page_id: int):
+        if page_id not in app.state.pages:
+            raise HTTPException(status_code=404, detail="Page not found")
+        return app.state.pages[page_id]
+
+    @app.put("/api/pages/{page_id}")
+    async def update_page(page_id: int, request: Request):
+        if page_id not in app.state.pages:
+            raise HTTPException(status_code=404, detail="Page not found")
+        body = await request.json()
+        page = app.state.pages[page_id]
+        page.update({k: v for k, v in body.items() if k in ("name", "html", "book_id")})
+        page["updated_at"] = _now()
+        return page
+
+    @app.delete("/api/pages/{page_id}", status_code=204)
+    async def delete_page(page_id: int):
+        if app.state.pages.pop(page_id, None) is None:
+            raise HTTPException(status_code=404, detail="Page not found")
+
+    @app.get("/api/search")
+    async def search(query: str, count: Optional[int] = 20):
+        terms = query.lower().split()
+        hits = [
+            {
+                "id": page["id"], "name": page["name"], "type": "page", "book_id": page["book_id"],
+                "preview_html": {"name": page["name"], "content": page["html"][:200]}
+            }
+            for page in app.state.pages.values()
+            if any(term in (page["name"] + " " + page["html"]).lower() for term in terms)
+        ]
+        return {"data": hits[:count], "total": len(hits)}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a mock BookStack API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6876)
+    parser.add_argument("--pages", type=int, default=20, help="Number of seeded pages")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(pages=args.pages, faults=fault_options(args)), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Embedding server stand-in that hashes words instead of running a model.
+
+Speaks the same Unix socket protocol as app.services.embedding_server, so
+API workers use it through EMBEDDING_SERVER_SOCKET without loading torch.
+Texts sharing words get similar vectors, which is enough for retrieval to
+return plausible hits. Run with:
+
+    python -m mocks.embedding --socket /tmp/embeddings.sock --latency-ms 5
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import time
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.embedding_server import EmbeddingServer
+
+
+class HashingEncoder:
+    """Bag-of-words vectors from hashed words, normalized like the real model's"""
+
+    def __init__(self, dimension: int, latency_ms: float):
+        self.dimension = dimension
+        self.latency = latency_ms / 1000
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        if self.latency:
+            # Charge per forward pass, as a model would
+            time.sleep(self.latency * -(-len(texts) // batch_size))
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, int.from_bytes(hashlib.md5(word.encode()).digest()[:4], "little") % self.dimension] += 1
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class MockEmbeddingServer(EmbeddingServer):
+    def __init__(self, socket_path: str, dimension: int, latency_ms: float):
+        super().__init__(socket_path)
+        self.encoder = HashingEncoder(dimension, latency_ms)
+
+    def _model(self, name: str):
+        return self.encoder
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a mock embedding server")
+    parser.add_argument("--socket", required=True, help="Unix socket path")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay per forward pass of up to 32 texts")
+    args = parser.parse_args()
+
+    asyncio.run(MockEmbeddingServer(args.socket, args.dimension, args.latency_ms).serve())
@@ -0,0 +1,69 @@
+"""
+Latency and failure injection for the mock services.
+
+Wrap a mock app with FaultInjection, or use add_fault_arguments and
+fault_options to expose the same knobs on its command line.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+from typing import Any, Dict, Iterable
+
+
+class FaultInjection:
+    """ASGI middleware that delays requests and fails a share of them"""
+
+    def __init__(
+        self,
+        app,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        exclude: Iterable[str] = ()
+    ):
+        self.app = app
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.exclude = set(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        delay = max(0.0, random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.error_rate and random.random() < self.error_rate:
+            body = json.dumps({"error": "injected failure"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": self.error_status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        await self.app(scope, receive, send)
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Standard deviation of the delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failed with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+
+
+def fault_options(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "error_status": args.error_status
+    }
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Ollama API stand-in that generates filler text at a fixed token rate.
+
+Implements the endpoints the backend uses: /api/tags, /api/pull and
+/api/generate, streaming (newline-delimited JSON, Ollama's default) or
+not. Each completion waits --first-token-ms for prompt processing, then
+emits --response-tokens tokens at --tokens-per-second. At most --parallel
+completions run at once and the rest queue, like OLLAMA_NUM_PARALLEL.
+Run with:
+
+    python -m mocks.ollama --port 11434 --tokens-per-second 30 --parallel 2
+
+then point OLLAMA_URL at http://localhost:11434.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from .faults import FaultInjection, add_fault_arguments, fault_options
+
+FILLER = (
+    "Thanks for reaching out. Based on the knowledge base, first check that you are connected "
+    "to the company network, then sign out and back in. If the problem persists, restart the "
+    "device and try again. Let us know if you need further help and we will follow up."
+).split()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def create_app(
+    models: Iterable[str] = ("tinyllama",),
+    tokens_per_second: float = 50.0,
+    first_token_ms: float = 200.0,
+    response_tokens: int = 80,
+    parallel: int = 4,
+    faults: Optional[Dict[str, Any]] = None
+) -> FastAPI:
+    app = FastAPI(title="Mock Ollama")
+    if faults:
+        # Faults apply to generation; model listing and pulls stay reliable
+        app.add_middleware(FaultInjection, exclude=("/api/tags", "/api/pull"), **faults)
+    app.state.models = {model.split(":")[0] for model in models}
+    app.state.slots = asyncio.Semaphore(parallel)
+
+    def known(model: str) -> bool:
+        return model.split(":")[0] in app.state.models
+
+    def not_found(model: str) -> JSONResponse:
+        return JSONResponse(status_code=404, content={"error": f"model '{model}' not found, try pulling it first"})
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": f"{model}:latest", "model": f"{model}:latest", "size": 0} for model in sorted(app.state.models)]}
+
+    @app.post("/api/pull")
+    async def pull(request: Request):
+        body = await request.json()
+        app.state.models.add((body.get("name") or body.get("model", "")).split(":")[0])
+        if body.get("stream", True):
+            lines = [{"status": "pulling manifest"}, {"status": "success"}]
+            return StreamingResponse((json.dumps(line) + "\n" for line in lines), media_type="application/x-ndjson")
+        return {"status": "success"}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        model = body.get("model", "")
+        if not known(model):
+            return not_found(model)
+        if not body.get("prompt"):
+            # An empty prompt only loads the model
+            return {"model": model, "created_at": _now(), "response": "", "done": True, "done_reason": "load"}
+
+        count = int((body.get("options") or {}).get("num_predict") or response_tokens)
+        tokens = [word + " " for word in itertools.islice(itertools.cycle(FILLER), count)]
+        prompt_tokens = len(body["prompt"]) // 4
+
+        def final(started: float) -> Dict[str, Any]:
+            return {
+                "model": model, "created_at": _now(), "done": True, "done_reason": "stop",
+                "prompt_eval_count": prompt_tokens, "eval_count": count,
+                "total_duration": int((time.perf_counter() - started) * 1e9)
+            }
+
+        if not body.get("stream", True):
+            async with app.state.slots:
+                started = time.perf_counter()
+                await asyncio.sleep(first_token_ms / 1000 + count / tokens_per_second)
+                return {**final(started), "response": "".join(tokens).strip()}
+
+        async def stream():
+            async with app.state.slots:
+                started = time.perf_counter()
+                await asyncio.sleep(first_token_ms / 1000)
+                for token in tokens:
+                    yield json.dumps({"model": model, "created_at": _now(), "response": token, "done": False}) + "\n"
+                    await asyncio.sleep(1 / tokens_per_second)
+                yield json.dumps({**final(started), "response": ""}) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a mock Ollama API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", action="append", help="Model to serve (repeatable, default tinyllama)")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--first-token-ms", type=float, default=200.0, help="Prompt processing time")
+    parser.add_argument("--response-tokens", type=int, default=80)
+    parser.add_argument("--parallel", type=int, default=4, help="Completions generated at once")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    app = create_app(
+        models=args.model or ["tinyllama"],
+        tokens_per_second=args.tokens_per_second,
+        first_token_ms=args.first_token_ms,
+        response_tokens=args.response_tokens,
+        parallel=args.parallel,
+        faults=fault_options(args)
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+In-memory Zammad API stand-in for local testing.
+
+Implements the subset of the Zammad REST API the backend uses: ticket
+create/read/search, ticket articles and /users/me. Any token or basic
+auth credentials are accepted. Run with:
+
+    python -m mocks.zammad --port 6877 --latency-ms 150 --jitter-ms 50 --error-rate 0.02
+
+then point ZAMMAD_URL at http://localhost:6877.
+"""
+
+import argparse
+import itertools
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from .faults import FaultInjection, add_fault_arguments, fault_options
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def create_app(faults: Optional[Dict[str, Any]] = None) -> FastAPI:
+    app = FastAPI(title="Mock Zammad")
+    if faults:
+        app.add_middleware(FaultInjection, **faults)
+    ids = itertools.count(1)
+    app.state.tickets = {}
+    app.state.articles = {}
+
+    def add_article(ticket_id: int, body: Dict[str, Any]) -> Dict[str, Any]:
+        article = {
+            "id": next(ids), "ticket_id": ticket_id, "subject": body.get("subject", ""),
+            "body": body.get("body", ""), "type": body.get("type", "note"),
+            "internal": body.get("internal", False), "created_at": _now()
+        }
+        app.state.articles[article["id"]] = article
+        return article
+
+    @app.get("/api/v1/users/me")
+    async def me():
+        return {"id": 1, "login": "admin@example.com", "active": True}
+
+    @app.post("/api/v1/tickets", status_code=201)
+    async def create_ticket(request: Request):
+        body = await request.json()
+        if not body.get("title"):
+            raise HTTPException(status_code=422, detail="title is required")
+        ticket_id = next(ids)
+        ticket = {
+            "id": ticket_id, "number": str(10000 + ticket_id), "title": body["title"],
+            "group": body.get("group", "Users"), "customer_id": body.get("customer_id"),
+            "state_id": body.get("state_id", 1), "priority_id": body.get("priority_id", 2),
+            "created_at": _now(), "updated_at": _now()
+        }
+        app.state.tickets[ticket_id] = ticket
+        if body.get("article"):
+            add_article(ticket_id, body["article"])
+        return ticket
+
+    @app.get("/api/v1/tickets/search")
+    async def search_tickets(query: str = "", limit: int = 10):
+        terms = query.lower().split()
+        matches = [
+            ticket for ticket in app.state.tickets.values()
+            if all(term in ticket["title"].lower() for term in terms)
+        ][:limit]
+        return {
+            "tickets": [ticket["id"] for ticket in matches],
+            "tickets_count": len(matches),
+            "assets": {"Ticket": {str(ticket["id"]): ticket for ticket in matches}}
+        }
+
+    @app.get("/api/v1/tickets/{ticket_id}")
+    async def get_ticket(ticket_id: int):
+        if ticket_id not in app.state.tickets:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+        return app.state.tickets[ticket_id]
+
+    @app.post("/api/v1/ticket_articles", status_code=201)
+    async def create_article(request: Request):
+        body = await request.json()
+        ticket_id = int(body.get("ticket_id") or 0)
+        if ticket_id not in app.state.tickets:
+            return JSONResponse(status_code=422, content={"error": "ticket_id does not exist"})
+        app.state.tickets[ticket_id]["updated_at"] = _now()
+        return add_article(ticket_id, body)
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a mock Zammad API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6877)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(faults=fault_options(args)), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Build the answer store for recurring chat intents from the query log
+
+    python scripts/build_answer_store.py status
+    python scripts/build_answer_store.py build --days 14 --top 50 --drafts answers.json
+    python scripts/build_answer_store.py publish answers.json
+    python scripts/build_answer_store.py refresh --drafts refreshed.json
+    python scripts/build_answer_store.py build --auto-approve
+
+`build` reads the chat queries logged in Redis (PII scrubbed, with their
+embeddings) for the model being served and clusters them: each query
+joins the nearest cluster whose centroid is within --similarity, or
+starts a new one. The --top largest clusters with at least --min-count
+queries are the intents. Intents the store already answers are skipped
+unless --regenerate is given.
+
+For each remaining intent the KB is searched with the cluster centroid,
+and LLMService answers the query closest to the centroid from those
+documents. Generation runs one intent at a time with --pause seconds in
+between, so it never takes more than one of Ollama's parallel slots
+from live chat. Answers then go through automatic checks: there must be
+KB documents above --min-source-score, at least --min-grounding of the
+answer's words must appear in them, and the answer must be of a sensible
+length, not hedge or refuse, and not echo scrubbed placeholders. The word
+overlap only catches answers that ignore their sources; it does not
+prove every statement is supported, which is what review is for.
+
+By default the answers are written to --drafts for review. Reviewers
+edit an answer if needed and set "approved": true, and `publish` writes
+the approved ones to the store. --auto-approve publishes every answer
+that passes the checks straight away.
+
+Chat marks an answer stale as soon as a document it cites has changed
+or been deleted, and stops serving it. `refresh` regenerates stale
+answers the same way, with their original query and vector.
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.services.answer_store import STALE, AnswerStore, content_fingerprint, intent_point_id
+from app.services.llm_service import LLMService
+from app.services.query_log import QueryLog
+from app.services.rag_service import ActiveIndex, RAGService
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+HEDGES = re.compile(r"\b(i don't know|i do not know|i'm not sure|i am not sure|i cannot help|as an ai)\b", re.IGNORECASE)
+PLACEHOLDERS = re.compile(r"<(email|url|ip|iban|number|secret|name)>")
+# Words long enough to carry content, for the grounding check
+CONTENT_WORDS = re.compile(r"[a-z0-9]{4,}")
+
+
+def cluster_queries(vectors: np.ndarray, weights: np.ndarray, similarity: float) -> List[List[int]]:
+    """Single-pass clustering of normalized vectors by cosine similarity to running centroids"""
+    dimension = vectors.shape[1]
+    sums = np.zeros((64, dimension), dtype=np.float32)
+    centroids = np.zeros((64, dimension), dtype=np.float32)
+    clusters: List[List[int]] = []
+    for i, vector in enumerate(vectors):
+        if clusters:
+            scores = centroids[:len(clusters)] @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= similarity:
+                clusters[best].append(i)
+                sums[best] += vector * weights[i]
+                centroids[best] = sums[best] / np.linalg.norm(sums[best])
+                continue
+        if len(clusters) == len(sums):
+            sums = np.vstack([sums, np.zeros_like(sums)])
+            centroids = np.vstack([centroids, np.zeros_like(centroids)])
+        sums[len(clusters)] = vector * weights[i]
+        centroids[len(clusters)] = vector
+        clusters.append([i])
+    return clusters
+
+
+def grounding(answer: str, sources: List[Dict[str, Any]]) -> float:
+    """Share of the answer's distinct content words that also appear in its sources"""
+    words = set(CONTENT_WORDS.findall(answer.lower()))
+    if not words:
+        return 0.0
+    source_words = set(CONTENT_WORDS.findall(" ".join(source["content"] for source in sources).lower()))
+    return len(words & source_words) / len(words)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class AnswerStoreBuilder:
+    def __init__(self, rag_service: RAGService, answer_store: AnswerStore, llm_service: LLMService, args: argparse.Namespace):
+        self.rag_service = rag_service
+        self.answer_store = answer_store
+        self.llm_service = llm_service
+        self.args = args
+        self.active: ActiveIndex = rag_service.active
+
+    async def find_intents(self, query_log: QueryLog) -> List[Dict[str, Any]]:
+        """Cluster the logged queries of the served model into the top intents"""
+        since_ms = int((time.time() - self.args.days * 86400) * 1000)
+        # Identical scrubbed queries are merged up front and weighted by count
+        texts: Dict[str, Dict[str, Any]] = {}
+        skipped = 0
+        async for entry in query_log.entries(since_ms):
+            if entry["model"] != self.active.model:
+                skipped += 1
+                continue
+            key = " ".join(entry["query"].lower().split())
+            seen = texts.setdefault(key, {"query": entry["query"], "embedding": entry["embedding"], "count": 0, "departments": {}})
+            seen["count"] += 1
+            seen["departments"][entry["department"]] = seen["departments"].get(entry["department"], 0) + 1
+        total = sum(item["count"] for item in texts.values())
+        logger.info(f"{total} logged queries ({len(texts)} distinct) in the last {self.args.days} days"
+                    + (f"; {skipped} from other models ignored" if skipped else ""))
+        if not texts:
+            return []
+
+        # Most frequent queries first, so they seed the clusters
+        items = sorted(texts.values(), key=lambda item: -item["count"])
+        vectors = normalize(np.stack([item["embedding"] for item in items]))
+        weights = np.array([item["count"] for item in items], dtype=np.float32)
+        clusters = cluster_queries(vectors, weights, self.args.similarity)
+
+        intents = []
+        for members in clusters:
+            count = int(weights[members].sum())
+            if count < self.args.min_count:
+                continue
+            centroid = normalize((vectors[members] * weights[members, None]).sum(axis=0))
+            representative = members[int(np.argmax(vectors[members] @ centroid))]
+            departments: Dict[str, int] = {}
+            for member in members:
+                for department, hits in items[member]["departments"].items():
+                    departments[department] = departments.get(department, 0) + hits
+            intents.append({
+                "query": items[representative]["query"],
+                "department": max(departments, key=departments.get),
+                "count": count,
+                "share": round(count / total, 4),
+                "vector": centroid
+            })
+        intents.sort(key=lambda intent: -intent["count"])
+        logger.info(f"{len(clusters)} clusters, {len(intents)} with at least {self.args.min_count} queries")
+        return intents[:self.args.top]
+
+    def vet(self, answer: str, sources: List[Dict[str, Any]]) -> List[str]:
+        """Reasons an answer should not be published automatically"""
+        problems = []
+        if not sources:
+            problems.append(f"no KB document scored above {self.args.min_source_score}")
+        elif grounding(answer, sources) < self.args.min_grounding:
+            problems.append(f"answer shares under {self.args.min_grounding:.0%} of its words with its sources")
+        if len(answer) < self.args.min_answer_chars:
+            problems.append("answer too short")
+        if len(answer) > self.args.max_answer_chars:
+            problems.append("answer too long")
+        if HEDGES.search(answer):
+            problems.append("answer hedges or refuses")
+        if PLACEHOLDERS.search(answer):
+            problems.append("answer contains a scrubbed placeholder")
+        return problems
+
+    async def generate(self, intent: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer an intent from the KB documents nearest its centroid"""
+        hits = self.rag_service.search_by_embedding(list(map(float, intent["vector"])), self.active, 3)
+        sources = [hit for hit in hits if hit["score"] >= self.args.min_source_score]
+        answer = ""
+        if sources:
+            answer = (await self.llm_service.generate_response(
+                intent["query"], self.rag_service.format_context(sources), timeout=self.args.timeout
+            )).strip()
+        problems = self.vet(answer, sources)
+        return {
+            "intent_id": intent.get("intent_id") or intent_point_id(intent["query"]),
+            "query": intent["query"],
+            "department": intent["department"],
+            "count": intent.get("count", 0),
+            "share": intent.get("share", 0.0),
+            "answer": answer,
+            "sources": [
+                {
+                    "id": source["id"],
+                    "title": source["title"],
+                    "score": round(source["score"], 4),
+                    "fingerprint": content_fingerprint(source["content"])
+                }
+                for source in sources
+            ],
+            "llm_model": self.llm_service.model_name,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "vector": [round(float(value), 6) for value in intent["vector"]],
+            "problems": problems,
+            "approved": False
+        }
+
+    async def generate_all(self, intents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        answers = []
+        for i, intent in enumerate(intents, 1):
+            if i > 1:
+                await asyncio.sleep(self.args.pause)
+            try:
+                answer = await self.generate(intent)
+            except Exception as e:
+                logger.error(f"✗ [{i}/{len(intents)}] {intent['query']!r}: {e}")
+                continue
+            answer["approved"] = self.args.auto_approve and not answer["problems"]
+            mark = "✓" if not answer["problems"] else "✗ " + "; ".join(answer["problems"])
+            logger.info(f"{mark} [{i}/{len(intents)}] {answer['count']} x {answer['query']!r}")
+            answers.append(answer)
+        return answers
+
+    def existing(self) -> List[Dict[str, Any]]:
+        return list(self.answer_store.entries(self.active, with_vectors=True))
+
+    async def build(self, query_log: QueryLog) -> List[Dict[str, Any]]:
+        intents = await self.find_intents(query_log)
+        if not self.args.regenerate:
+            # An intent is covered if a current answer sits within the clustering threshold
+            covered = [
+                np.asarray(entry["vector"], dtype=np.float32) for entry in self.existing()
+                if entry.get("status") != STALE and self.answer_store.current_sources(self.active, entry) is not None
+            ]
+            if covered:
+                stored = normalize(np.stack(covered))
+                before = len(intents)
+                intents = [intent for intent in intents if (stored @ intent["vector"]).max() < self.args.similarity]
+                logger.info(f"{before - len(intents)} intents already answered in the store")
+        return await self.generate_all(intents)
+
+    async def refresh(self) -> List[Dict[str, Any]]:
+        stale = []
+        for entry in self.existing():
+            if entry.get("status") == STALE or self.answer_store.current_sources(self.active, entry) is None:
+                stale.append(entry)
+        if stale:
+            self.answer_store.mark_stale(self.active, [entry["intent_id"] for entry in stale])
+        logger.info(f"{len(stale)} stale answers to regenerate")
+        return await self.generate_all(stale)
+
+    def publish(self, answers: List[Dict[str, Any]]) -> int:
+        approved = [
+            {key: value for key, value in answer.items() if key not in ("approved", "problems")}
+            for answer in answers if answer.get("approved")
+        ]
+        if approved:
+            self.answer_store.upsert(self.active, approved)
+        logger.info(f"✅ Published {len(approved)} of {len(answers)} answers to {self.answer_store.collection_name(self.active)}")
+        return len(approved)
+
+    def status(self):
+        entries = self.existing()
+        logger.info(f"{self.answer_store.collection_name(self.active)}: {len(entries)} answers")
+        for entry in sorted(entries, key=lambda entry: -entry.get("count", 0)):
+            fresh = entry.get("status") != STALE and self.answer_store.current_sources(self.active, entry) is not None
+            logger.info(f"  {'ready' if fresh else 'stale'} {entry.get('count', 0):>6} {entry.get('department', ''):<10} {entry['query'][:80]!r}")
+
+
+def write_drafts(path: str, active: ActiveIndex, answers: List[Dict[str, Any]]):
+    with open(path, "w") as f:
+        json.dump({"model": active.model, "dimension": active.dimension, "answers": answers}, f, indent=2)
+    logger.info(f"Wrote {len(answers)} answers to {path} for review; set \"approved\": true and run publish")
+
+
+async def run(args: argparse.Namespace) -> bool:
+    from qdrant_client import QdrantClient
+
+    rag_service = RAGService()
+    rag_service.client = QdrantClient(url=settings.QDRANT_URL, timeout=60)
+    rag_service.active = rag_service._resolve_active()
+    answer_store = AnswerStore(rag_service)
+    llm_service = LLMService()
+    builder = AnswerStoreBuilder(rag_service, answer_store, llm_service, args)
+    logger.info(f"Serving {rag_service.active.collection} ({rag_service.active.model})")
+
+    try:
+        if args.command == "status":
+            builder.status()
+            return True
+
+        if args.command == "publish":
+            with open(args.drafts_file) as f:
+                drafts = json.load(f)
+            if (drafts["model"], drafts["dimension"]) != (rag_service.active.model, rag_service.active.dimension):
+                logger.error(f"Drafts were made for {drafts['model']}, but {rag_service.active.model} is served; rebuild them")
+                return False
+            builder.publish(drafts["answers"])
+            return True
+
+        await llm_service.initialize()
+        if not llm_service.ready:
+            logger.error(f"Model {llm_service.model_name} is not available at {settings.OLLAMA_URL}")
+            return False
+
+        if args.command == "build":
+            query_log = QueryLog(rag_service)
+            await query_log.initialize()
+            try:
+                answers = await builder.build(query_log)
+            finally:
+                await query_log.cleanup()
+        else:
+            answers = await builder.refresh()
+
+        if args.auto_approve:
+            builder.publish(answers)
+        if args.drafts and answers:
+            write_drafts(args.drafts, rag_service.active, answers)
+        elif not args.auto_approve and answers:
+            logger.warning("Nothing published: pass --drafts to review the answers or --auto-approve")
+        return True
+    finally:
+        rag_service.client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the answer store for recurring chat intents")
+    parser.add_argument("command", choices=["status", "build", "refresh", "publish"])
+    parser.add_argument("drafts_file", nargs="?", help="Reviewed drafts to publish")
+    parser.add_argument("--days", type=float, default=14, help="How far back to read the query log")
+    parser.add_argument("--top", type=int, default=50, help="Number of intents to answer")
+    parser.add_argument("--min-count", type=int, default=20, help="Queries an intent needs in the window")
+    parser.add_argument("--similarity", type=float, default=0.85, help="Cosine similarity to join a cluster")
+    parser.add_argument("--regenerate", action="store_true", help="Also regenerate intents that already have an answer")
+    parser.add_argument("--min-source-score", type=float, default=0.5, help="Score a KB document needs to ground an answer")
+    parser.add_argument("--min-grounding", type=float, default=0.4,
+                        help="Share of the answer's content words that must appear in its sources")
+    parser.add_argument("--min-answer-chars", type=int, default=80)
+    parser.add_argument("--max-answer-chars", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds per generation")
+    parser.add_argument("--pause", type=float, default=2.0, help="Seconds between generations")
+    parser.add_argument("--drafts", help="Write the generated answers here for review")
+    parser.add_argument("--auto-approve", action="store_true", help="Publish answers that pass the checks")
+    args = parser.parse_args()
+    if args.command == "publish" and not args.drafts_file:
+        parser.error("publish needs the reviewed drafts file")
+
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Import a historical ticket dump (JSON or JSONL) into Zammad
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import itertools
+import logging
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.ticket_service import TicketService
+from app.utils.json_stream import iter_json_records
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+async def import_tickets(path: str, key: str, concurrency: int, chunk_size: int):
+    """Stream tickets from a dump and create them in chunks"""
+    ticket_service = TicketService()
+    records = iter_json_records(path, key=key)
+    created = failed = 0
+    started = time.perf_counter()
+
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            break
+
+        results = await ticket_service.create_tickets(chunk, concurrency=concurrency)
+        for result in results:
+            if result["status"] == "created":
+                created += 1
+            else:
+                failed += 1
+                ticket = chunk[result["index"]]
+                logger.error(f"✗ Failed to import '{ticket.get('title', '?')}': {result['error']}")
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Imported {created} tickets, {failed} failed ({(created + failed) / elapsed:.1f} tickets/s)")
+
+    return created, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a ticket dump into Zammad")
+    parser.add_argument("path", help="JSON or JSONL file with ticket records")
+    parser.add_argument("--key", default="tickets", help="Key of the ticket array in wrapped JSON dumps")
+    parser.add_argument("--concurrency", type=int, default=settings.TICKET_IMPORT_CONCURRENCY)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    key = None if args.path.endswith((".jsonl", ".ndjson")) else args.key
+    created, failed = asyncio.run(import_tickets(args.path, key, args.concurrency, args.chunk_size))
+    logger.info(f"\n✅ Import finished: {created} created, {failed} failed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
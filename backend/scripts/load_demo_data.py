@@ -7,6 +7,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.services.rag_service import RAGService
 from app.services.ticket_service import TicketService
+from app.utils.json_stream import iter_json_records
 
 async def load_demo_data():
     """Load demo data into the system"""
@@ -30,23 +31,26 @@ async def load_demo_data():
         print(f"Added article: {article['title']} (ID: {doc_id})")
     
     # Load demo tickets
-    with open('/app/data/demo_tickets.json', 'r') as f:
-        ticket_data = json.load(f)
-    
     print("\nLoading demo tickets...")
-    for ticket in ticket_data['tickets']:
-        # Create resolved tickets for training
-        ticket_id = await ticket_service.create_ticket({
+    tickets = [
+        {
             "title": ticket['title'],
             "description": ticket['description'],
             "department": ticket['department'],
             "user_id": "demo_user",
             "priority": ticket['priority'],
-            "status": "resolved"
-        })
-        
+            # Create resolved tickets for training
+            "status": "resolved",
+            "category": ticket['category'],
+            "resolution": ticket.get('resolution')
+        }
+        for ticket in iter_json_records('/app/data/demo_tickets.json', key='tickets')
+    ]
+    results = await ticket_service.create_tickets(tickets)
+    
+    for ticket, result in zip(tickets, results):
         # Add resolution to knowledge base
-        if ticket.get('resolution'):
+        if ticket['resolution']:
             await rag_service.add_document({
                 "title": f"Resolution: {ticket['title']}",
                 "content": f"Problem: {ticket['description']}\n\nSolution: {ticket['resolution']}",
@@ -54,7 +58,10 @@ async def load_demo_data():
                 "category": ticket['category']
             })
         
-        print(f"Added ticket: {ticket['title']}")
+        if result["status"] == "created":
+            print(f"Added ticket: {ticket['title']} (ID: {result['ticket_id']})")
+        else:
+            print(f"Failed to add ticket: {ticket['title']} ({result['error']})")
     
     print("\nDemo data loaded successfully!")
 
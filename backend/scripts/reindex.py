@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Blue/green reindex of the knowledge base for a new embedding model
+
+    python scripts/reindex.py status
+    EMBEDDING_MODEL=sentence-transformers/all-mpnet-base-v2 python scripts/reindex.py build
+    EMBEDDING_MODEL=sentence-transformers/all-mpnet-base-v2 python scripts/reindex.py verify
+    EMBEDDING_MODEL=sentence-transformers/all-mpnet-base-v2 python scripts/reindex.py switch
+    python scripts/reindex.py rollback
+    python scripts/reindex.py drop helpdesk_docs--sentence-transformers__all-MiniLM-L6-v2--384
+
+QDRANT_COLLECTION is an alias for a collection named {alias}--{model}--{dimension}.
+`build` creates the collection for EMBEDDING_MODEL (or --model) and fills it
+by re-embedding every document of the collection being served, which keeps
+answering queries throughout. It can be rerun: documents already copied
+unchanged are skipped. `verify` checks the new collection is complete,
+indexed, and finds each sampled document from its own text.
+
+`switch` first copies what changed during the build, verifies, then moves
+the alias in one atomic operation, keeping the old collection as
+{alias}--previous. API workers notice within QDRANT_ALIAS_REFRESH_SECONDS,
+load the new model and only then swap, so queries never hit a collection
+with the wrong model. Once they have all moved, documents the workers
+still added, changed or deleted in the old collection in that time are
+applied to the new one, measured against a snapshot taken at the switch
+so that changes already made to the new collection are kept.
+`rollback` swaps the two aliases back the same way.
+
+A plain collection named like the alias, created before collections were
+versioned, is migrated with `switch --drop-legacy`. The alias can only
+be created once that collection is deleted, so searches fail for the
+moment in between and there is nothing to roll back to; do it off-peak.
+"""
+
+import sys
+import os
+import argparse
+import hashlib
+import json
+import logging
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.rag_service import RAGService, parse_collection_name, versioned_collection_name
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PREVIOUS_SUFFIX = "--previous"
+
+
+def _fingerprint(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Reindexer:
+    def __init__(self, rag_service: RAGService, batch_size: int):
+        self.rag_service = rag_service
+        self.client = rag_service.client
+        self.alias = settings.QDRANT_COLLECTION
+        self.previous_alias = self.alias + PREVIOUS_SUFFIX
+        self.batch_size = batch_size
+
+    def live_collection(self) -> Optional[str]:
+        """Collection being served: the alias target, or a legacy collection"""
+        target = self.rag_service.alias_target(self.alias)
+        if target is None and self.client.collection_exists(self.alias):
+            return self.alias
+        return target
+
+    def target_collection(self, model: str) -> str:
+        return versioned_collection_name(self.alias, model, self.rag_service.embedding_dimension(model))
+
+    def status(self):
+        live = self.rag_service.alias_target(self.alias)
+        previous = self.rag_service.alias_target(self.previous_alias)
+        if live is None and self.client.collection_exists(self.alias):
+            logger.info(f"{self.alias} is a legacy collection, not an alias yet")
+        logger.info(f"{self.alias} -> {live}")
+        logger.info(f"{self.previous_alias} -> {previous}")
+        for collection in sorted(c.name for c in self.client.get_collections().collections):
+            parsed = parse_collection_name(collection)
+            if collection != self.alias and (parsed is None or parsed[0] != self.alias):
+                continue
+            info = self.client.get_collection(collection)
+            marker = " (live)" if collection in (live, self.alias) else " (previous)" if collection == previous else ""
+            logger.info(f"  {collection}: {info.points_count} points, {info.status.value}{marker}")
+
+    def sync(self, source: str, target: str, model: str, delete: bool) -> Dict[str, int]:
+        """Make target hold every document of source, embedded with model.
+
+        Documents whose payload already matches are skipped; with delete,
+        documents no longer in source are removed from target.
+        """
+        from qdrant_client.models import PointIdsList
+
+        stats = {"copied": 0, "unchanged": 0, "deleted": 0}
+        seen = set()
+        offset = None
+        started = time.perf_counter()
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=source,
+                limit=self.batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
+            )
+            if points:
+                existing = {
+                    str(point.id): point.payload
+                    for point in self.client.retrieve(target, ids=[point.id for point in points], with_payload=True)
+                }
+                stale = [point for point in points if existing.get(str(point.id)) != point.payload]
+                self._copy(stale, target, model)
+                seen.update(str(point.id) for point in points)
+                stats["copied"] += len(stale)
+                stats["unchanged"] += len(points) - len(stale)
+                done = stats["copied"] + stats["unchanged"]
+                logger.info(f"{done} documents checked, {stats['copied']} copied ({done / (time.perf_counter() - started):.1f} docs/s)")
+            if offset is None:
+                break
+
+        if delete:
+            offset = None
+            while True:
+                points, offset = self.client.scroll(collection_name=target, limit=1000, offset=offset, with_payload=False)
+                removed = [point.id for point in points if str(point.id) not in seen]
+                if removed:
+                    self.client.delete(collection_name=target, points_selector=PointIdsList(points=removed))
+                    stats["deleted"] += len(removed)
+                if offset is None:
+                    break
+        return stats
+
+    def _copy(self, points: List[Any], target: str, model: str):
+        """Re-embed scrolled points with model and upsert them into target"""
+        from qdrant_client.models import PointStruct
+
+        if not points:
+            return
+        vectors = self.rag_service.create_embeddings([point.payload["content"] for point in points], model)
+        self.client.upsert(
+            collection_name=target,
+            points=[
+                PointStruct(id=point.id, vector=vector, payload=point.payload)
+                for point, vector in zip(points, vectors)
+            ],
+            wait=True
+        )
+
+    def snapshot(self, collection: str) -> Dict[str, str]:
+        """Fingerprint of every document's payload, by ID"""
+        fingerprints = {}
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection,
+                limit=1000,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
+            )
+            for point in points:
+                fingerprints[str(point.id)] = _fingerprint(point.payload)
+            if offset is None:
+                return fingerprints
+
+    def build(self, model: str) -> str:
+        source = self.live_collection()
+        target = self.target_collection(model)
+        if source == target:
+            logger.info(f"{target} is already live")
+            return target
+
+        parsed = parse_collection_name(target)
+        self.rag_service._ensure_collection(target, parsed[2])
+        if source is None:
+            logger.info(f"Created empty {target}; nothing to copy")
+            return target
+
+        logger.info(f"Building {target} from {source}")
+        stats = self.sync(source, target, model, delete=True)
+        logger.info(f"✓ {target}: {stats['copied']} copied, {stats['unchanged']} unchanged, {stats['deleted']} deleted")
+        return target
+
+    def wait_indexed(self, collection: str, timeout: float) -> bool:
+        """Wait for the optimizers to finish so the first queries are not slow"""
+        from qdrant_client.models import CollectionStatus
+
+        deadline = time.monotonic() + timeout
+        while self.client.get_collection(collection).status != CollectionStatus.GREEN:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(1)
+        return True
+
+    def verify(self, model: str, sample: int, k: int, min_recall: float, max_missing: int, timeout: float) -> bool:
+        """Check the collection for a model is complete, indexed and retrieves its own documents"""
+        source = self.live_collection()
+        target = self.target_collection(model)
+        if not self.client.collection_exists(target):
+            logger.error(f"{target} does not exist; run build first")
+            return False
+
+        ok = True
+        if source and source != target:
+            source_count = self.client.count(source, exact=True).count
+            target_count = self.client.count(target, exact=True).count
+            logger.info(f"Points: {source} {source_count}, {target} {target_count}")
+            if target_count < source_count - max_missing:
+                logger.error(f"✗ {target} is missing {source_count - target_count} documents")
+                ok = False
+
+        if not self.wait_indexed(target, timeout):
+            logger.error(f"✗ {target} is still being indexed after {timeout:.0f}s")
+            ok = False
+
+        # Each sampled document should come back near the top for its own text
+        points, _ = self.client.scroll(collection_name=target, limit=sample, with_payload=["content"])
+        hits = 0
+        latencies = []
+        for point in points:
+            vector = self.rag_service.create_embedding(point.payload["content"], model)
+            started = time.perf_counter()
+            results = self.client.search(
+                collection_name=target,
+                query_vector=vector,
+                search_params=self.rag_service._search_params(),
+                limit=k,
+                with_payload=False
+            )
+            latencies.append(time.perf_counter() - started)
+            hits += any(str(result.id) == str(point.id) for result in results)
+
+        if points:
+            recall = hits / len(points)
+            logger.info(
+                f"Self-retrieval@{k}: {recall:.3f} over {len(points)} documents, "
+                f"search p50 {statistics.median(latencies) * 1000:.1f} ms"
+            )
+            if recall < min_recall:
+                logger.error(f"✗ Self-retrieval below {min_recall}")
+                ok = False
+
+        logger.info(f"{'✓' if ok else '✗'} Verification of {target} {'passed' if ok else 'failed'}")
+        return ok
+
+    def _move_aliases(self, live: str, previous: Optional[str]):
+        """Point the alias at live and the previous alias at previous, atomically"""
+        from qdrant_client.models import (
+            CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation
+        )
+
+        operations = []
+        for alias in (self.alias, self.previous_alias):
+            if self.rag_service.alias_target(alias) is not None:
+                operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+        operations.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=live, alias_name=self.alias)))
+        if previous:
+            operations.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=previous, alias_name=self.previous_alias)))
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+
+    def _catch_up(self, source: str, target: str, snapshot: Dict[str, str], settle_seconds: float):
+        """Apply what workers changed in source before they followed the alias.
+
+        snapshot is target as it was when the alias moved. A document that
+        now differs from it in source was written there by a worker that
+        had not moved yet and is copied; one gone from source was deleted
+        there and is deleted from target. Documents that workers have since
+        changed or deleted in target itself are left as they are.
+        """
+        from qdrant_client.models import PointIdsList
+
+        if settle_seconds <= 0:
+            return
+        logger.info(f"Waiting {settle_seconds:.0f}s for API workers to follow the alias...")
+        time.sleep(settle_seconds)
+
+        model = parse_collection_name(target)[1]
+        current = self.snapshot(target)
+
+        def untouched(doc_id: str) -> bool:
+            return current.get(doc_id) == snapshot.get(doc_id)
+
+        seen = set()
+        copied = 0
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=source,
+                limit=self.batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
+            )
+            changed = [
+                point for point in points
+                if _fingerprint(point.payload) != snapshot.get(str(point.id)) and untouched(str(point.id))
+            ]
+            self._copy(changed, target, model)
+            copied += len(changed)
+            seen.update(str(point.id) for point in points)
+            if offset is None:
+                break
+
+        deleted = [doc_id for doc_id in snapshot if doc_id not in seen and untouched(doc_id)]
+        if deleted:
+            self.client.delete(collection_name=target, points_selector=PointIdsList(points=deleted))
+        logger.info(f"✓ Caught up from {source}: {copied} copied, {len(deleted)} deleted")
+
+    def switch(self, model: str, verify_args: Dict[str, Any], drop_legacy: bool, settle_seconds: float) -> bool:
+        source = self.live_collection()
+        target = self.target_collection(model)
+        if not self.client.collection_exists(target):
+            logger.error(f"{target} does not exist; run build first")
+            return False
+        if source == target:
+            logger.info(f"{target} is already live")
+            return True
+
+        legacy = source == self.alias
+        if legacy and not drop_legacy:
+            logger.error(f"{self.alias} is a legacy collection; switching deletes it, pass --drop-legacy to confirm")
+            return False
+
+        if source:
+            stats = self.sync(source, target, model, delete=True)
+            logger.info(f"Synced changes since build: {stats['copied']} copied, {stats['deleted']} deleted")
+        if verify_args is not None and not self.verify(model, **verify_args):
+            return False
+
+        if legacy:
+            logger.warning(f"Deleting legacy collection {self.alias} to free its name for the alias")
+            self.client.delete_collection(self.alias)
+            self._move_aliases(target, None)
+        else:
+            snapshot = self.snapshot(target)
+            self._move_aliases(target, source)
+        logger.info(f"✅ {self.alias} -> {target}" + (f" ({self.previous_alias} -> {source})" if source and not legacy else ""))
+
+        if source and not legacy:
+            self._catch_up(source, target, snapshot, settle_seconds)
+        return True
+
+    def rollback(self, settle_seconds: float) -> bool:
+        live = self.rag_service.alias_target(self.alias)
+        previous = self.rag_service.alias_target(self.previous_alias)
+        if previous is None:
+            logger.error(f"{self.previous_alias} does not exist; nothing to roll back to")
+            return False
+
+        snapshot = self.snapshot(previous)
+        self._move_aliases(previous, live)
+        logger.info(f"✅ Rolled back: {self.alias} -> {previous} ({self.previous_alias} -> {live})")
+        self._catch_up(live, previous, snapshot, settle_seconds)
+        return True
+
+    def drop(self, collection: str) -> bool:
+        in_use = {self.rag_service.alias_target(self.alias), self.rag_service.alias_target(self.previous_alias)}
+        if collection in in_use:
+            logger.error(f"{collection} is behind an alias; switch or roll back first")
+            return False
+        self.client.delete_collection(collection)
+        logger.info(f"✓ Dropped {collection}")
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blue/green reindex of the knowledge base collection")
+    parser.add_argument("command", choices=["status", "build", "verify", "switch", "rollback", "drop"])
+    parser.add_argument("collection", nargs="?", help="Collection to drop")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL, help="Embedding model of the new collection")
+    parser.add_argument("--batch-size", type=int, default=256, help="Documents re-embedded per batch")
+    parser.add_argument("--sample", type=int, default=200, help="Documents checked for self-retrieval")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--min-recall", type=float, default=0.9, help="Minimum self-retrieval@k to pass")
+    parser.add_argument("--max-missing", type=int, default=0, help="Documents the new collection may lack")
+    parser.add_argument("--index-timeout", type=float, default=600, help="Seconds to wait for indexing")
+    parser.add_argument("--skip-verify", action="store_true", help="Switch without verifying")
+    parser.add_argument("--drop-legacy", action="store_true", help="Allow deleting a pre-versioning collection")
+    parser.add_argument(
+        "--settle-seconds", type=float, default=settings.QDRANT_ALIAS_REFRESH_SECONDS * 2,
+        help="Wait before copying late writes to the old collection"
+    )
+    args = parser.parse_args()
+
+    from qdrant_client import QdrantClient
+
+    rag_service = RAGService()
+    rag_service.client = QdrantClient(url=settings.QDRANT_URL, timeout=60)
+    reindexer = Reindexer(rag_service, args.batch_size)
+    verify_args = {
+        "sample": args.sample,
+        "k": args.k,
+        "min_recall": args.min_recall,
+        "max_missing": args.max_missing,
+        "timeout": args.index_timeout
+    }
+
+    try:
+        if args.command == "status":
+            reindexer.status()
+            ok = True
+        elif args.command == "build":
+            reindexer.build(args.model)
+            ok = True
+        elif args.command == "verify":
+            ok = reindexer.verify(args.model, **verify_args)
+        elif args.command == "switch":
+            ok = reindexer.switch(args.model, None if args.skip_verify else verify_args, args.drop_legacy, args.settle_seconds)
+        elif args.command == "rollback":
+            ok = reindexer.rollback(args.settle_seconds)
+        else:
+            if not args.collection:
+                parser.error("drop needs a collection name")
+            ok = reindexer.drop(args.collection)
+    finally:
+        rag_service.client.close()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Sync BookStack pages into the vector database
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import logging
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.models.sync_cursor import SyncCursor
+from app.services.bookstack_sync import BookStackSyncService
+from app.services.knowledge_service import KnowledgeService
+from app.services.rag_service import RAGService
+from app.config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+async def main(full: bool, loop: bool):
+    rag_service = RAGService()
+    knowledge_service = KnowledgeService(rag_service)
+    if not knowledge_service.is_configured():
+        logger.error("BOOKSTACK_TOKEN_ID and BOOKSTACK_TOKEN_SECRET must be set")
+        sys.exit(1)
+
+    SyncCursor.__table__.create(bind=engine, checkfirst=True)
+    await rag_service.initialize()
+    sync = BookStackSyncService(knowledge_service, rag_service)
+
+    try:
+        if loop:
+            await sync.run_periodically(settings.BOOKSTACK_SYNC_INTERVAL_SECONDS or 300)
+        else:
+            stats = await sync.sync(full=full)
+            logger.info(f"✅ Sync complete: {stats['indexed']} pages indexed, {stats['deleted']} removed")
+    finally:
+        await rag_service.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index BookStack pages into Qdrant")
+    parser.add_argument("--full", action="store_true", help="Ignore the stored cursor and reindex every page")
+    parser.add_argument("--loop", action="store_true", help="Keep syncing at BOOKSTACK_SYNC_INTERVAL_SECONDS")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.full, args.loop))
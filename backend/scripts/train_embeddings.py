@@ -1,76 +1,59 @@
 #!/usr/bin/env python3
 """
 Train embeddings and populate vector database with initial knowledge base
+
+    python scripts/train_embeddings.py
+    python scripts/train_embeddings.py export.jsonl --workers 8 --batch-size 128
+
+Articles are streamed from a JSON (``{"articles": [...]}`` or a bare array)
+or JSONL file through three stages:
+
+- read:   incremental parse, one record in memory at a time
+- encode: a process pool, one model per worker, sized to the cores
+- upload: concurrent batched upserts into Qdrant
+
+Each stage waits when the next one falls behind, so memory stays bounded
+by the queue sizes rather than the corpus. Progress is checkpointed to a
+file next to the input; rerunning the same command resumes after the
+last contiguous uploaded record. Point IDs are derived from the article,
+so batches redone after a resume overwrite rather than duplicate.
 """
 
 import sys
 import os
 import json
+import argparse
 import asyncio
+import hashlib
+import itertools
 import logging
-from typing import List, Dict, Any
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.services.rag_service import RAGService
+from app.utils.json_stream import iter_json_records
 from app.config import settings
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+KNOWLEDGE_BASE_PATH = "/app/data/knowledge_base.json"
+UPLOAD_RETRIES = 3
+CHECKPOINT_INTERVAL_SECONDS = 2.0
+PROGRESS_INTERVAL_SECONDS = 10.0
 
-class EmbeddingTrainer:
-    def __init__(self):
-        self.rag_service = RAGService()
-        self.knowledge_base_path = "/app/data/knowledge_base.json"
-        self.demo_tickets_path = "/app/data/demo_tickets.json"
-        self.department_rules_path = "/app/data/department_rules.json"
-        
-    async def initialize(self):
-        """Initialize services"""
-        logger.info("Initializing RAG service...")
-        await self.rag_service.initialize()
-        logger.info("RAG service initialized successfully")
-        
-    async def load_knowledge_base(self):
-        """Load and index knowledge base articles"""
-        if not os.path.exists(self.knowledge_base_path):
-            logger.warning(f"Knowledge base file not found: {self.knowledge_base_path}")
-            logger.info("Creating default knowledge base...")
-            await self.create_default_knowledge_base()
-            return
-            
-        with open(self.knowledge_base_path, 'r') as f:
-            data = json.load(f)
-            
-        articles = data.get('articles', [])
-        logger.info(f"Loading {len(articles)} knowledge base articles...")
-        
-        for i, article in enumerate(articles):
-            try:
-                doc_id = await self.rag_service.add_document({
-                    "title": article['title'],
-                    "content": article['content'],
-                    "department": article.get('department', 'General'),
-                    "category": article.get('category', 'General'),
-                    "metadata": {
-                        "source": "knowledge_base",
-                        "type": "article",
-                        "tags": article.get('tags', [])
-                    }
-                })
-                logger.info(f"✓ Added article {i+1}/{len(articles)}: {article['title']}")
-            except Exception as e:
-                logger.error(f"✗ Failed to add article '{article['title']}': {str(e)}")
-                
-    async def create_default_knowledge_base(self):
-        """Create default knowledge base if files don't exist"""
-        default_articles = [
-            {
-                "title": "Password Reset Process",
-                "content": """To reset your password:
+DEFAULT_ARTICLES = [
+    {
+        "title": "Password Reset Process",
+        "content": """To reset your password:
 1. Go to the login page
 2. Click on 'Forgot Password'
 3. Enter your email address
@@ -79,13 +62,13 @@ class EmbeddingTrainer:
 6. Password must be at least 8 characters with one uppercase, one number, and one special character
 
 If you don't receive the email within 5 minutes, check your spam folder or contact IT support.""",
-                "department": "IT",
-                "category": "Authentication",
-                "tags": ["password", "reset", "login", "authentication"]
-            },
-            {
-                "title": "VPN Connection Guide",
-                "content": """To connect to company VPN:
+        "department": "IT",
+        "category": "Authentication",
+        "tags": ["password", "reset", "login", "authentication"]
+    },
+    {
+        "title": "VPN Connection Guide",
+        "content": """To connect to company VPN:
 1. Download the VPN client from the IT portal
 2. Install the client with administrator privileges
 3. Launch the VPN client
@@ -97,13 +80,13 @@ Troubleshooting:
 - If connection fails, ensure you're connected to internet
 - Check if your VPN certificate is valid (expires every 90 days)
 - For certificate renewal, contact IT support""",
-                "department": "IT",
-                "category": "Network",
-                "tags": ["vpn", "remote", "connection", "network"]
-            },
-            {
-                "title": "Leave Application Process",
-                "content": """To apply for leave:
+        "department": "IT",
+        "category": "Network",
+        "tags": ["vpn", "remote", "connection", "network"]
+    },
+    {
+        "title": "Leave Application Process",
+        "content": """To apply for leave:
 1. Log into the HR portal at hr.company.com
 2. Navigate to 'Leave Management'
 3. Click 'Apply for Leave'
@@ -115,58 +98,352 @@ Troubleshooting:
 
 Leave balance and history can be viewed in the same portal.
 Approval typically takes 1-2 business days.""",
-                "department": "HR",
-                "category": "Leave",
-                "tags": ["leave", "vacation", "time off", "absence"]
-            }
-        ]
-        
-        # Create data directory if it doesn't exist
-        os.makedirs("/app/data", exist_ok=True)
-        
-        # Save default knowledge base
-        with open(self.knowledge_base_path, 'w') as f:
-            json.dump({"articles": default_articles}, f, indent=2)
-            
-        logger.info(f"Created default knowledge base with {len(default_articles)} articles")
-        
-        # Index the articles
-        for i, article in enumerate(default_articles):
-            try:
-                doc_id = await self.rag_service.add_document({
-                    "title": article['title'],
-                    "content": article['content'],
-                    "department": article['department'],
-                    "category": article['category'],
+        "department": "HR",
+        "category": "Leave",
+        "tags": ["leave", "vacation", "time off", "absence"]
+    }
+]
+
+
+def create_default_knowledge_base(path: str):
+    """Write the default knowledge base if no export was provided"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({"articles": DEFAULT_ARTICLES}, f, indent=2)
+    logger.info(f"Created default knowledge base with {len(DEFAULT_ARTICLES)} articles")
+
+
+def article_point_id(article: Dict[str, Any]) -> str:
+    """Stable point ID: the article's own ID if it has one, else a hash of its text"""
+    if article.get("id") is not None:
+        key = f"knowledge_base:{article['id']}"
+    else:
+        digest = hashlib.sha1(f"{article['title']}\0{article['content']}".encode("utf-8")).hexdigest()
+        key = f"knowledge_base:sha1:{digest}"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, key))
+
+
+# Encoding runs in worker processes; each loads the model once
+_worker_model = None
+
+
+def _init_worker(model_name: str, threads: int):
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    # One pool worker per core; more torch threads would just contend
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name)
+
+
+def _encode_worker(texts: List[str], batch_size: int):
+    """Encode a batch in a worker; returns the vectors and the seconds spent"""
+    started = time.perf_counter()
+    vectors = _worker_model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    return vectors.astype("float32"), time.perf_counter() - started
+
+
+@dataclass
+class StageStats:
+    docs: int = 0
+    busy_seconds: float = 0.0
+
+    def add(self, docs: int, seconds: float):
+        self.docs += docs
+        self.busy_seconds += seconds
+
+
+class Checkpoint:
+    """Number of leading records of an input that are safely in Qdrant.
+
+    Batches finish out of order, so the saved position only advances over
+    a contiguous run of finished batches. The checkpoint is ignored if the
+    input file, collection or model changed since it was written.
+    """
+
+    def __init__(self, path: str, source: str, collection: str, model: str):
+        stat = os.stat(source)
+        self.path = path
+        self.fingerprint = {
+            "source": os.path.abspath(source),
+            "size": stat.st_size,
+            "mtime": int(stat.st_mtime),
+            "collection": collection,
+            "model": model
+        }
+        self.records_done = 0
+        self._finished: Dict[int, int] = {}  # first record of a batch -> record after it
+        self._saved_at = 0.0
+
+    def load(self) -> int:
+        """Records to skip on this run"""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get("fingerprint") != self.fingerprint:
+            logger.warning(f"Ignoring checkpoint {self.path}: written for a different input")
+            return 0
+        self.records_done = data["records_done"]
+        return self.records_done
+
+    def finish(self, first: int, end: int):
+        """Mark records [first, end) as uploaded"""
+        self._finished[first] = end
+        while self.records_done in self._finished:
+            self.records_done = self._finished.pop(self.records_done)
+        if time.monotonic() - self._saved_at >= CHECKPOINT_INTERVAL_SECONDS:
+            self.save()
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"fingerprint": self.fingerprint, "records_done": self.records_done}, f)
+        os.replace(tmp, self.path)
+        self._saved_at = time.monotonic()
+
+
+class IndexingPipeline:
+    """Stream articles from a file, encode them in a process pool and upsert them in batches"""
+
+    def __init__(
+        self,
+        rag_service: RAGService,
+        checkpoint: Checkpoint,
+        workers: int,
+        batch_size: int,
+        upload_concurrency: int,
+        queue_size: int
+    ):
+        self.rag_service = rag_service
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.batch_size = batch_size
+        self.upload_concurrency = upload_concurrency
+        self.queue_size = queue_size
+        self.stats = {"read": StageStats(), "encode": StageStats(), "upload": StageStats()}
+        self.skipped = 0
+        self.error: Optional[BaseException] = None
+
+    def _batches(self, path: str, key: Optional[str], resume_from: int) -> Iterator[Tuple[int, int, List[Tuple[int, Dict[str, Any]]]]]:
+        """Yield (first, end, [(index, article)]) batches covering records [first, end)"""
+        records = enumerate(iter_json_records(path, key=key))
+        # Skipped records are still parsed; that is cheap next to encoding them
+        records = itertools.islice(records, resume_from, None)
+        while True:
+            started = time.perf_counter()
+            batch = []
+            first = last = None
+            for index, article in records:
+                if first is None:
+                    first = index
+                last = index
+                if not article.get("content") or not article.get("title"):
+                    self.skipped += 1
+                    logger.warning(f"Skipping record {index}: missing title or content")
+                    continue
+                batch.append((index, article))
+                if len(batch) == self.batch_size:
+                    break
+            if first is None:
+                return
+            self.stats["read"].add(len(batch), time.perf_counter() - started)
+            yield first, last + 1, batch
+
+    async def _encode(self, pool: ProcessPoolExecutor, first: int, end: int, batch: list, queue: asyncio.Queue, slots: asyncio.Semaphore):
+        try:
+            if self.error is None:
+                loop = asyncio.get_running_loop()
+                texts = [article["content"] for _, article in batch]
+                vectors, seconds = await loop.run_in_executor(pool, _encode_worker, texts, settings.EMBEDDING_BATCH_SIZE)
+                self.stats["encode"].add(len(batch), seconds)
+                # Waits while uploads are behind, which in turn holds back encoding
+                await queue.put((first, end, batch, vectors))
+        except Exception as e:
+            self.error = self.error or e
+        finally:
+            slots.release()
+
+    async def _upload(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            first, end, batch, vectors = item
+            if self.error is not None:
+                # Keep draining so nothing upstream blocks on a full queue
+                continue
+
+            points = [
+                self.rag_service._document_point(article_point_id(article), vector.tolist(), {
+                    "title": article["title"],
+                    "content": article["content"],
+                    "department": article.get("department", "General"),
+                    "category": article.get("category", "General"),
                     "metadata": {
-                        "source": "default",
+                        "source": "knowledge_base",
                         "type": "article",
-                        "tags": article.get('tags', [])
+                        "tags": article.get("tags", [])
                     }
                 })
-                logger.info(f"✓ Added default article {i+1}/{len(default_articles)}: {article['title']}")
-            except Exception as e:
-                logger.error(f"✗ Failed to add article '{article['title']}': {str(e)}")
-                
-    async def cleanup(self):
-        """Cleanup resources"""
-        await self.rag_service.cleanup()
+                for (_, article), vector in zip(batch, vectors)
+            ]
+            for attempt in range(UPLOAD_RETRIES):
+                started = time.perf_counter()
+                try:
+                    await asyncio.to_thread(
+                        self.rag_service.client.upsert,
+                        collection_name=self.rag_service.collection_name,
+                        points=points,
+                        wait=True
+                    )
+                    self.stats["upload"].add(len(points), time.perf_counter() - started)
+                    self.checkpoint.finish(first, end)
+                    break
+                except Exception as e:
+                    if attempt + 1 == UPLOAD_RETRIES:
+                        logger.error(f"✗ Upload of records {first}-{end - 1} failed: {e}")
+                        self.error = self.error or e
+                    else:
+                        await asyncio.sleep(2 ** attempt)
+
+    async def run(self, path: str, key: Optional[str]) -> float:
+        """Index the file; returns the wall-clock seconds taken"""
+        resume_from = self.checkpoint.load()
+        if resume_from:
+            logger.info(f"Resuming after {resume_from} records (checkpoint {self.checkpoint.path})")
 
+        # Spawned rather than forked: the parent already runs threads
+        context = multiprocessing.get_context("spawn")
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        # Bounds batches read but not yet encoded to two per worker
+        slots = asyncio.Semaphore(self.workers * 2)
+        started = last_report = time.perf_counter()
 
-async def main():
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(self.rag_service.model_name, threads)) as pool:
+            uploaders = [asyncio.create_task(self._upload(queue)) for _ in range(self.upload_concurrency)]
+            encoders = set()
+            try:
+                for first, end, batch in self._batches(path, key, resume_from):
+                    await slots.acquire()
+                    if self.error is not None:
+                        break
+                    if not batch:
+                        # Nothing to encode; the records still count as done
+                        slots.release()
+                        self.checkpoint.finish(first, end)
+                        continue
+                    task = asyncio.create_task(self._encode(pool, first, end, batch, queue, slots))
+                    encoders.add(task)
+                    task.add_done_callback(encoders.discard)
+
+                    if time.perf_counter() - last_report >= PROGRESS_INTERVAL_SECONDS:
+                        last_report = time.perf_counter()
+                        uploaded = self.stats["upload"].docs
+                        logger.info(f"Indexed {uploaded} articles ({uploaded / (last_report - started):.1f} docs/s)")
+
+                await asyncio.gather(*encoders)
+                for _ in uploaders:
+                    await queue.put(None)
+                await asyncio.gather(*uploaders)
+            finally:
+                # Only reached with tasks still pending on interruption
+                for task in uploaders + list(encoders):
+                    task.cancel()
+                self.checkpoint.save()
+
+        if self.error is not None:
+            raise self.error
+        return time.perf_counter() - started
+
+    def report(self, wall_seconds: float) -> Dict[str, Any]:
+        """Per-stage throughput.
+
+        busy_seconds is summed over a stage's workers; capacity_docs_per_s is
+        what the stage could sustain with all its workers busy, so the stage
+        with the lowest capacity is the bottleneck.
+        """
+        parallelism = {"read": 1, "encode": self.workers, "upload": self.upload_concurrency}
+        stages = {}
+        for name, stats in self.stats.items():
+            stages[name] = {
+                "docs": stats.docs,
+                "busy_seconds": round(stats.busy_seconds, 3),
+                "capacity_docs_per_s": round(stats.docs / stats.busy_seconds * parallelism[name], 1) if stats.busy_seconds else None
+            }
+        uploaded = self.stats["upload"].docs
+        return {
+            "wall_seconds": round(wall_seconds, 3),
+            "docs_per_s": round(uploaded / wall_seconds, 1) if wall_seconds else None,
+            "skipped": self.skipped,
+            "stages": stages
+        }
+
+
+async def main(args):
     """Main training function"""
-    trainer = EmbeddingTrainer()
-    
+    path = args.path
+    if not os.path.exists(path):
+        if path != KNOWLEDGE_BASE_PATH:
+            logger.error(f"Knowledge base file not found: {path}")
+            sys.exit(1)
+        logger.warning(f"Knowledge base file not found: {path}")
+        logger.info("Creating default knowledge base...")
+        create_default_knowledge_base(path)
+
+    # Encoding happens in the worker pool, with the model of the collection
+    # being served; this process only talks to Qdrant
+    rag_service = RAGService()
+    await asyncio.to_thread(rag_service.connect)
+
+    checkpoint = Checkpoint(args.checkpoint or path + ".checkpoint", path, rag_service.collection_name, rag_service.model_name)
+    if args.restart and os.path.exists(checkpoint.path):
+        os.remove(checkpoint.path)
+    pipeline = IndexingPipeline(
+        rag_service,
+        checkpoint,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        upload_concurrency=args.upload_concurrency,
+        queue_size=args.queue_size
+    )
+
+    key = None if path.endswith((".jsonl", ".ndjson")) else args.key
     try:
-        await trainer.initialize()
-        await trainer.load_knowledge_base()
-        logger.info("\n✅ Embedding training completed successfully!")
+        wall_seconds = await pipeline.run(path, key)
     except Exception as e:
-        logger.error(f"Training failed: {str(e)}")
+        logger.error(f"Training failed: {str(e)}; rerun to resume from the checkpoint")
         raise
     finally:
-        await trainer.cleanup()
+        await rag_service.cleanup()
+
+    report = pipeline.report(wall_seconds)
+    for name, stage in report["stages"].items():
+        logger.info(
+            f"{name:7} {stage['docs']:>9} docs  busy {stage['busy_seconds']:>9.1f}s  "
+            f"capacity {stage['capacity_docs_per_s'] or 0:>9.1f} docs/s"
+        )
+    logger.info(f"\n✅ Embedding training completed: {report['stages']['upload']['docs']} articles "
+                f"in {report['wall_seconds']:.1f}s ({report['docs_per_s'] or 0:.1f} docs/s)")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Embed knowledge base articles into Qdrant")
+    parser.add_argument("path", nargs="?", default=KNOWLEDGE_BASE_PATH, help="JSON or JSONL file with articles")
+    parser.add_argument("--key", default="articles", help="Key of the article array in wrapped JSON files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Encoding processes")
+    parser.add_argument("--batch-size", type=int, default=128, help="Articles per encode and upsert batch")
+    parser.add_argument("--upload-concurrency", type=int, default=4, help="Upserts in flight")
+    parser.add_argument("--queue-size", type=int, default=8, help="Encoded batches waiting for upload")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and index everything")
+    parser.add_argument("--report", help="Write the throughput report to this JSON file")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,72 @@
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+# Settings and the database engine are read at import, so point them at
+# local stand-ins before anything imports the app
+_data_dir = tempfile.mkdtemp(prefix="helpdesk-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_data_dir, 'app.db')}"
+os.environ["QDRANT_URL"] = ":memory:"
+os.environ["BOOKSTACK_TOKEN_ID"] = "test"
+os.environ["BOOKSTACK_TOKEN_SECRET"] = "test"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import uvicorn
+
+from app.config import settings
+from app.database import Base, SessionLocal, engine
+from app.models.sync_cursor import SyncCursor
+from app.services.bookstack_sync import BookStackSyncService
+from app.services.knowledge_service import KnowledgeService
+from app.services.rag_service import RAGService
+from mocks import bookstack
+from mocks.embedding import HashingEncoder
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def bookstack_app():
+    """A fresh mock BookStack served over HTTP on a free port"""
+    app = bookstack.create_app(pages=0)
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    app.state.url = f"http://127.0.0.1:{port}"
+    yield app
+    server.should_exit = True
+    thread.join()
+
+
+@pytest.fixture
+def rag_service():
+    """RAG service on an in-process Qdrant store with the hashing encoder"""
+    service = RAGService()
+    service.embedders[settings.EMBEDDING_MODEL] = HashingEncoder(384, 0)
+    service.connect()
+    service.ready = True
+    yield service
+    service.client.close()
+
+
+@pytest.fixture
+def sync_service(bookstack_app, rag_service):
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.query(SyncCursor).delete()
+        db.commit()
+    knowledge_service = KnowledgeService(rag_service)
+    knowledge_service.bookstack_url = f"{bookstack_app.state.url}/api"
+    return BookStackSyncService(knowledge_service, rag_service)
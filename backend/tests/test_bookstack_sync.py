@@ -0,0 +1,147 @@
+import asyncio
+
+import httpx
+
+from app.config import settings
+from app.database import async_engine
+from app.services.bookstack_sync import _load_cursor
+from app.services.knowledge_service import bookstack_point_id
+
+
+def _seed(app, count: int):
+    """Create pages with one-second-apart timestamps in the past, returning their IDs"""
+    with httpx.Client(base_url=app.state.url) as client:
+        book_id = client.post("/api/books", json={"name": "Manuals"}).json()["id"]
+        page_ids = [
+            client.post("/api/pages", json={
+                "book_id": book_id,
+                "name": f"Page {i}",
+                "html": f"<p>Original text {i}</p>"
+            }).json()["id"]
+            for i in range(count)
+        ]
+    for i, page_id in enumerate(page_ids):
+        app.state.pages[page_id]["updated_at"] = f"2024-01-01T00:00:0{i}.000000Z"
+    return page_ids
+
+
+def _indexed(rag_service, page_ids):
+    """Indexed documents of the given pages, by page ID"""
+    doc_ids = {bookstack_point_id(page_id): page_id for page_id in page_ids}
+    documents = rag_service.get_documents(list(doc_ids), rag_service.active)
+    return {doc_ids[doc_id]: document for doc_id, document in documents.items()}
+
+
+def _run(coro):
+    async def run():
+        try:
+            return await coro
+        finally:
+            await async_engine.dispose()
+    return asyncio.run(run())
+
+
+def test_sync_indexes_pages_and_advances_cursor(bookstack_app, rag_service, sync_service):
+    page_ids = _seed(bookstack_app, 3)
+
+    async def scenario():
+        first = await sync_service.sync()
+        cursor = await _load_cursor()
+        second = await sync_service.sync()
+        return first, cursor, second
+
+    first, cursor, second = _run(scenario())
+
+    assert first["indexed"] == 3
+    assert cursor == "2024-01-01 00:00:02"
+    # Only the page sharing the cursor's second is listed again
+    assert second["indexed"] == 1
+    assert sorted(_indexed(rag_service, page_ids)) == page_ids
+
+
+def test_sync_picks_up_edits(bookstack_app, rag_service, sync_service):
+    page_ids = _seed(bookstack_app, 3)
+
+    async def scenario():
+        await sync_service.sync()
+        with httpx.Client(base_url=bookstack_app.state.url) as client:
+            client.put(f"/api/pages/{page_ids[0]}", json={"html": "<p>Edited text</p>"}).raise_for_status()
+        return await sync_service.sync()
+
+    stats = _run(scenario())
+
+    # The edited page, plus the one sharing the cursor's second
+    assert stats["indexed"] == 2
+    documents = _indexed(rag_service, page_ids)
+    assert "Edited text" in documents[page_ids[0]]["content"]
+    assert "Original text 1" in documents[page_ids[1]]["content"]
+
+
+def test_emptied_pages_are_removed_not_counted(bookstack_app, rag_service, sync_service):
+    page_ids = _seed(bookstack_app, 3)
+
+    async def scenario():
+        await sync_service.sync()
+        with httpx.Client(base_url=bookstack_app.state.url) as client:
+            client.put(f"/api/pages/{page_ids[0]}", json={"html": "<p> </p>"}).raise_for_status()
+        return await sync_service.sync()
+
+    stats = _run(scenario())
+
+    # Of the emptied page and the one sharing the cursor's second, only the latter is indexed
+    assert stats["indexed"] == 1
+    assert sorted(_indexed(rag_service, page_ids)) == page_ids[1:]
+
+
+def test_deletions_are_reconciled_on_their_own_schedule(bookstack_app, rag_service, sync_service, monkeypatch):
+    monkeypatch.setattr(settings, "BOOKSTACK_RECONCILE_INTERVAL_SECONDS", 3600)
+    page_ids = _seed(bookstack_app, 3)
+
+    def delete(page_id):
+        with httpx.Client(base_url=bookstack_app.state.url) as client:
+            client.delete(f"/api/pages/{page_id}").raise_for_status()
+
+    async def scenario():
+        results = {"initial": await sync_service.sync()}
+        delete(page_ids[0])
+        results["incremental"] = await sync_service.sync()
+        results["incremental_indexed"] = sorted(_indexed(rag_service, page_ids))
+        results["full"] = await sync_service.sync(full=True)
+        monkeypatch.setattr(settings, "BOOKSTACK_RECONCILE_INTERVAL_SECONDS", 0)
+        delete(page_ids[1])
+        results["due"] = await sync_service.sync()
+        return results
+
+    results = _run(scenario())
+
+    assert results["initial"]["deleted"] == 0
+    assert results["incremental"]["deleted"] == 0
+    assert results["incremental_indexed"] == page_ids
+    assert results["full"]["deleted"] == 1
+    assert results["due"]["deleted"] == 1
+    assert sorted(_indexed(rag_service, page_ids)) == page_ids[2:]
+
+
+def test_periodic_sync_waits_for_retrieval(bookstack_app, rag_service, sync_service):
+    _seed(bookstack_app, 1)
+    rag_service.ready = False
+
+    async def scenario():
+        task = asyncio.create_task(sync_service.run_periodically(3600))
+        try:
+            await asyncio.sleep(0.5)
+            before = await _load_cursor()
+            rag_service.ready = True
+            for _ in range(50):
+                after = await _load_cursor()
+                if after:
+                    break
+                await asyncio.sleep(0.1)
+            return before, after
+        finally:
+            task.cancel()
+
+    before, after = _run(scenario())
+
+    assert before is None
+    assert after == "2024-01-01 00:00:00"